@@ -4,6 +4,8 @@ from warehouse_mro.config import Config
 from warehouse_mro.models import db
 from warehouse_mro.models.user import User
 from warehouse_mro.routes import register_blueprints
+from warehouse_mro.utils.paginacion import url_pagina
+from sqlalchemy import delete, event, func, inspect, select, text
 import os
 
 # =====================================================
@@ -33,7 +35,8 @@ def create_app():
         "uploads/inventory",
         "uploads/history",
         "uploads/bultos",
-        "reports"
+        "reports",
+        "reports/jobs"
     ]
 
     for d in REQUIRED_DIRS:
@@ -61,6 +64,9 @@ def create_app():
         except:
             return value
 
+    # Navegación de listados paginados (templates/partials/paginacion.html)
+    app.add_template_global(url_pagina)
+
     # Ruta raíz
     @app.route("/")
     def index():
@@ -70,8 +76,21 @@ def create_app():
     # Crear tablas y OWNER
     # =====================================================
     with app.app_context():
+        # SQLite en WAL: la cola de trabajos y la web leen mientras un worker escribe
+        if db.engine.dialect.name == "sqlite":
+            event.listen(db.engine, "connect", _sqlite_pragmas)
+
         print("\n>>> Creando tablas si no existen...")
         db.create_all()
+        _agregar_columnas_faltantes()
+        _deduplicar_huellas_alertas_ai()
+        _crear_indices_faltantes()
+        _completar_claves_ubicacion()
+        _inicializar_stock_agregado()
+        _inicializar_resumen_ubicaciones()
+        _inicializar_busqueda()
+        _inicializar_catalogo_errores()
+        _inicializar_rollups_errores()
         db.session.commit()
         print(">>> Tablas listas.\n")
 
@@ -102,9 +121,158 @@ def create_app():
             db.session.commit()
             print(">>> OWNER verificado.")
 
+    # =====================================================
+    # Workers de la cola de trabajos (embebidos)
+    # =====================================================
+    if app.config.get("JOBS_EMBEDDED") and app.config.get("JOB_WORKERS", 0) > 0:
+        _iniciar_workers_embebidos(app)
+
     return app
 
 
+def _agregar_columnas_faltantes():
+    # create_all no altera tablas existentes: columnas nuevas (nullable) se agregan aquí
+    inspector = inspect(db.engine)
+    for tabla in db.metadata.sorted_tables:
+        if not inspector.has_table(tabla.name):
+            continue
+
+        existentes = {c["name"] for c in inspector.get_columns(tabla.name)}
+        for columna in tabla.columns:
+            if columna.name in existentes or not columna.nullable:
+                continue
+
+            tipo = columna.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}"))
+            print(f">>> Columna agregada: {tabla.name}.{columna.name}")
+
+
+def _deduplicar_huellas_alertas_ai():
+    # Bases anteriores al índice único de huella: queda la primera de cada una
+    from warehouse_mro.models.alertas_ai import AlertaIA
+
+    inspector = inspect(db.engine)
+    if not inspector.has_table(AlertaIA.__tablename__):
+        return
+    if "ux_alertas_ai_huella" in {i["name"] for i in inspector.get_indexes(AlertaIA.__tablename__)}:
+        return
+
+    primeras = (
+        select(func.min(AlertaIA.id))
+        .where(AlertaIA.huella.isnot(None))
+        .group_by(AlertaIA.huella)
+    )
+    with db.engine.begin() as conn:
+        duplicadas = conn.execute(
+            select(AlertaIA.id).where(AlertaIA.huella.isnot(None), AlertaIA.id.not_in(primeras))
+        ).scalars().all()
+        if duplicadas:
+            conn.execute(delete(AlertaIA.__table__).where(AlertaIA.id.in_(duplicadas)))
+            print(f">>> Alertas IA duplicadas eliminadas: {len(duplicadas)}")
+
+
+def _crear_indices_faltantes():
+    # create_all no agrega índices nuevos a tablas que ya existen
+    for tabla in db.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            indice.create(bind=db.engine, checkfirst=True)
+
+
+def _inicializar_stock_agregado():
+    # Bases anteriores a inventory_stock: se llena una vez desde inventory
+    from warehouse_mro.models.inventory import InventoryItem
+    from warehouse_mro.models.inventory_stock import InventoryStock
+    from warehouse_mro.utils.bulk_loader import refrescar_stock_agregado
+
+    if InventoryStock.query.first() is None and InventoryItem.query.first() is not None:
+        claves = refrescar_stock_agregado(db.session.connection())
+        print(f">>> Stock agregado inicializado: {claves} claves")
+
+
+def _inicializar_resumen_ubicaciones():
+    # Layouts cargados antes de location_summary
+    from warehouse_mro.models.warehouse2d import WarehouseLocation
+    from warehouse_mro.models.location_summary import LocationSummary
+    from warehouse_mro.utils.mapa2d import recalcular_resumen_ubicaciones
+
+    if LocationSummary.query.first() is None and WarehouseLocation.query.first() is not None:
+        ubicaciones = recalcular_resumen_ubicaciones(db.session.connection())
+        print(f">>> Resumen del mapa 2D inicializado: {ubicaciones} ubicaciones")
+
+
+def _completar_claves_ubicacion():
+    # Filas cargadas antes de la clave de orden de ubicación
+    from warehouse_mro.models.inventory import InventoryItem
+    from warehouse_mro.models.warehouse2d import WarehouseLocation
+    from warehouse_mro.utils.bulk_loader import rellenar_claves_ubicacion
+
+    conn = db.session.connection()
+    for modelo, columna in [(InventoryItem, "location"), (WarehouseLocation, "ubicacion")]:
+        filas = rellenar_claves_ubicacion(conn, modelo, columna)
+        if filas:
+            print(f">>> Clave de orden calculada: {modelo.__tablename__} ({filas} filas)")
+
+
+def _inicializar_busqueda():
+    # FTS5 / pg_trgm según la base; se llena una vez si está vacío
+    from warehouse_mro.models.busqueda import IndiceBusqueda
+    from warehouse_mro.utils.busqueda import preparar_busqueda, indexar_todo
+
+    # El DDL va por otra conexión: en SQLite esperaría al lock de la sesión
+    db.session.commit()
+    motor = preparar_busqueda(db.engine)
+    print(f">>> Buscador: {motor}")
+
+    if IndiceBusqueda.query.first() is None:
+        conteos = indexar_todo(db.session.connection())
+        total = sum(c["insertados"] for c in conteos.values())
+        if total:
+            print(f">>> Índice de búsqueda inicializado: {total} documentos")
+
+
+def _inicializar_catalogo_errores():
+    # Siembra tipos_error y enlaza los errores anteriores al catálogo
+    from warehouse_mro.utils.catalogo_errores import sembrar_catalogo
+
+    enlazados = sembrar_catalogo(db.session.connection())
+    if enlazados:
+        print(f">>> Errores enlazados al catálogo: {enlazados}")
+
+
+def _inicializar_rollups_errores():
+    # Errores registrados antes de los acumulados por técnico / periodo
+    from warehouse_mro.models.technician_error import TechnicianError
+    from warehouse_mro.models.technician_rollup import TechnicianScore
+    from warehouse_mro.utils.rollups_errores import recalcular_rollups
+
+    if TechnicianScore.query.first() is None and TechnicianError.query.first() is not None:
+        tecnicos = recalcular_rollups(db.session.connection())
+        print(f">>> Acumulados de errores inicializados: {tecnicos} técnicos")
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+
+_workers_embebidos = []
+
+
+def _iniciar_workers_embebidos(app):
+    if _workers_embebidos:
+        return
+
+    from warehouse_mro.tasks.worker import iniciar_workers
+
+    _workers_embebidos.extend(
+        iniciar_workers(app.config["JOB_WORKERS"], app.config["JOB_POLL_SECONDS"])
+    )
+    print(f">>> Workers de trabajos iniciados: {len(_workers_embebidos)}")
+
+
 # =====================================================
 # EJECUTAR LOCAL
 # =====================================================
@@ -12,3 +12,32 @@ class Config:
     # Carpetas internas
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
     REPORT_FOLDER = os.path.join(BASE_DIR, "static", "reports")
+
+    # Cola de trabajos en segundo plano (tabla "jobs", sin broker externo).
+    # Los workers corren en su propio proceso (worker: del Procfile);
+    # JOBS_EMBEDDED=1 los levanta dentro de la app, solo para desarrollo local
+    JOBS_FOLDER = os.path.join(BASE_DIR, "reports", "jobs")
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+    JOBS_EMBEDDED = os.environ.get("JOBS_EMBEDDED", "0") == "1"
+    JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", 1.0))
+    # Sin latido por más de N segundos, un trabajo en_proceso vuelve a la cola
+    JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", 120))
+
+    # Reportes PDF ya generados, por clave de (tipo, parámetros, versión de datos)
+    REPORTS_CACHE_FOLDER = os.path.join(BASE_DIR, "reports", "cache")
+
+    # Snapshots de inventario: un keyframe completo cada N cargas, deltas entre medio
+    SNAPSHOT_KEYFRAME_CADA = int(os.environ.get("SNAPSHOT_KEYFRAME_CADA", 10))
+
+    # Alertas cerradas con más de N días pasan a alertas_archive
+    ALERTAS_ARCHIVO_DIAS = int(os.environ.get("ALERTAS_ARCHIVO_DIAS", 90))
+
+    # Dashboard: segundos que se reutilizan los KPIs (las escrituras los invalidan antes)
+    KPI_CACHE_SECONDS = float(os.environ.get("KPI_CACHE_SECONDS", 30))
+
+    # Etiquetas QR por lote: procesos del pool que genera los códigos (None = CPUs)
+    ETIQUETAS_PROCESOS = int(os.environ["ETIQUETAS_PROCESOS"]) if os.environ.get("ETIQUETAS_PROCESOS") else None
+
+    # Caché de imágenes QR en disco (además de la LRU en memoria).
+    # Vacío = instance/qr_cache, junto a las marcas de los otros cachés
+    QR_CACHE_FOLDER = os.environ.get("QR_CACHE_FOLDER")
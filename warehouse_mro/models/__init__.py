@@ -9,14 +9,20 @@ db = SQLAlchemy()
 
 from .user import User
 from .inventory import InventoryItem
+from .inventory_stock import InventoryStock
 from .bultos import Bulto
 from .post_registro import PostRegistro
-from .alerts import Alert
+from .alerts import Alert, AlertArchive
 from .alertas_ai import AlertaIA
+from .tipo_error import TipoError
 from .technician_error import TechnicianError
+from .technician_rollup import TechnicianScore, TechnicianErrorRollup
 from .equipos import Equipo
 from .productividad import Productividad
 from .auditoria import Auditoria
-from .inventory_history import InventoryHistory
+from .inventory_history import InventoryHistory, InventorySnapshot
 from .warehouse2d import WarehouseLocation
+from .location_summary import LocationSummary
 from .actividad import ActividadUsuario
+from .job import Job
+from .busqueda import IndiceBusqueda
@@ -3,12 +3,21 @@ from datetime import datetime
 
 class AlertaIA(db.Model):
     __tablename__ = "alertas_ai"
+    __table_args__ = (
+        # Una sola fila por huella: dos corridas a la vez no duplican la
+        # anomalía (la segunda inserción se descarta en la base)
+        db.Index("ux_alertas_ai_huella", "huella", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     categoria = db.Column(db.String(100), nullable=False)
     descripcion = db.Column(db.Text, nullable=False)
     nivel = db.Column(db.String(20), default="info")
-    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Huella (categoría, material, mes) para no repetir la misma anomalía
+    # en cada corrida (ver utils.anomalias_consumo)
+    huella = db.Column(db.String(40), nullable=True)
 
     def __repr__(self):
         return f"<AlertaIA {self.categoria} - {self.nivel}>"
@@ -4,6 +4,14 @@ import json
 
 class Alert(db.Model):
     __tablename__ = "alertas"
+    __table_args__ = (
+        # Dashboard: activas / por fecha
+        db.Index("ix_alertas_estado_fecha", "estado", "fecha"),
+        # Sincronización de alertas de stock (tipo + activas + huella)
+        db.Index("ix_alertas_tipo_estado_huella", "alert_type", "estado", "huella"),
+        # Listado paginado por (fecha, id) y archivo de cerradas antiguas
+        db.Index("ix_alertas_fecha_id", "fecha", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -37,6 +45,11 @@ class Alert(db.Model):
     # Fecha de creación
     fecha = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Huella (tipo, ubicación, material) para no duplicar alertas activas
+    # (ver utils.alertas_stock) y fecha en que se cerró sola
+    huella = db.Column(db.String(40), nullable=True)
+    cerrado_en = db.Column(db.DateTime, nullable=True)
+
     # Datos extras en JSON
     detalles = db.Column(db.Text, nullable=True)
 
@@ -69,3 +82,29 @@ class Alert(db.Model):
     def __repr__(self):
         return f"<Alerta {self.tipo or self.alert_type}>"
 
+
+
+class AlertArchive(db.Model):
+    """
+    Alertas cerradas antiguas movidas fuera de "alertas" (mismas
+    columnas y mismo id). Ver utils.archivo_alertas.
+    """
+    __tablename__ = "alertas_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    alert_type = db.Column(db.String(50), nullable=True)
+    tipo = db.Column(db.String(50), nullable=True)
+    message = db.Column(db.Text, nullable=True)
+    mensaje = db.Column(db.String(255), nullable=True)
+    severity = db.Column(db.String(20), nullable=True)
+    nivel = db.Column(db.String(20), nullable=True)
+    origen = db.Column(db.String(100), nullable=True)
+    usuario = db.Column(db.String(120), nullable=True)
+    estado = db.Column(db.String(20), nullable=True)
+    fecha = db.Column(db.DateTime, nullable=True, index=True)
+    detalles = db.Column(db.Text, nullable=True)
+    huella = db.Column(db.String(40), nullable=True)
+    cerrado_en = db.Column(db.DateTime, nullable=True)
+
+    archivado_en = db.Column(db.DateTime, default=datetime.utcnow)
@@ -16,7 +16,8 @@ class Bulto(db.Model):
 
     fecha_hora = db.Column(
         db.DateTime,
-        default=lambda: datetime.now(ZoneInfo("America/Lima"))
+        default=lambda: datetime.now(ZoneInfo("America/Lima")),
+        index=True
     )
 
     observacion = db.Column(db.String(255))
@@ -70,7 +71,8 @@ class PostRegistro(db.Model):
 
     fecha_registro = db.Column(
         db.DateTime,
-        default=lambda: datetime.now(ZoneInfo("America/Lima"))
+        default=lambda: datetime.now(ZoneInfo("America/Lima")),
+        index=True
     )
 
     def __repr__(self):
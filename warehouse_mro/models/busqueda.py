@@ -0,0 +1,29 @@
+from warehouse_mro.models import db
+from datetime import datetime
+
+class IndiceBusqueda(db.Model):
+    """
+    Documentos del buscador (material / ubicación / equipo).
+    En SQLite se indexan con FTS5 (tabla busqueda_fts, sincronizada por
+    triggers); en PostgreSQL con índices trigram. Ver utils.busqueda.
+    """
+    __tablename__ = "busqueda_indice"
+    __table_args__ = (
+        db.UniqueConstraint("origen", "clave", name="uq_busqueda_origen_clave"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # inventario / ubicacion / equipo
+    origen = db.Column(db.String(20), nullable=False)
+
+    # Clave dentro del origen (material|ubicación, código de equipo)
+    clave = db.Column(db.String(120), nullable=False)
+
+    material_code = db.Column(db.String(64), nullable=True)
+    material_text = db.Column(db.String(255), nullable=True)
+    ubicacion = db.Column(db.String(100), nullable=True)
+
+    stock = db.Column(db.Float, nullable=True)
+
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow)
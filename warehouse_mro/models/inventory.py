@@ -1,21 +1,34 @@
 from warehouse_mro.models import db
 from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.ext.hybrid import hybrid_property
 
 class InventoryItem(db.Model):
     __tablename__ = "inventory"
+    __table_args__ = (
+        # Agregación por clave (stock agregado, discrepancias, snapshots)
+        db.Index("ix_inventory_material_location", "material_code", "location"),
+        # Orden natural de ubicaciones (ver utils.excel.sort_location_advanced)
+        db.Index("ix_inventory_loc_orden", "loc_main", "loc_letters", "loc_last", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
     material_code = db.Column(db.String(50), nullable=False)
     material_text = db.Column(db.String(255), nullable=False)
     base_unit = db.Column(db.String(20), nullable=False)
-    location = db.Column(db.String(50), nullable=False)
+    location = db.Column(db.String(50), nullable=False, index=True)
+
+    # Clave de orden de la ubicación, calculada en la carga
+    loc_main = db.Column(db.Integer, nullable=True)
+    loc_letters = db.Column(db.String(50), nullable=True)
+    loc_last = db.Column(db.Integer, nullable=True)
 
     libre_utilizacion = db.Column(db.Float, default=0)
 
     creado_en = db.Column(db.DateTime, default=datetime.now)
 
-    @property
+    @hybrid_property
     def status(self):
         if self.libre_utilizacion <= 0:
             return "vacío"
@@ -24,3 +37,13 @@ class InventoryItem(db.Model):
         if self.libre_utilizacion <= 15:
             return "bajo"
         return "normal"
+
+    @status.expression
+    def status(cls):
+        libre = func.coalesce(cls.libre_utilizacion, 0)
+        return case(
+            (libre <= 0, "vacío"),
+            (libre <= 5, "crítico"),
+            (libre <= 15, "bajo"),
+            else_="normal",
+        )
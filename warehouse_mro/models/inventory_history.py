@@ -9,6 +9,11 @@ class InventoryHistory(db.Model):
     snapshot_id = db.Column(db.String(64), nullable=False, index=True)
     snapshot_name = db.Column(db.String(150), nullable=False)
 
+    # Codificación delta contra el snapshot anterior:
+    #   K = fila de keyframe (copia completa), I = insertada,
+    #   U = modificada, D = eliminada. NULL = snapshot antiguo (copia completa)
+    operacion = db.Column(db.String(1), nullable=True)
+
     material_code = db.Column(db.String(50), nullable=False)
     material_text = db.Column(db.String(255), nullable=False)
     base_unit = db.Column(db.String(20), nullable=False)
@@ -19,3 +24,29 @@ class InventoryHistory(db.Model):
 
     def __repr__(self):
         return f"<InventoryHistory {self.snapshot_name} - {self.material_code}>"
+
+
+class InventorySnapshot(db.Model):
+    __tablename__ = "inventory_snapshots"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    snapshot_id = db.Column(db.String(64), nullable=False, unique=True)
+    snapshot_name = db.Column(db.String(150), nullable=False)
+
+    # Orden de carga; la reconstrucción parte del keyframe anterior más cercano
+    secuencia = db.Column(db.Integer, nullable=False, unique=True)
+    es_keyframe = db.Column(db.Boolean, nullable=False, default=False)
+    base_snapshot_id = db.Column(db.String(64), nullable=True)
+
+    # Tamaño del snapshot y del delta escrito
+    filas_total = db.Column(db.Integer, nullable=False, default=0)
+    insertadas = db.Column(db.Integer, nullable=False, default=0)
+    modificadas = db.Column(db.Integer, nullable=False, default=0)
+    eliminadas = db.Column(db.Integer, nullable=False, default=0)
+
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        tipo = "K" if self.es_keyframe else "Δ"
+        return f"<InventorySnapshot {self.secuencia} {tipo} {self.snapshot_name}>"
@@ -0,0 +1,23 @@
+from warehouse_mro.models import db
+from datetime import datetime
+
+class InventoryStock(db.Model):
+    """
+    Stock del inventario activo agregado por (material_code, location).
+    Se recalcula en cada carga de inventario (utils.bulk_loader) y lo
+    leen las discrepancias y los snapshots en lugar de la tabla cruda.
+    """
+    __tablename__ = "inventory_stock"
+
+    material_code = db.Column(db.String(50), primary_key=True)
+    location = db.Column(db.String(50), primary_key=True)
+
+    material_text = db.Column(db.String(255), nullable=False)
+    base_unit = db.Column(db.String(20), nullable=False)
+
+    libre_utilizacion = db.Column(db.Float, nullable=False, default=0)
+
+    # Filas de "inventory" que suman a esta clave
+    items = db.Column(db.Integer, nullable=False, default=0)
+
+    actualizado_en = db.Column(db.DateTime, default=datetime.now)
@@ -0,0 +1,54 @@
+from warehouse_mro.models import db
+from datetime import datetime
+import json
+
+class Job(db.Model):
+    __tablename__ = "jobs"
+
+    # UUID del trabajo (se devuelve al usuario apenas se encola)
+    id = db.Column(db.String(36), primary_key=True)
+
+    # Tipo de tarea: inventory_upload, warehouse2d_upload, discrepancies,
+    # reporte_errores, reporte_usuario, archivar_alertas, anomalias_consumo,
+    # etiquetas_qr
+    tipo = db.Column(db.String(50), nullable=False)
+
+    # pendiente / en_proceso / completado / error
+    estado = db.Column(db.String(20), nullable=False, default="pendiente", index=True)
+
+    progreso = db.Column(db.Integer, nullable=False, default=0)
+    mensaje = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    # Parámetros de la tarea en JSON
+    parametros = db.Column(db.Text, nullable=True)
+
+    # Artefacto generado (ruta en disco + nombre de descarga)
+    resultado = db.Column(db.String(500), nullable=True)
+    resultado_nombre = db.Column(db.String(255), nullable=True)
+
+    usuario = db.Column(db.String(120), nullable=True)
+    worker = db.Column(db.String(64), nullable=True)
+
+    # Veces que un worker lo reclamó (tasks.jobs.recuperar_vencidos)
+    intentos = db.Column(db.Integer, nullable=True)
+
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    iniciado_en = db.Column(db.DateTime, nullable=True)
+    terminado_en = db.Column(db.DateTime, nullable=True)
+
+    def set_parametros(self, data: dict):
+        self.parametros = json.dumps(data)
+
+    def get_parametros(self):
+        try:
+            return json.loads(self.parametros) if self.parametros else {}
+        except:
+            return {}
+
+    @property
+    def terminado(self):
+        return self.estado in ("completado", "error")
+
+    def __repr__(self):
+        return f"<Job {self.tipo} {self.estado}>"
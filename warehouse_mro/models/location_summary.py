@@ -0,0 +1,23 @@
+from warehouse_mro.models import db
+from datetime import datetime
+
+class LocationSummary(db.Model):
+    """
+    Resumen por ubicación del layout 2D (lo que dibuja el mapa).
+    Se recalcula completo en cada carga del layout (utils.mapa2d).
+    """
+    __tablename__ = "location_summary"
+
+    ubicacion = db.Column(db.String(32), primary_key=True)
+
+    total_libre = db.Column(db.Float, nullable=False, default=0.0)
+    items = db.Column(db.Integer, nullable=False, default=0)
+
+    # Peor estado de la ubicación: vacío(0) < normal(1) < bajo(2) < crítico(3)
+    status = db.Column(db.String(16), nullable=False)
+    status_rank = db.Column(db.Integer, nullable=False, default=0)
+
+    # Posición según sort_location_advanced (orden del mapa)
+    orden = db.Column(db.Integer, nullable=False, index=True)
+
+    generado_en = db.Column(db.DateTime, default=datetime.utcnow)
@@ -12,6 +12,9 @@ class TechnicianError(db.Model):
     # Tipo de error (operativo, inventario, sistema, etc.)
     tipo_error = db.Column(db.String(120), nullable=False)
 
+    # Entrada del catálogo (costo y puntaje vigentes)
+    tipo_error_id = db.Column(db.Integer, db.ForeignKey("tipos_error.id"), nullable=True, index=True)
+
     # Nivel de gravedad (bajo, medio, alto)
     gravedad = db.Column(db.String(50), nullable=False)
 
@@ -25,8 +28,12 @@ class TechnicianError(db.Model):
     puntaje = db.Column(db.Integer, nullable=False, default=0)
 
     # Fecha del error
-    fecha_hora = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_hora = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     # Fecha de creación del registro (para el dashboard)
     creado_en = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Última modificación (también la ponen los UPDATE masivos del catálogo):
+    # versión del reporte PDF cacheado (utils.reportes)
+    actualizado_en = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+
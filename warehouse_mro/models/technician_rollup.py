@@ -0,0 +1,41 @@
+from warehouse_mro.models import db
+from datetime import datetime
+
+class TechnicianScore(db.Model):
+    """
+    Acumulado histórico por técnico (ranking de pérdidas).
+    Se actualiza en la misma transacción que cada TechnicianError
+    (ver utils.rollups_errores).
+    """
+    __tablename__ = "technician_scores"
+
+    tecnico = db.Column(db.String(120), primary_key=True)
+
+    errores = db.Column(db.Integer, nullable=False, default=0)
+    dinero_perdido = db.Column(db.Float, nullable=False, default=0.0, index=True)
+    puntaje = db.Column(db.Integer, nullable=False, default=0)
+
+    ultimo_error = db.Column(db.DateTime, nullable=True)
+
+
+class TechnicianErrorRollup(db.Model):
+    """
+    Errores agregados por periodo (dia / semana / mes) y técnico.
+    tecnico = "" es el total de todos los técnicos del periodo.
+    `inicio` es el primer día del periodo (lunes para la semana).
+    """
+    __tablename__ = "technician_error_rollups"
+    __table_args__ = (
+        # Series de un técnico (o del total) ordenadas por fecha
+        db.Index("ix_technician_error_rollups_serie", "periodo", "tecnico", "inicio"),
+    )
+
+    periodo = db.Column(db.String(10), primary_key=True)
+    inicio = db.Column(db.Date, primary_key=True)
+    tecnico = db.Column(db.String(120), primary_key=True, default="")
+
+    errores = db.Column(db.Integer, nullable=False, default=0)
+    dinero_perdido = db.Column(db.Float, nullable=False, default=0.0)
+    puntaje = db.Column(db.Integer, nullable=False, default=0)
+
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,23 @@
+from warehouse_mro.models import db
+from datetime import datetime
+
+class TipoError(db.Model):
+    """
+    Catálogo de tipos de error técnico con su costo y puntaje.
+    Lo lee new_error desde la caché de utils.catalogo_errores.
+    """
+    __tablename__ = "tipos_error"
+
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(120), nullable=False, unique=True)
+
+    dinero = db.Column(db.Float, nullable=False, default=0.0)
+    puntaje = db.Column(db.Integer, nullable=False, default=0)
+
+    # Los inactivos no se ofrecen al registrar, pero conservan su historial
+    activo = db.Column(db.Boolean, nullable=False, default=True)
+
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TipoError {self.nombre}>"
@@ -1,8 +1,14 @@
 from datetime import datetime
+from sqlalchemy import case
+from sqlalchemy.ext.hybrid import hybrid_property
 from warehouse_mro.models import db
 
 class WarehouseLocation(db.Model):
     __tablename__ = "warehouse_locations"
+    __table_args__ = (
+        # Orden natural de ubicaciones (ver utils.excel.sort_location_advanced)
+        db.Index("ix_warehouse_locations_loc_orden", "loc_main", "loc_letters", "loc_last", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -16,11 +22,20 @@ class WarehouseLocation(db.Model):
     stock_seguridad = db.Column(db.Float, nullable=False, default=0.0)
     stock_maximo = db.Column(db.Float, nullable=False, default=0.0)
     ubicacion = db.Column(db.String(32), nullable=False, index=True)
+
+    # Clave de orden de la ubicación, calculada en la carga
+    loc_main = db.Column(db.Integer, nullable=True)
+    loc_letters = db.Column(db.String(32), nullable=True)
+    loc_last = db.Column(db.Integer, nullable=True)
     libre_utilizacion = db.Column(db.Float, nullable=False, default=0.0)
 
+    # Hash de los valores cargados (utils.bulk_loader): la carga del
+    # layout solo reescribe las filas cuyo hash cambió
+    fila_hash = db.Column(db.BigInteger, nullable=True)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    @property
+    @hybrid_property
     def status(self) -> str:
 
         if self.libre_utilizacion <= 0:
@@ -36,3 +51,13 @@ class WarehouseLocation(db.Model):
             return "bajo"
         return "normal"
 
+    @status.expression
+    def status(cls):
+        # Mismo criterio en SQL: permite GROUP BY / filtros por estado
+        return case(
+            (cls.libre_utilizacion <= 0, "vacío"),
+            (cls.stock_maximo <= 0, "normal"),
+            (cls.libre_utilizacion < cls.stock_seguridad, "crítico"),
+            (cls.libre_utilizacion < cls.stock_maximo * 0.5, "bajo"),
+            else_="normal",
+        )
@@ -13,6 +13,8 @@ from warehouse_mro.routes.qr_routes import qr_bp
 from warehouse_mro.routes.auditoria_routes import auditoria_bp
 from warehouse_mro.routes.alertas_ai_routes import alertas_ai_bp
 from warehouse_mro.routes.admin_roles_routes import admin_roles_bp
+from warehouse_mro.routes.jobs_routes import jobs_bp
+from warehouse_mro.routes.busqueda_routes import busqueda_bp
 
 
 def register_blueprints(app):
@@ -59,4 +61,10 @@ def register_blueprints(app):
     app.register_blueprint(admin_roles_bp)
     print("👉 Cargado: roles")
 
+    app.register_blueprint(jobs_bp)
+    print("👉 Cargado: jobs")
+
+    app.register_blueprint(busqueda_bp)
+    print("👉 Cargado: busqueda")
+
     print("\n========== BLUEPRINTS CARGADOS OK ==========\n")
@@ -1,10 +1,14 @@
 # routes/alertas_ai_routes.py
 
-from flask import Blueprint, render_template
-from flask_login import login_required
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask_login import login_required, current_user
+from sqlalchemy import desc
 
 # Import correcto para Railway
 from warehouse_mro.models.alertas_ai import AlertaIA
+from warehouse_mro.utils.paginacion import paginar_request, quiere_json, respuesta_pagina
+from warehouse_mro.routes.jobs_routes import responder_job
+from warehouse_mro.tasks.jobs import encolar
 
 alertas_ai_bp = Blueprint("alertas_ai", __name__, url_prefix="/alertas-ai")
 
@@ -16,8 +20,18 @@ alertas_ai_bp = Blueprint("alertas_ai", __name__, url_prefix="/alertas-ai")
 @login_required
 def listado_ai():
 
-    # Obtener alertas reales desde la base de datos
-    alertas_bd = AlertaIA.query.order_by(AlertaIA.fecha.desc()).all()
+    # Obtener alertas reales desde la base de datos (una página)
+    pagina = paginar_request(AlertaIA.query, [desc(AlertaIA.fecha), desc(AlertaIA.id)])
+    alertas_bd = pagina.items
+
+    if quiere_json():
+        return respuesta_pagina(pagina, lambda a: {
+            "id": a.id,
+            "categoria": a.categoria,
+            "descripcion": a.descripcion,
+            "nivel": a.nivel,
+            "fecha": a.fecha.isoformat() if a.fecha else None,
+        })
 
     alertas = []
 
@@ -30,7 +44,7 @@ def listado_ai():
                 "nivel": a.nivel.capitalize(),
                 "fecha": a.fecha.strftime("%Y-%m-%d %H:%M")
             })
-    else:
+    elif not request.args.get("cursor"):
         # Datos de ejemplo temporales si la BD está vacía
         alertas = [
             {
@@ -54,4 +68,19 @@ def listado_ai():
         ]
 
     # Renderizar vista
-    return render_template("alertas_ai/listado_ai.html", alertas=alertas)
+    return render_template("alertas_ai/listado_ai.html", alertas=alertas, pagina=pagina)
+
+
+# ===========================================
+# ANÁLISIS DE CONSUMOS A DEMANDA
+# ===========================================
+# Además de la corrida nocturna (tasks/reportes.py)
+@alertas_ai_bp.route("/analizar", methods=["POST"])
+@login_required
+def analizar():
+    if current_user.role != "owner":
+        flash("No tienes permiso para analizar consumos.", "danger")
+        return redirect(url_for("alertas_ai.listado_ai"))
+
+    job = encolar("anomalias_consumo", {}, usuario=current_user.username)
+    return responder_job(job, "Analizando consumos de todos los materiales.")
@@ -1,11 +1,58 @@
-from flask import Blueprint, render_template
-from flask_login import login_required
+from flask import Blueprint, render_template, flash, redirect, url_for, request, Response, stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import desc
 from warehouse_mro.models import Alert   # ← IMPORT CORREGIDO
+from warehouse_mro.utils.paginacion import paginar_request, quiere_json, respuesta_pagina
+from warehouse_mro.routes.jobs_routes import responder_job
+from warehouse_mro.utils.alertas_feed import stream_alertas
 
 alerts_bp = Blueprint("alerts", __name__, url_prefix="/alerts")
 
 @alerts_bp.route("/")
 @login_required
 def list_alerts():
-    alerts = Alert.query.order_by(Alert.fecha.desc()).all()
-    return render_template("alerts/list.html", alerts=alerts)
+    pagina = paginar_request(Alert.query, [desc(Alert.fecha), desc(Alert.id)])
+
+    if quiere_json():
+        return respuesta_pagina(pagina, _alerta_json)
+
+    return render_template("alerts/list.html", alerts=pagina.items, pagina=pagina)
+
+
+def _alerta_json(a):
+    return {
+        "id": a.id,
+        "alert_type": a.alert_type,
+        "message": a.message,
+        "severity": a.severity,
+        "estado": a.estado,
+        "fecha": a.fecha.isoformat() if a.fecha else None,
+    }
+
+
+# Archivo manual de alertas cerradas antiguas (además del automático
+# tras cada carga del layout 2D)
+@alerts_bp.route("/archivar", methods=["POST"])
+@login_required
+def archivar():
+    from warehouse_mro.utils.archivo_alertas import encolar_archivo_alertas
+
+    if current_user.role != "owner":
+        flash("No tienes permiso para archivar alertas.", "danger")
+        return redirect(url_for("alerts.list_alerts"))
+
+    job = encolar_archivo_alertas(current_user.username)
+    return responder_job(job, "Archivando alertas cerradas.")
+
+
+# Feed en tiempo real (SSE) de alertas y alertas IA nuevas. EventSource
+# reenvía el último id al reconectar y se reanuda desde ahí.
+@alerts_bp.route("/stream")
+@login_required
+def stream():
+    ultimo_id = request.headers.get("Last-Event-ID") or request.args.get("ultimo")
+
+    resp = Response(stream_with_context(stream_alertas(ultimo_id)), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
@@ -1,6 +1,6 @@
 from flask import (
     Blueprint, render_template, request, redirect,
-    url_for, flash, current_app, send_file, session
+    url_for, flash, current_app, session
 )
 from flask_login import (
     login_user, logout_user, login_required,
@@ -200,21 +200,14 @@ def reportes_usuario():
 @auth_bp.route("/descargar-datos")
 @login_required
 def descargar_datos_gerencia():
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
-
-    reports_folder = os.path.join(current_app.root_path, "static", "reports")
-    os.makedirs(reports_folder, exist_ok=True)
-
-    pdf_path = os.path.join(reports_folder, f"perfil_usuario_{current_user.id}.pdf")
-
-    c = canvas.Canvas(pdf_path, pagesize=letter)
-    c.setFont("Helvetica-Bold", 20)
-    c.drawString(40, 750, "Reporte de Usuario – Nivel Gerencia")
-    c.setFont("Helvetica", 12)
-    c.drawString(40, 720, f"Usuario: {current_user.username}")
-    c.drawString(40, 700, f"Correo: {current_user.email}")
-    c.drawString(40, 680, f"Fecha: {datetime.utcnow()}")
-
-    c.save()
-    return send_file(pdf_path, as_attachment=True)
+    # utils.pdf_report en la cola; se reutiliza si los datos no cambiaron
+    from warehouse_mro.utils.reportes import solicitar_reporte
+    from warehouse_mro.routes.jobs_routes import responder_reporte
+
+    job = solicitar_reporte(
+        "reporte_usuario",
+        {"user_id": current_user.id},
+        usuario=current_user.username,
+        destino=url_for("auth.reportes_usuario"),
+    )
+    return responder_reporte(job, "Reporte PDF en preparación.")
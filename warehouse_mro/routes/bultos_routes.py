@@ -4,13 +4,18 @@ from flask_login import login_required, current_user
 # IMPORTS CORRECTOS PARA RAILWAY
 from warehouse_mro.models.bultos import Bulto, PostRegistro
 from warehouse_mro.models import db
+from warehouse_mro.utils.kpis import invalidar_kpis
+from warehouse_mro.utils.paginacion import paginar_request, quiere_json, respuesta_pagina
 
-from datetime import datetime
+from datetime import datetime, date
 from zoneinfo import ZoneInfo
+from sqlalchemy import func, desc
 import calendar
 
 bultos_bp = Blueprint("bultos", __name__, url_prefix="/bultos")
 
+BULTOS_POR_PAGINA = 50
+
 
 # =====================================================================
 #   REGISTRO DE BULTOS (FORMULARIO)
@@ -39,6 +44,7 @@ def new_bulto():
 
         db.session.add(nuevo_bulto)
         db.session.commit()
+        invalidar_kpis()
 
         flash("Bulto registrado correctamente.", "success")
         return redirect(url_for("bultos.new_bulto"))
@@ -46,6 +52,13 @@ def new_bulto():
     return render_template("bultos/form_bulto.html")
 
 
+def _fecha(valor):
+    # func.date: str 'YYYY-MM-DD' en SQLite, date en PostgreSQL
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(str(valor)[:10], "%Y-%m-%d").date()
+
+
 # =====================================================================
 #   LISTA + KPIs + GRÁFICAS
 # =====================================================================
@@ -77,25 +90,35 @@ def list_bultos():
         except:
             pass
 
-    bultos = query.order_by(Bulto.fecha_hora.asc()).all()
+    # Totales por día en SQL; semana y mes se arman sobre esos días
+    por_dia = (
+        query.with_entities(
+            func.date(Bulto.fecha_hora).label("dia"),
+            func.sum(Bulto.cantidad),
+        )
+        .group_by(func.date(Bulto.fecha_hora))
+        .order_by(func.date(Bulto.fecha_hora))
+        .all()
+    )
+    por_dia = [(_fecha(d), int(cant or 0)) for d, cant in por_dia if d is not None]
 
-    total_bultos = sum(b.cantidad for b in bultos)
+    total_bultos = sum(cant for _, cant in por_dia)
     hoy = datetime.now(ZoneInfo("America/Lima")).date()
-    bultos_hoy = sum(b.cantidad for b in bultos if b.fecha_hora.date() == hoy)
-    total_trailers = len({b.placa for b in bultos})
+    bultos_hoy = sum(cant for d, cant in por_dia if d == hoy)
+    total_trailers = query.with_entities(func.count(func.distinct(Bulto.placa))).scalar() or 0
 
     graf_dia = {}
-    for b in bultos:
-        d = b.fecha_hora.strftime("%d-%m")
-        graf_dia[d] = graf_dia.get(d, 0) + b.cantidad
+    for d, cant in por_dia:
+        k = d.strftime("%d-%m")
+        graf_dia[k] = graf_dia.get(k, 0) + cant
 
     dias = list(graf_dia.keys())
     bultos_dias = list(graf_dia.values())
 
     graf_sem = {}
-    for b in bultos:
-        w = b.fecha_hora.isocalendar().week
-        graf_sem[w] = graf_sem.get(w, 0) + b.cantidad
+    for d, cant in por_dia:
+        w = d.isocalendar().week
+        graf_sem[w] = graf_sem.get(w, 0) + cant
 
     semanas = [f"Semana {w}" for w in graf_sem.keys()]
     bultos_sem = list(graf_sem.values())
@@ -103,19 +126,26 @@ def list_bultos():
     semanas_totales = len(semanas)
 
     graf_mes = {}
-    for b in bultos:
-        m = b.fecha_hora.month
-        graf_mes[m] = graf_mes.get(m, 0) + b.cantidad
+    for d, cant in por_dia:
+        graf_mes[d.month] = graf_mes.get(d.month, 0) + cant
 
     meses = [calendar.month_name[m] for m in graf_mes.keys()]
     bultos_mes = list(graf_mes.values())
 
+    # Listado paginado (los gráficos ya no dependen de cargar las filas)
+    pagina = query.order_by(Bulto.fecha_hora.desc(), Bulto.id.desc()).paginate(
+        page=request.args.get("page", 1, type=int),
+        per_page=BULTOS_POR_PAGINA,
+        error_out=False,
+    )
+
     inconsistencias_mes = [0] * len(meses)
     faltante_mes = [0] * len(meses)
 
     return render_template(
         "bultos/list.html",
-        bultos=bultos,
+        bultos=pagina.items,
+        pagina=pagina,
         total_bultos=total_bultos,
         bultos_hoy=bultos_hoy,
         total_trailers=total_trailers,
@@ -138,8 +168,18 @@ def list_bultos():
 @bultos_bp.route("/contar")
 @login_required
 def contar_bultos():
-    bultos = Bulto.query.order_by(Bulto.fecha_hora.desc()).all()
-    return render_template("bultos/contar_bultos.html", bultos=bultos)
+    pagina = paginar_request(Bulto.query, [desc(Bulto.fecha_hora), desc(Bulto.id)])
+
+    if quiere_json():
+        return respuesta_pagina(pagina, lambda b: {
+            "id": b.id,
+            "chofer": b.chofer,
+            "placa": b.placa,
+            "cantidad": b.cantidad,
+            "fecha_hora": b.fecha_hora.isoformat() if b.fecha_hora else None,
+        })
+
+    return render_template("bultos/contar_bultos.html", bultos=pagina.items, pagina=pagina)
 
 
 # =====================================================================
@@ -182,6 +222,21 @@ def post_registro(bulto_id):
 @login_required
 def historial_post():
 
-    historial = PostRegistro.query.order_by(PostRegistro.fecha_registro.desc()).all()
+    pagina = paginar_request(
+        PostRegistro.query,
+        [desc(PostRegistro.fecha_registro), desc(PostRegistro.id)],
+    )
 
-    return render_template("bultos/historial_post.html", historial=historial)
+    if quiere_json():
+        return respuesta_pagina(pagina, lambda r: {
+            "id": r.id,
+            "bulto_id": r.bulto_id,
+            "cantidad_sistema": r.cantidad_sistema,
+            "cantidad_real": r.cantidad_real,
+            "diferencia": r.diferencia,
+            "observacion": r.observacion,
+            "registrado_por": r.registrado_por,
+            "fecha_registro": r.fecha_registro.isoformat() if r.fecha_registro else None,
+        })
+
+    return render_template("bultos/historial_post.html", historial=pagina.items, pagina=pagina)
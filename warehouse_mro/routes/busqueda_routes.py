@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+
+from warehouse_mro.utils.busqueda import buscar, motor_busqueda
+
+busqueda_bp = Blueprint("busqueda", __name__, url_prefix="/busqueda")
+
+
+# =====================================================
+# TYPEAHEAD (JSON)
+# =====================================================
+# /busqueda/typeahead?q=torn&limite=10&origen=inventario
+
+@busqueda_bp.route("/typeahead")
+@login_required
+def typeahead():
+    q = request.args.get("q", "")
+
+    resultados = buscar(
+        q,
+        limite=request.args.get("limite", 10, type=int),
+        origen=request.args.get("origen") or None,
+    )
+
+    return jsonify({
+        "q": q,
+        "motor": motor_busqueda(),
+        "resultados": resultados,
+    })
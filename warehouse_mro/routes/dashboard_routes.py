@@ -1,15 +1,8 @@
 from flask import Blueprint, render_template
 from flask_login import login_required
-from sqlalchemy import func
-from datetime import date
 
 # IMPORTS CORRECTOS PARA RAILWAY
-from warehouse_mro.models.inventory import InventoryItem
-from warehouse_mro.models.bultos import Bulto
-from warehouse_mro.models.alerts import Alert
-from warehouse_mro.models.warehouse2d import WarehouseLocation
-from warehouse_mro.models.technician_error import TechnicianError
-from warehouse_mro.models.equipos import Equipo
+from warehouse_mro.utils.kpis import obtener_kpis
 
 dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/dashboard")
 
@@ -18,92 +11,7 @@ dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/dashboard")
 @login_required
 def dashboard():
 
-    # KPI PRINCIPALES
-    total_stock = InventoryItem.query.count()
+    # KPIs calculados en utils.kpis (caché con TTL, invalidada por las escrituras)
+    kpis = obtener_kpis()
 
-    bultos_hoy = Bulto.query.filter(
-        func.date(Bulto.fecha_hora) == date.today()
-    ).count()
-
-    alertas_activas = Alert.query.filter(
-        Alert.estado == "activo"
-    ).count()
-
-    errores_hoy = TechnicianError.query.filter(
-        func.date(TechnicianError.creado_en) == date.today()
-    ).count()
-
-    # ESTADOS DEL INVENTARIO
-    ubicaciones = WarehouseLocation.query.all()
-
-    criticos = sum(1 for i in ubicaciones if i.status == "crítico")
-    bajos = sum(1 for i in ubicaciones if i.status == "bajo")
-    normales = sum(1 for i in ubicaciones if i.status == "normal")
-    vacios = sum(1 for i in ubicaciones if i.status == "vacío")
-
-    # ALERTAS POR DÍA
-    alertas_por_dia = (
-        Alert.query.with_entities(
-            func.strftime("%w", Alert.fecha),
-            func.count(Alert.id)
-        )
-        .group_by(func.strftime("%w", Alert.fecha))
-        .all()
-    )
-
-    alertas_dias = [0] * 7
-    for dia, cant in alertas_por_dia:
-        alertas_dias[int(dia)] = cant
-
-    # BULTOS POR HORA
-    bultos_por_hora = (
-        Bulto.query.with_entities(
-            func.strftime("%H", Bulto.fecha_hora),
-            func.count(Bulto.id)
-        )
-        .group_by(func.strftime("%H", Bulto.fecha_hora))
-        .all()
-    )
-
-    horas = {str(h).zfill(2): 0 for h in range(6, 18)}
-    for h, cant in bultos_por_hora:
-        if h in horas:
-            horas[h] = cant
-
-    # PRODUCTIVIDAD / EQUIPOS
-    equipos = Equipo.query.all()
-
-    if not equipos:
-        prod_labels = []
-        prod_values = []
-        estado_labels = []
-        estado_values = []
-    else:
-        prod_labels = [e.codigo for e in equipos]
-        prod_values = [getattr(e, "productividad", 0) or 0 for e in equipos]
-
-        estados = {}
-        for e in equipos:
-            estado = getattr(e, "estado", "Sin estado") or "Sin estado"
-            estados[estado] = estados.get(estado, 0) + 1
-
-        estado_labels = list(estados.keys())
-        estado_values = list(estados.values())
-
-    return render_template(
-        "dashboard.html",
-        total_stock=total_stock,
-        bultos_hoy=bultos_hoy,
-        alertas_activas=alertas_activas,
-        errores_hoy=errores_hoy,
-        criticos=criticos,
-        bajos=bajos,
-        normales=normales,
-        vacios=vacios,
-        alertas_dias=alertas_dias,
-        horas_bultos=horas,
-        prod_labels=prod_labels,
-        prod_values=prod_values,
-        estado_labels=estado_labels,
-        estado_values=estado_values
-    )
+    return render_template("dashboard.html", **kpis)
@@ -2,6 +2,8 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from models import db
 from models.equipos import Equipo
+from warehouse_mro.utils.kpis import invalidar_kpis
+from warehouse_mro.utils.busqueda import indexar_equipos
 
 equipos_bp = Blueprint("equipos", __name__, url_prefix="/equipos")
 
@@ -27,7 +29,10 @@ def nuevo():
 
         nuevo = Equipo(codigo=codigo, descripcion=descripcion, area=area)
         db.session.add(nuevo)
+        db.session.flush()
+        indexar_equipos(db.session.connection())
         db.session.commit()
+        invalidar_kpis()
 
         flash("Equipo registrado correctamente.", "success")
         return redirect(url_for("equipos.lista"))
@@ -1,6 +1,4 @@
-import uuid
 from datetime import datetime
-import pandas as pd
 
 from flask import (
     Blueprint,
@@ -9,23 +7,29 @@ from flask import (
     redirect,
     url_for,
     flash,
+    jsonify,
     send_file,
+    abort,
 )
 from flask_login import login_required
 
 # 📌 IMPORTS CORREGIDOS PARA RAILWAY
-from warehouse_mro.models import db
 from warehouse_mro.models.inventory import InventoryItem
-from warehouse_mro.models.inventory_history import InventoryHistory
+from warehouse_mro.models.inventory_history import InventoryHistory, InventorySnapshot
 
 from warehouse_mro.utils.excel import (
-    load_inventory_excel,
-    sort_location_advanced,
+    validar_inventory_excel,
     generate_discrepancies_excel,
 )
+from warehouse_mro.utils.snapshots import comparar_snapshots
+from warehouse_mro.utils.paginacion import MAX_POR_PAGINA, paginar_request, quiere_json, respuesta_pagina
+from warehouse_mro.routes.jobs_routes import encolar_subida, responder_job
 
 inventory_bp = Blueprint("inventory", __name__, url_prefix="/inventory")
 
+# Comparación de snapshots: tope de "top_movers" por consulta
+TOP_MAX = 200
+
 
 # =====================================================
 # CARGA DE INVENTARIO BASE
@@ -42,44 +46,17 @@ def upload_inventory():
             flash("Debes seleccionar un archivo Excel.", "warning")
             return redirect(url_for("inventory.upload_inventory"))
 
+        # Validar encabezados antes de encolar (respuesta inmediata al usuario)
         try:
-            df = load_inventory_excel(file)
+            validar_inventory_excel(file)
         except Exception as e:
             flash(f"Error procesando el archivo: {str(e)}", "danger")
             return redirect(url_for("inventory.upload_inventory"))
 
-        InventoryItem.query.delete()
-        db.session.commit()
-
-        for _, row in df.iterrows():
-            item = InventoryItem(
-                material_code=row["Código del Material"],
-                material_text=row["Texto breve de material"],
-                base_unit=row["Unidad de medida base"],
-                location=row["Ubicación"],
-                libre_utilizacion=row["Libre utilización"],
-            )
-            db.session.add(item)
-
-        snapshot_id = str(uuid.uuid4())
-        snapshot_name = f"Inventario {datetime.now():%d/%m/%Y %H:%M}"
-
-        for _, row in df.iterrows():
-            hist = InventoryHistory(
-                snapshot_id=snapshot_id,
-                snapshot_name=snapshot_name,
-                material_code=row["Código del Material"],
-                material_text=row["Texto breve de material"],
-                base_unit=row["Unidad de medida base"],
-                location=row["Ubicación"],
-                libre_utilizacion=row["Libre utilización"],
-            )
-            db.session.add(hist)
-
-        db.session.commit()
-
-        flash("Inventario cargado correctamente.", "success")
-        return redirect(url_for("inventory.list_inventory"))
+        job = encolar_subida("inventory_upload", file, {
+            "destino": url_for("inventory.list_inventory"),
+        })
+        return responder_job(job, "Inventario en proceso de carga.")
 
     return render_template("inventory/upload.html")
 
@@ -92,10 +69,32 @@ def upload_inventory():
 @login_required
 def list_inventory():
 
-    items = InventoryItem.query.all()
-    items_sorted = sorted(items, key=lambda x: sort_location_advanced(x.location))
+    pagina = paginar_request(
+        InventoryItem.query,
+        [
+            InventoryItem.loc_main,
+            InventoryItem.loc_letters,
+            InventoryItem.loc_last,
+            InventoryItem.id,
+        ],
+    )
+
+    if quiere_json():
+        return respuesta_pagina(pagina, _item_json)
+
+    return render_template("inventory/list.html", items=pagina.items, pagina=pagina)
 
-    return render_template("inventory/list.html", items=items_sorted)
+
+def _item_json(item):
+    return {
+        "id": item.id,
+        "material_code": item.material_code,
+        "material_text": item.material_text,
+        "base_unit": item.base_unit,
+        "location": item.location,
+        "libre_utilizacion": item.libre_utilizacion,
+        "status": item.status,
+    }
 
 
 # =====================================================
@@ -113,61 +112,88 @@ def discrepancies():
             return redirect(url_for("inventory.discrepancies"))
 
         try:
-            df = load_inventory_excel(file)
+            validar_inventory_excel(file)
         except Exception as e:
             flash(f"Error leyendo archivo: {str(e)}", "danger")
             return redirect(url_for("inventory.discrepancies"))
 
-        df["Código del Material"] = df["Código del Material"].astype(str)
-        df["Ubicación"] = df["Ubicación"].astype(str)
-
-        sistema = pd.read_sql(
-            db.session.query(
-                InventoryItem.material_code.label("Código Material"),
-                InventoryItem.material_text.label("Descripción"),
-                InventoryItem.base_unit.label("Unidad"),
-                InventoryItem.location.label("Ubicación"),
-                db.func.sum(InventoryItem.libre_utilizacion).label("Stock sistema"),
-            ).statement,
-            db.session.bind
-        )
+        job = encolar_subida("discrepancies", file, {
+            "destino": url_for("inventory.discrepancies"),
+            "descarga": f"discrepancias_{datetime.now():%Y%m%d_%H%M}.xlsx",
+        })
+        return responder_job(job, "Discrepancias en proceso.")
 
-        conteo = df.groupby(
-            ["Código del Material", "Ubicación"], as_index=False
-        )["Libre utilización"].sum()
+    return render_template("inventory/discrepancies.html")
 
-        conteo = conteo.rename(columns={
-            "Código del Material": "Código Material",
-            "Libre utilización": "Stock contado"
-        })
 
-        merged = sistema.merge(conteo, on=["Código Material", "Ubicación"], how="outer")
+# =====================================================
+# SNAPSHOTS HISTÓRICOS
+# =====================================================
 
-        merged["Stock sistema"] = merged["Stock sistema"].fillna(0)
-        merged["Stock contado"] = merged["Stock contado"].fillna(0)
-        merged["Diferencia"] = merged["Stock contado"] - merged["Stock sistema"]
+@inventory_bp.route("/snapshots")
+@login_required
+def list_snapshots():
+
+    snapshots = InventorySnapshot.query.order_by(InventorySnapshot.secuencia.desc()).all()
+
+    return jsonify([
+        {
+            "snapshot_id": s.snapshot_id,
+            "snapshot_name": s.snapshot_name,
+            "secuencia": s.secuencia,
+            "keyframe": s.es_keyframe,
+            "filas": s.filas_total,
+            "insertadas": s.insertadas,
+            "modificadas": s.modificadas,
+            "eliminadas": s.eliminadas,
+            "creado_en": s.creado_en.isoformat() if s.creado_en else None,
+        }
+        for s in snapshots
+    ])
+
+
+def _snapshot_existe(snapshot_id):
+    return (
+        InventorySnapshot.query.filter_by(snapshot_id=snapshot_id).first() is not None
+        or InventoryHistory.query.filter_by(snapshot_id=snapshot_id).first() is not None
+    )
+
+
+@inventory_bp.route("/snapshots/compare")
+@login_required
+def compare_snapshots():
+
+    a = request.args.get("a", "").strip()
+    b = request.args.get("b", "").strip()
 
-        estados = []
-        for _, r in merged.iterrows():
-            d = r["Diferencia"]
-            if d == 0:
-                estado = "OK"
-            elif d < 0:
-                estado = "CRÍTICO" if d <= -10 else "FALTA"
-            else:
-                estado = "SOBRA"
-            estados.append(estado)
+    if not a or not b:
+        return jsonify({"error": "Debe indicar los snapshots a y b."}), 400
+    if not _snapshot_existe(a) or not _snapshot_existe(b):
+        abort(404)
 
-        merged["Estado"] = estados
+    # Acotados: `top` es parte de la clave de la caché de comparaciones
+    top = max(1, min(request.args.get("top", 20, type=int), TOP_MAX))
+    limite = max(1, min(request.args.get("limite", MAX_POR_PAGINA, type=int), MAX_POR_PAGINA))
 
-        excel = generate_discrepancies_excel(merged)
-        fname = f"discrepancias_{datetime.now():%Y%m%d_%H%M}.xlsx"
+    resultado = comparar_snapshots(a, b, top)
 
+    if request.args.get("formato") == "xlsx":
+        excel = generate_discrepancies_excel(resultado["diff"])
         return send_file(
             excel,
             as_attachment=True,
-            download_name=fname,
+            download_name=f"comparacion_snapshots_{datetime.now():%Y%m%d_%H%M}.xlsx",
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
 
-    return render_template("inventory/discrepancies.html")
+    diff = resultado["diff"]
+
+    return jsonify({
+        "a": a,
+        "b": b,
+        "resumen": resultado["resumen"],
+        "por_ubicacion": resultado["por_ubicacion"].to_dict("records"),
+        "top_movers": resultado["top_movers"].to_dict("records"),
+        "total_diff": int(len(diff)),
+        "diff": diff.head(limite).to_dict("records"),
+    })
@@ -0,0 +1,134 @@
+from flask import (
+    Blueprint,
+    render_template,
+    request,
+    redirect,
+    url_for,
+    flash,
+    jsonify,
+    send_file,
+    abort,
+)
+from flask_login import login_required, current_user
+import os
+
+from warehouse_mro.models.job import Job
+from warehouse_mro.tasks import handlers  # noqa: F401  (registra las tareas)
+from warehouse_mro.tasks.jobs import encolar, leer_progreso, ruta_job, nuevo_job_id
+
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+# =====================================================
+# HELPERS PARA LAS RUTAS QUE ENCOLAN
+# =====================================================
+
+def _quiere_json():
+    mejor = request.accept_mimetypes.best_match(["application/json", "text/html"])
+    return request.is_json or mejor == "application/json"
+
+
+def guardar_subida(file, job_id):
+    """Guarda el archivo subido en disco para que lo procese el worker."""
+    nombre = file.filename or ""
+    extension = "." + nombre.rsplit(".", 1)[-1].lower() if "." in nombre else ""
+    ruta = ruta_job(job_id, f".input{extension}")
+    file.stream.seek(0)
+    file.save(ruta)
+    return ruta, nombre
+
+
+def encolar_subida(tipo, file, parametros=None):
+    job_id = nuevo_job_id()
+    ruta, nombre = guardar_subida(file, job_id)
+
+    params = {"archivo": ruta, "nombre": nombre}
+    params.update(parametros or {})
+
+    return encolar(tipo, params, usuario=current_user.username, job_id=job_id)
+
+
+def responder_job(job, mensaje="Trabajo en proceso."):
+    """202 + id en JSON, o redirección a la página de seguimiento."""
+    if _quiere_json():
+        return jsonify({
+            "job_id": job.id,
+            "estado": job.estado,
+            "status_url": url_for("jobs.estado_job", job_id=job.id),
+        }), 202
+
+    flash(f"{mensaje} ID: {job.id}", "info")
+    return redirect(url_for("jobs.ver_job", job_id=job.id))
+
+
+def _enviar_resultado(job):
+    # conditional: ETag / Last-Modified del archivo y soporte de Range
+    return send_file(
+        job.resultado,
+        as_attachment=True,
+        download_name=job.resultado_nombre or None,
+        conditional=True,
+    )
+
+
+def responder_reporte(job, mensaje="Reporte en preparación."):
+    """El artefacto si ya está generado; si no, igual que responder_job."""
+    if job.estado == "completado" and job.resultado and os.path.exists(job.resultado):
+        return _enviar_resultado(job)
+    return responder_job(job, mensaje)
+
+
+# =====================================================
+# ESTADO DEL TRABAJO
+# =====================================================
+
+def _puede_ver(job):
+    if current_user.role == "owner" or job.usuario == current_user.username:
+        return True
+
+    # Reportes cacheados (utils.reportes): un mismo trabajo sirve a todos
+    # los que piden ese reporte; el de perfil, solo a su usuario
+    params = job.get_parametros()
+    if "clave" in params:
+        return params.get("user_id", current_user.id) == current_user.id
+    return False
+
+
+def _job_visible(job_id):
+    """El trabajo si el usuario actual puede verlo; si no, 404 (no revela que existe)."""
+    job = Job.query.get_or_404(job_id)
+    if not _puede_ver(job):
+        abort(404)
+    return job
+
+
+@jobs_bp.route("/<job_id>")
+@login_required
+def estado_job(job_id):
+    job = _job_visible(job_id)
+
+    data = leer_progreso(job)
+    if job.resultado:
+        data["resultado_url"] = url_for("jobs.resultado_job", job_id=job.id)
+
+    return jsonify(data)
+
+
+@jobs_bp.route("/<job_id>/ver")
+@login_required
+def ver_job(job_id):
+    job = _job_visible(job_id)
+    destino = job.get_parametros().get("destino")
+    return render_template("jobs/estado.html", job=job, destino=destino)
+
+
+@jobs_bp.route("/<job_id>/resultado")
+@login_required
+def resultado_job(job_id):
+    job = _job_visible(job_id)
+
+    # El artefacto pudo haberse podado (utils.reportes) o borrado a mano
+    if job.estado != "completado" or not job.resultado or not os.path.exists(job.resultado):
+        abort(404)
+
+    return _enviar_resultado(job)
@@ -1,7 +1,9 @@
-from flask import Blueprint, render_template, request, send_file
-from flask_login import login_required
-import qrcode
-import io
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask_login import login_required, current_user
+
+from warehouse_mro.utils.qr_cache import qr_png, respuesta_qr
+from warehouse_mro.routes.jobs_routes import responder_job
+from warehouse_mro.tasks.jobs import encolar
 
 qr_bp = Blueprint("qr", __name__, url_prefix="/qr")
 
@@ -12,26 +14,44 @@ def vista_qr():
     return render_template("qr/vista_qr.html")
 
 
-@qr_bp.route("/generar", methods=["POST"])
+# GET /qr/generar?data=... deja que el navegador revalide con ETag (304);
+# POST se mantiene para los formularios existentes
+@qr_bp.route("/generar", methods=["GET", "POST"])
 @login_required
 def generar_qr():
 
-    data = request.form.get("data", "")
+    data = request.values.get("data", "")
     if data.strip() == "":
         data = "SIN-DATO"
 
-    qr = qrcode.QRCode(box_size=8, border=2)
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-
-    buffer = io.BytesIO()
-    img.save(buffer, "PNG")
-    buffer.seek(0)
-
-    return send_file(
-        buffer,
-        mimetype="image/png",
-        as_attachment=True,
-        download_name="qr.png"
-    )
+    png, clave = qr_png(data, box_size=8, border=2)
+    return respuesta_qr(png, clave, download_name="qr.png")
+
+
+# =====================================================
+# ETIQUETAS POR LOTE (PDF MULTI-ETIQUETA)
+# =====================================================
+# modo=ubicaciones: desde / hasta (rango en orden natural)
+# modo=materiales: lista de códigos (uno por línea o separados por coma)
+# El PDF se arma en la cola de trabajos (tarea "etiquetas_qr")
+
+@qr_bp.route("/etiquetas", methods=["POST"])
+@login_required
+def generar_etiquetas():
+    modo = request.form.get("modo", "ubicaciones")
+
+    if modo == "materiales":
+        codigos = request.form.get("materiales", "").replace(",", "\n").splitlines()
+        parametros = {"modo": "materiales", "materiales": [c.strip() for c in codigos if c.strip()]}
+        vacio = not parametros["materiales"]
+    else:
+        desde = request.form.get("desde", "").strip()
+        parametros = {"modo": "ubicaciones", "desde": desde, "hasta": request.form.get("hasta", "").strip()}
+        vacio = not desde
+
+    if vacio:
+        flash("Indica un rango de ubicaciones o una lista de materiales.", "warning")
+        return redirect(url_for("qr.vista_qr"))
+
+    job = encolar("etiquetas_qr", parametros, usuario=current_user.username)
+    return responder_job(job, "Generando etiquetas QR.")
@@ -1,15 +1,22 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort
 from flask_login import login_required, current_user
 
 # ✔ IMPORTS CORREGIDOS PARA RAILWAY
 from warehouse_mro.models import db
 from warehouse_mro.models.technician_error import TechnicianError
+from warehouse_mro.utils.kpis import invalidar_kpis
+from warehouse_mro.utils.rollups_errores import acumular_error, ranking_tecnicos, serie_errores, recalcular_rollups, PERIODOS
+from warehouse_mro.utils.catalogo_errores import (
+    buscar_tipo, tipos_activos, invalidar_catalogo, recalcular_costos,
+)
+from warehouse_mro.models.tipo_error import TipoError
+from warehouse_mro.utils.paginacion import paginar_request, quiere_json, respuesta_pagina
 
 from datetime import datetime
-from sqlalchemy import func
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-import os
+from sqlalchemy import desc
+
+from warehouse_mro.utils.reportes import solicitar_reporte
+from warehouse_mro.routes.jobs_routes import responder_reporte
 
 
 technician_errors_bp = Blueprint(
@@ -31,27 +38,20 @@ def new_error():
         observacion = request.form["observacion"]
 
         # -----------------------------
-        # SISTEMA DE COSTOS AUTOMÁTICOS
+        # SISTEMA DE COSTOS AUTOMÁTICOS (catálogo tipos_error)
         # -----------------------------
-        costos = {
-            "Error en codificación": {"dinero": 150, "puntaje": 10},
-            "Error en registro SAP": {"dinero": 300, "puntaje": 20},
-            "Error en ubicación de material": {"dinero": 500, "puntaje": 40},
-            "Error en conteo físico": {"dinero": 200, "puntaje": 15},
-            "Error en despacho": {"dinero": 450, "puntaje": 35},
-            "Error administrativo": {"dinero": 100, "puntaje": 5},
-        }
-
-        if tipo_error not in costos:
+        tipo = buscar_tipo(tipo_error)
+        if tipo is None:
             flash("Tipo de error desconocido.", "danger")
             return redirect(url_for("technician_errors.new_error"))
 
-        dinero_perdido = costos[tipo_error]["dinero"]
-        puntaje = costos[tipo_error]["puntaje"]
+        dinero_perdido = tipo["dinero"]
+        puntaje = tipo["puntaje"]
 
         nuevo = TechnicianError(
             tecnico=tecnico,
             tipo_error=tipo_error,
+            tipo_error_id=tipo["id"],
             gravedad=gravedad,
             observacion=observacion,
             fecha_hora=datetime.now(),
@@ -61,12 +61,78 @@ def new_error():
         )
 
         db.session.add(nuevo)
+        acumular_error(db.session.connection(), tecnico, nuevo.fecha_hora, dinero_perdido, puntaje)
         db.session.commit()
+        invalidar_kpis()
 
         flash("Error registrado exitosamente.", "success")
         return redirect(url_for("technician_errors.list_errors"))
 
-    return render_template("technician_errors/form_new.html")
+    return render_template("technician_errors/form_new.html", tipos=tipos_activos())
+
+
+# ---------------------------------------------------------
+# CATÁLOGO DE TIPOS DE ERROR (SOLO OWNER)
+# ---------------------------------------------------------
+def _solo_owner():
+    return current_user.is_authenticated and current_user.role == "owner"
+
+
+@technician_errors_bp.route("/tipos", methods=["GET", "POST"])
+@login_required
+def catalogo_tipos():
+    if not _solo_owner():
+        flash("No tienes permiso para editar el catálogo de errores.", "danger")
+        return redirect(url_for("technician_errors.list_errors"))
+
+    if request.method == "POST":
+        tipo_id = request.form.get("id", type=int)
+        nombre = request.form.get("nombre", "").strip()
+        dinero = request.form.get("dinero", type=float)
+        puntaje = request.form.get("puntaje", type=int)
+        activo = request.form.get("activo") == "1"
+
+        if dinero is None or puntaje is None or dinero < 0 or puntaje < 0:
+            flash("Costo y puntaje deben ser números positivos.", "danger")
+            return redirect(url_for("technician_errors.catalogo_tipos"))
+
+        if tipo_id:
+            tipo = TipoError.query.get_or_404(tipo_id)
+        else:
+            if not nombre or TipoError.query.filter_by(nombre=nombre).first():
+                flash("Nombre vacío o ya registrado.", "danger")
+                return redirect(url_for("technician_errors.catalogo_tipos"))
+            tipo = TipoError(nombre=nombre)
+            db.session.add(tipo)
+
+        cambio_costo = tipo.id is not None and (tipo.dinero != dinero or tipo.puntaje != puntaje)
+
+        tipo.dinero = dinero
+        tipo.puntaje = puntaje
+        tipo.activo = activo
+        tipo.actualizado_en = datetime.utcnow()
+        db.session.flush()
+
+        filas = 0
+        if cambio_costo and request.form.get("recalcular") == "1":
+            # Historial con el costo nuevo: un UPDATE y los acumulados de nuevo
+            conn = db.session.connection()
+            filas = recalcular_costos(conn, tipo.id)
+            recalcular_rollups(conn)
+
+        db.session.commit()
+        invalidar_catalogo()
+        if filas:
+            invalidar_kpis()
+
+        mensaje = f"Tipo '{tipo.nombre}' guardado."
+        if filas:
+            mensaje += f" {filas} errores recalculados."
+        flash(mensaje, "success")
+        return redirect(url_for("technician_errors.catalogo_tipos"))
+
+    tipos = TipoError.query.order_by(TipoError.nombre).all()
+    return render_template("technician_errors/tipos.html", tipos=tipos)
 
 # ---------------------------------------------------------
 # LISTA + ESTADÍSTICAS
@@ -74,82 +140,82 @@ def new_error():
 @technician_errors_bp.route("/list")
 @login_required
 def list_errors():
-    errores = TechnicianError.query.order_by(
-        TechnicianError.fecha_hora.desc()
-    ).all()
-
-    ranking = (
-        db.session.query(
-            TechnicianError.tecnico,
-            func.sum(TechnicianError.dinero_perdido)
-        )
-        .group_by(TechnicianError.tecnico)
-        .order_by(func.sum(TechnicianError.dinero_perdido).desc())
-        .all()
+    pagina = paginar_request(
+        TechnicianError.query,
+        [desc(TechnicianError.fecha_hora), desc(TechnicianError.id)],
     )
-    ranking_dict = {r[0]: float(r[1]) for r in ranking}
 
-    graf_raw = (
-        db.session.query(
-            func.date(TechnicianError.fecha_hora),
-            func.sum(TechnicianError.dinero_perdido)
-        )
-        .group_by(func.date(TechnicianError.fecha_hora))
-        .order_by(func.date(TechnicianError.fecha_hora))
-        .all()
-    )
-    graf_por_dia = {str(r[0]): float(r[1]) for r in graf_raw}
+    if quiere_json():
+        return respuesta_pagina(pagina, lambda e: {
+            "id": e.id,
+            "tecnico": e.tecnico,
+            "tipo_error": e.tipo_error,
+            "gravedad": e.gravedad,
+            "observacion": e.observacion,
+            "dinero_perdido": e.dinero_perdido,
+            "puntaje": e.puntaje,
+            "fecha_hora": e.fecha_hora.isoformat() if e.fecha_hora else None,
+        })
+
+    # Desde los acumulados (utils.rollups_errores), no desde technician_errors
+    ranking_dict = ranking_tecnicos()
+    graf_por_dia = serie_errores("dia")
 
     return render_template(
         "technician_errors/form_list.html",
-        errores=errores,
+        errores=pagina.items,
+        pagina=pagina,
         ranking=ranking_dict,
         graf_por_dia=graf_por_dia
     )
 
 # ---------------------------------------------------------
-# REPORTE PDF (NUEVO)
+# TENDENCIAS (JSON): ?periodo=dia|semana|mes&tecnico=...
 # ---------------------------------------------------------
-@technician_errors_bp.route("/reporte_pdf")
+@technician_errors_bp.route("/tendencias")
 @login_required
-def reporte_pdf():
-
-    errores = TechnicianError.query.order_by(TechnicianError.fecha_hora.desc()).all()
-
-    pdf_path = "reporte_errores.pdf"
-
-    c = canvas.Canvas(pdf_path, pagesize=letter)
-    width, height = letter
-
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(50, height - 50, "Reporte de Errores Técnicos - SIDERPERU")
-
-    c.setFont("Helvetica", 12)
-    c.drawString(50, height - 80, f"Generado por: {current_user.username}")
-    c.drawString(50, height - 100, f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-    y = height - 140
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(50, y, "Técnico")
-    c.drawString(200, y, "Tipo")
-    c.drawString(350, y, "S/ Perdido")
-    c.drawString(450, y, "Puntaje")
-    y -= 20
+def tendencias():
+    periodo = request.args.get("periodo", "semana")
+    if periodo not in PERIODOS:
+        abort(400)
 
-    c.setFont("Helvetica", 10)
+    tecnico = request.args.get("tecnico", "").strip()
 
-    for e in errores:
-        if y < 50:
-            c.showPage()
-            y = height - 50
+    return jsonify({
+        "periodo": periodo,
+        "tecnico": tecnico or None,
+        "dinero_perdido": serie_errores(periodo, tecnico),
+        "errores": serie_errores(periodo, tecnico, "errores"),
+    })
 
-        c.drawString(50, y, str(e.tecnico))
-        c.drawString(200, y, str(e.tipo_error))
-        c.drawString(350, y, f"S/ {e.dinero_perdido:.2f}")
-        c.drawString(450, y, str(e.puntaje))
-
-        y -= 18
-
-    c.save()
+# ---------------------------------------------------------
+# REPORTE PDF (NUEVO)
+# ---------------------------------------------------------
+@technician_errors_bp.route("/reporte_pdf")
+@login_required
+def reporte_pdf():
 
-    return send_file(pdf_path, as_attachment=True)
+    # Filtros opcionales: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&tecnico=...
+    filtros = {}
+    for campo in ("desde", "hasta"):
+        valor = request.args.get(campo, "").strip()
+        if valor:
+            try:
+                datetime.strptime(valor, "%Y-%m-%d")
+            except ValueError:
+                flash(f"Fecha inválida en '{campo}' (use AAAA-MM-DD).", "danger")
+                return redirect(url_for("technician_errors.list_errors"))
+            filtros[campo] = valor
+
+    tecnico = request.args.get("tecnico", "").strip()
+    if tecnico:
+        filtros["tecnico"] = tecnico
+
+    # La clave son solo los filtros: el mismo PDF sirve a todos los usuarios
+    job = solicitar_reporte(
+        "reporte_errores",
+        filtros,
+        usuario=current_user.username,
+        destino=url_for("technician_errors.list_errors"),
+    )
+    return responder_reporte(job, "Reporte PDF en preparación.")
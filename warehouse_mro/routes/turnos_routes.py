@@ -1,13 +1,13 @@
-from flask import Blueprint, jsonify, send_file
+from flask import Blueprint, jsonify
 from flask_login import current_user
 
 # ✔ IMPORTS CORREGIDOS PARA RAILWAY
 from warehouse_mro.models.turnos import RegistroTurno
 from warehouse_mro.models import db
 
+from warehouse_mro.utils.qr_cache import qr_png, respuesta_qr
+
 from datetime import date
-import qrcode
-import io
 
 turno_bp = Blueprint("turno", __name__, url_prefix="/turno")
 
@@ -41,8 +41,5 @@ def registrar_turno(modulo):
 
 @turno_bp.route("/qr/<codigo>")
 def qr(codigo):
-    buffer = io.BytesIO()
-    img = qrcode.make(f"https://tuapp/material/{codigo}")
-    img.save(buffer, "PNG")
-    buffer.seek(0)
-    return send_file(buffer, mimetype="image/png")
+    png, clave = qr_png(f"https://tuapp/material/{codigo}")
+    return respuesta_qr(png, clave)
@@ -1,6 +1,3 @@
-from datetime import datetime
-import pandas as pd
-
 from flask import (
     Blueprint,
     render_template,
@@ -9,27 +6,19 @@ from flask import (
     url_for,
     flash,
     jsonify,
+    current_app,
 )
 from flask_login import login_required, current_user
 
 # ✅ IMPORTS CORREGIDOS PARA RAILWAY
-from warehouse_mro.models import db
 from warehouse_mro.models.warehouse2d import WarehouseLocation
-from warehouse_mro.models.alerts import Alert
-from warehouse_mro.utils.excel import load_warehouse2d_excel, sort_location_advanced
+from warehouse_mro.utils.excel import validar_warehouse2d_excel
+from warehouse_mro.utils.mapa2d import datos_mapa, version_resumen
+from warehouse_mro.routes.jobs_routes import encolar_subida, responder_job
 
 warehouse2d_bp = Blueprint("warehouse2d", __name__, url_prefix="/warehouse2d")
 
 
-# Ranking de severidad
-STATUS_RANK = {
-    "vacío": 0,
-    "normal": 1,
-    "bajo": 2,
-    "crítico": 3,
-}
-
-
 # =====================================================================================
 #                            CARGA DEL EXCEL 2D  (ARREGLADO)
 # =====================================================================================
@@ -51,7 +40,7 @@ def upload_warehouse2d():
             return redirect(url_for("warehouse2d.upload_warehouse2d"))
 
         try:
-            df = load_warehouse2d_excel(file)
+            validar_warehouse2d_excel(file)
         except ValueError as e:
             flash(str(e), "danger")
             return redirect(url_for("warehouse2d.upload_warehouse2d"))
@@ -59,55 +48,10 @@ def upload_warehouse2d():
             flash("Error al procesar el archivo 2D. Revise formato y columnas.", "danger")
             return redirect(url_for("warehouse2d.upload_warehouse2d"))
 
-        # 🔥 Limpiamos la tabla antes de cargar nuevo layout
-        WarehouseLocation.query.delete()
-        db.session.commit()
-
-        # ---------------------------------------------
-        # Insertar datos del Excel
-        # ---------------------------------------------
-        for _, row in df.iterrows():
-
-            cod = str(row.get("Código del Material", "")).strip()
-            desc = str(row.get("Texto breve de material", "")).strip()
-            umb = str(row.get("Unidad de medida base", "")).strip()
-            ubi = str(row.get("Ubicación", "")).strip()
-
-            seg = float(row.get("Stock de seguridad", 0) or 0)
-            maxi = float(row.get("Stock máximo", 0) or 0)
-            libre = float(row.get("Libre utilización", 0) or 0)
-
-            item = WarehouseLocation(
-                material_code=cod,
-                material_text=desc,
-                base_unit=umb,
-                ubicacion=ubi,
-                stock_seguridad=seg,
-                stock_maximo=maxi,
-                libre_utilizacion=libre,
-            )
-
-            db.session.add(item)
-
-            # VERIFICAR ESTADO
-            estado = item.status  # Según modelo
-
-            if estado == "crítico":
-                mensaje = (
-                    f"Stock crítico en {ubi}: {cod} ({desc}) "
-                    f"Libre={libre}, Seguridad={seg}"
-                )
-                alerta = Alert(
-                    alert_type="stock_critico_2d",
-                    message=mensaje,
-                    severity="Alta",
-                )
-                db.session.add(alerta)
-
-        db.session.commit()
-
-        flash("El layout 2D fue cargado correctamente.", "success")
-        return redirect(url_for("warehouse2d.map_view"))
+        job = encolar_subida("warehouse2d_upload", file, {
+            "destino": url_for("warehouse2d.map_view"),
+        })
+        return responder_job(job, "El layout 2D se está cargando.")
 
     return render_template("warehouse2d/upload.html")
 
@@ -130,39 +74,18 @@ def map_view():
 @login_required
 def map_data():
 
-    items = WarehouseLocation.query.all()
-    por_ubicacion = {}
-
-    for item in items:
-        loc = item.ubicacion or "SIN UBICACIÓN"
-        estado_item = item.status
-
-        if loc not in por_ubicacion:
-            por_ubicacion[loc] = {
-                "location": loc,
-                "total_libre": 0.0,
-                "items": 0,
-                "status": estado_item,
-                "rank": STATUS_RANK.get(estado_item, 0),
-            }
-
-        por_ubicacion[loc]["total_libre"] += float(item.libre_utilizacion or 0)
-        por_ubicacion[loc]["items"] += 1
-
-        rank = STATUS_RANK.get(estado_item, 0)
-        if rank > por_ubicacion[loc]["rank"]:
-            por_ubicacion[loc]["rank"] = rank
-            por_ubicacion[loc]["status"] = estado_item
-
-    data_sorted = sorted(
-        por_ubicacion.values(),
-        key=lambda x: sort_location_advanced(x["location"])
-    )
-
-    for d in data_sorted:
-        d.pop("rank", None)
-
-    return jsonify(data_sorted)
+    # Resumen precalculado en la carga del layout (utils.mapa2d).
+    # Si el cliente ya tiene esta versión, 304 sin tocar la tabla.
+    etag = version_resumen()
+    if etag in request.if_none_match:
+        resp = current_app.response_class(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    resp = jsonify(datos_mapa())
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp.make_conditional(request)
 
 
 # =====================================================================================
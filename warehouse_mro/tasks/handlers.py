@@ -0,0 +1,215 @@
+import os
+
+from flask import current_app
+
+from warehouse_mro.tasks.jobs import tarea, ruta_job
+from warehouse_mro.utils.excel import (
+    contar_filas,
+    iter_inventory_excel,
+    iter_warehouse2d_excel,
+    load_inventory_excel,
+    generate_discrepancies_excel,
+)
+from warehouse_mro.utils.bulk_loader import cargar_inventario, cargar_layout_2d
+from warehouse_mro.utils.discrepancias import calcular_discrepancias
+from warehouse_mro.utils.reporte_errores import generar_reporte_errores
+from warehouse_mro.utils.pdf_report import create_pdf_reporte
+from warehouse_mro.utils.reportes import publicar_artefacto
+from warehouse_mro.utils.archivo_alertas import archivar_alertas, encolar_archivo_alertas
+from warehouse_mro.utils.anomalias_consumo import detectar_anomalias_consumo
+from warehouse_mro.utils.etiquetas import MAX_ETIQUETAS, POR_HOJA, seleccionar_etiquetas, escribir_hojas
+
+# =====================================================
+# TAREAS EN SEGUNDO PLANO
+# =====================================================
+# Parámetros comunes:
+#   archivo: ruta del archivo subido (se elimina al terminar)
+#   nombre:  nombre original (para detectar csv / xls)
+
+
+class _ArchivoSubido:
+    """Archivo en disco con el nombre original (como un FileStorage)."""
+
+    def __init__(self, ruta, nombre):
+        self.stream = open(ruta, "rb")
+        self.filename = nombre
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stream.close()
+
+
+def _avance(progreso, total, texto, inicio=5, fin=95):
+    """
+    Callback `(hechos)` para los cargadores: reparte hechos / total entre
+    `inicio` y `fin`. Sin total conocido solo actualiza el mensaje.
+    """
+    def reportar(hechos):
+        valor = inicio + (fin - inicio) * min(hechos / total, 1) if total else inicio
+        progreso(int(valor), texto.format(hechos))
+    return reportar
+
+
+def _eliminar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+@tarea("inventory_upload")
+def tarea_inventory_upload(job, progreso):
+    params = job.get_parametros()
+    progreso(5, "Leyendo archivo")
+
+    try:
+        with _ArchivoSubido(params["archivo"], params.get("nombre", "")) as archivo:
+            total = contar_filas(archivo)
+            stats = cargar_inventario(
+                iter_inventory_excel(archivo),
+                progreso=_avance(progreso, total, "{} filas procesadas"),
+            )
+    finally:
+        _eliminar(params["archivo"])
+
+    return {
+        "mensaje": (
+            f"Inventario cargado: {stats['filas']} filas "
+            f"({stats['filas_por_segundo']} filas/s)"
+        ),
+    }
+
+
+@tarea("warehouse2d_upload")
+def tarea_warehouse2d_upload(job, progreso):
+    params = job.get_parametros()
+    progreso(5, "Leyendo archivo")
+
+    try:
+        with _ArchivoSubido(params["archivo"], params.get("nombre", "")) as archivo:
+            total = contar_filas(archivo)
+            filas = cargar_layout_2d(
+                iter_warehouse2d_excel(archivo),
+                progreso=_avance(progreso, total, "{} filas procesadas"),
+            )
+    finally:
+        _eliminar(params["archivo"])
+
+    # La carga cierra alertas: se archivan las cerradas antiguas (una vez al día)
+    encolar_archivo_alertas(job.usuario)
+
+    return {"mensaje": f"Layout 2D cargado: {filas} filas"}
+
+
+@tarea("archivar_alertas")
+def tarea_archivar_alertas(job, progreso):
+    dias = job.get_parametros().get("dias", current_app.config.get("ALERTAS_ARCHIVO_DIAS", 90))
+    progreso(5, f"Archivando alertas cerradas hace más de {dias} días")
+
+    movidas = archivar_alertas(
+        dias,
+        progreso=lambda n, total: _avance(progreso, total, "{} alertas archivadas")(n),
+    )
+
+    return {"mensaje": f"Alertas archivadas: {movidas}"}
+
+
+@tarea("anomalias_consumo")
+def tarea_anomalias_consumo(job, progreso):
+    stats = detectar_anomalias_consumo(progreso=progreso)
+
+    return {
+        "mensaje": (
+            f"Consumo analizado: {stats['materiales']} materiales, "
+            f"{stats['anomalias']} anomalías ({stats['nuevas']} nuevas)"
+        ),
+    }
+
+
+@tarea("discrepancies")
+def tarea_discrepancies(job, progreso):
+    params = job.get_parametros()
+    progreso(5, "Leyendo conteo físico")
+
+    try:
+        with _ArchivoSubido(params["archivo"], params.get("nombre", "")) as archivo:
+            df = load_inventory_excel(archivo)
+    finally:
+        _eliminar(params["archivo"])
+
+    progreso(40, "Comparando contra el sistema")
+    merged = calcular_discrepancias(df)
+
+    progreso(70, "Generando Excel")
+    excel = generate_discrepancies_excel(merged)
+
+    salida = ruta_job(job.id, ".xlsx")
+    with open(salida, "wb") as f:
+        f.write(excel.getbuffer())
+
+    return {
+        "mensaje": f"Discrepancias generadas: {len(merged)} filas",
+        "resultado": salida,
+        "resultado_nombre": params.get("descarga", "discrepancias.xlsx"),
+    }
+
+
+@tarea("reporte_errores")
+def tarea_reporte_errores(job, progreso):
+    params = job.get_parametros()
+    progreso(10, "Generando PDF")
+
+    temporal = ruta_job(job.id, ".pdf.tmp")
+    generar_reporte_errores(
+        temporal,
+        desde=params.get("desde"),
+        hasta=params.get("hasta"),
+        tecnico=params.get("tecnico"),
+    )
+
+    return {
+        "mensaje": "Reporte generado",
+        "resultado": publicar_artefacto(temporal, params["clave"]),
+        "resultado_nombre": "reporte_errores.pdf",
+    }
+
+
+@tarea("etiquetas_qr")
+def tarea_etiquetas_qr(job, progreso):
+    progreso(5, "Seleccionando etiquetas")
+    etiquetas, nombre, recortado = seleccionar_etiquetas(job.get_parametros())
+    if not etiquetas:
+        raise ValueError("No hay ubicaciones o materiales para esa selección.")
+
+    progreso(15, f"Generando {len(etiquetas)} etiquetas")
+    ruta = ruta_job(job.id, ".pdf")
+    hojas = escribir_hojas(
+        ruta,
+        etiquetas,
+        current_app.config.get("ETIQUETAS_PROCESOS"),
+        progreso=_avance(progreso, -(-len(etiquetas) // POR_HOJA), "{} hojas dibujadas", inicio=15),
+    )
+
+    mensaje = f"Etiquetas generadas: {len(etiquetas)} en {hojas} hojas"
+    if recortado:
+        mensaje += f" (la selección tenía más: se limitó a {MAX_ETIQUETAS}, acota el rango)"
+
+    return {"mensaje": mensaje, "resultado": ruta, "resultado_nombre": nombre}
+
+
+@tarea("reporte_usuario")
+def tarea_reporte_usuario(job, progreso):
+    params = job.get_parametros()
+    progreso(10, "Generando PDF")
+
+    temporal = ruta_job(job.id, ".pdf.tmp")
+    if create_pdf_reporte(params["user_id"], temporal) is None:
+        raise ValueError("Usuario no encontrado")
+
+    return {
+        "mensaje": "Reporte generado",
+        "resultado": publicar_artefacto(temporal, params["clave"]),
+        "resultado_nombre": f"perfil_usuario_{params['user_id']}.pdf",
+    }
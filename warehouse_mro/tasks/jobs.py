@@ -0,0 +1,279 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, update
+
+from warehouse_mro.models import db
+from warehouse_mro.models.job import Job
+
+# =====================================================
+# COLA DE TRABAJOS (TABLA "jobs")
+# =====================================================
+
+# tipo → función(job, progreso) que retorna dict opcional:
+#   {"mensaje": str, "resultado": ruta, "resultado_nombre": str}
+TAREAS = {}
+
+
+def tarea(tipo):
+    """Registra la función que procesa los trabajos de `tipo`."""
+    def decorator(func):
+        TAREAS[tipo] = func
+        return func
+    return decorator
+
+
+def carpeta_jobs():
+    carpeta = current_app.config["JOBS_FOLDER"]
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+def ruta_job(job_id, extension):
+    """Ruta única en disco para archivos del trabajo (entrada o resultado)."""
+    return os.path.join(carpeta_jobs(), f"{job_id}{extension}")
+
+
+def nuevo_job_id():
+    return str(uuid.uuid4())
+
+
+def encolar(tipo, parametros=None, usuario=None, job_id=None):
+    if tipo not in TAREAS:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+
+    job = Job(
+        id=job_id or nuevo_job_id(),
+        tipo=tipo,
+        estado="pendiente",
+        progreso=0,
+        mensaje="En cola",
+        usuario=usuario,
+    )
+    job.set_parametros(parametros or {})
+
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+# =====================================================
+# PROGRESO (ARCHIVO LATERAL)
+# =====================================================
+# Mientras la tarea escribe dentro de su propia transacción, SQLite no
+# admite otro escritor: el avance se publica en un JSON junto al trabajo
+# y se consolida en la tabla al terminar.
+
+def _ruta_progreso(job_id):
+    return ruta_job(job_id, ".progress.json")
+
+
+def publicar_progreso(job_id, progreso, mensaje=None):
+    ruta = _ruta_progreso(job_id)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"progreso": int(progreso), "mensaje": mensaje}, f)
+    os.replace(temporal, ruta)
+
+
+def leer_progreso(job):
+    """Estado del trabajo para mostrar (tabla + avance en curso)."""
+    progreso, mensaje = job.progreso, job.mensaje
+
+    if job.estado == "en_proceso":
+        try:
+            with open(_ruta_progreso(job.id), encoding="utf-8") as f:
+                data = json.load(f)
+            progreso = data.get("progreso", progreso)
+            mensaje = data.get("mensaje") or mensaje
+        except (OSError, ValueError):
+            pass
+
+    return {
+        "id": job.id,
+        "tipo": job.tipo,
+        "estado": job.estado,
+        "progreso": progreso,
+        "mensaje": mensaje,
+        "error": job.error,
+        "terminado": job.terminado,
+        "tiene_resultado": bool(job.resultado),
+        "creado_en": job.creado_en.isoformat() if job.creado_en else None,
+        "terminado_en": job.terminado_en.isoformat() if job.terminado_en else None,
+    }
+
+
+# =====================================================
+# LATIDO (LEASE) DE LOS TRABAJOS EN PROCESO
+# =====================================================
+# Mientras corre la tarea, un hilo del worker toca <job>.latido cada
+# LATIDO_SEGUNDOS (archivo lateral, como el progreso: la transacción de
+# la tarea bloquea la tabla en SQLite). Un trabajo en_proceso sin latido
+# por más de JOB_LEASE_SECONDS es de un worker caído: vuelve a la cola,
+# o queda en error tras MAX_INTENTOS.
+
+LATIDO_SEGUNDOS = 15
+LEASE_SEGUNDOS = 120
+MAX_INTENTOS = 3
+
+_ultima_revision = {"t": 0.0}
+
+
+def _ruta_latido(job_id):
+    return ruta_job(job_id, ".latido")
+
+
+def _latir(ruta, detener):
+    # Corre fuera del app context: recibe la ruta ya resuelta
+    while True:
+        try:
+            with open(ruta, "a"):
+                pass
+            os.utime(ruta, None)
+        except OSError:
+            pass
+        if detener.wait(LATIDO_SEGUNDOS):
+            return
+
+
+def _ultimo_latido(job):
+    try:
+        return datetime.utcfromtimestamp(os.stat(_ruta_latido(job.id)).st_mtime)
+    except OSError:
+        return job.iniciado_en
+
+
+def recuperar_vencidos(lease=None):
+    """
+    Devuelve a la cola los trabajos en_proceso cuyo latido venció.
+    Retorna cuántos se recuperaron (o se marcaron en error).
+    """
+    lease = lease or current_app.config.get("JOB_LEASE_SECONDS", LEASE_SEGUNDOS)
+    limite = datetime.utcnow() - timedelta(seconds=lease)
+
+    recuperados = 0
+    for job in Job.query.filter(Job.estado == "en_proceso").all():
+        ultimo = _ultimo_latido(job)
+        if ultimo is not None and ultimo >= limite:
+            continue
+
+        agotado = (job.intentos or 0) >= MAX_INTENTOS
+        valores = (
+            {"estado": "error", "mensaje": "Error", "terminado_en": datetime.utcnow(),
+             "error": f"El worker se detuvo {job.intentos} veces procesando este trabajo."}
+            if agotado else
+            {"estado": "pendiente", "worker": None, "iniciado_en": None,
+             "mensaje": "En cola (reintento tras caída del worker)"}
+        )
+
+        # Condicionado al worker visto: si otro ya lo retomó, no se toca
+        res = db.session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.estado == "en_proceso", Job.worker == job.worker)
+            .values(**valores)
+        )
+        recuperados += res.rowcount
+        print(f"✖ Trabajo {job.id} ({job.tipo}) sin latido desde {ultimo}: "
+              f"{'error' if agotado else 'reencolado'}")
+
+    db.session.commit()
+    return recuperados
+
+
+# =====================================================
+# CONSUMO DE LA COLA (WORKERS)
+# =====================================================
+
+def tomar_siguiente(worker, intentos=5):
+    """
+    Reclama el trabajo pendiente más antiguo. El UPDATE condicionado a
+    estado='pendiente' garantiza que solo un worker lo obtenga.
+    """
+    # Cada LATIDO_SEGUNDOS se revisan los trabajos de workers caídos
+    ahora = time.monotonic()
+    if ahora - _ultima_revision["t"] >= LATIDO_SEGUNDOS:
+        _ultima_revision["t"] = ahora
+        recuperar_vencidos()
+
+    for _ in range(intentos):
+        candidato = (
+            db.session.query(Job.id)
+            .filter(Job.estado == "pendiente")
+            .order_by(Job.creado_en)
+            .first()
+        )
+        if candidato is None:
+            db.session.rollback()
+            return None
+
+        res = db.session.execute(
+            update(Job)
+            .where(Job.id == candidato.id, Job.estado == "pendiente")
+            .values(
+                estado="en_proceso",
+                worker=worker,
+                iniciado_en=datetime.utcnow(),
+                mensaje="Procesando",
+                intentos=func.coalesce(Job.intentos, 0) + 1,
+            )
+        )
+        db.session.commit()
+
+        if res.rowcount == 1:
+            return db.session.get(Job, candidato.id)
+
+    return None
+
+
+def ejecutar(job):
+    func = TAREAS.get(job.tipo)
+    job_id = job.id
+
+    def progreso(valor, mensaje=None):
+        publicar_progreso(job_id, valor, mensaje)
+
+    detener = threading.Event()
+    latido = threading.Thread(
+        target=_latir, args=(_ruta_latido(job_id), detener), name=f"latido-{job_id}", daemon=True
+    )
+    latido.start()
+
+    try:
+        if func is None:
+            raise ValueError(f"Tipo de trabajo desconocido: {job.tipo}")
+
+        salida = func(job, progreso) or {}
+
+        job = db.session.get(Job, job_id)
+        job.estado = "completado"
+        job.progreso = 100
+        job.mensaje = salida.get("mensaje", "Completado")
+        job.resultado = salida.get("resultado")
+        job.resultado_nombre = salida.get("resultado_nombre")
+    except Exception as e:
+        db.session.rollback()
+        traceback.print_exc()
+
+        job = db.session.get(Job, job_id)
+        job.estado = "error"
+        job.mensaje = "Error"
+        job.error = str(e)
+
+    job.terminado_en = datetime.utcnow()
+    db.session.commit()
+
+    detener.set()
+    latido.join()
+    for ruta in (_ruta_progreso(job_id), _ruta_latido(job_id)):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+    return job
@@ -1,14 +1,42 @@
+import os
 import schedule
 import time
-from utils.pdf_report import create_pdf_reporte
+from warehouse_mro.models.user import User
+from warehouse_mro.utils.reportes import solicitar_reporte
+from warehouse_mro.utils.anomalias_consumo import encolar_deteccion_anomalias
 
-def tarea_diaria():
-    print("Enviando reporte diario…")
-    create_pdf_reporte()
+# Uso:  python -m warehouse_mro.tasks.reportes   (proceso "clock" del Procfile)
 
-def run_scheduler():
-    schedule.every().day.at("07:00").do(tarea_diaria)
+def tarea_diaria(app):
+    # Reporte PDF de cada owner, generado en los workers y dejado en la
+    # caché de artefactos: /descargar-datos lo entrega sin esperar
+    with app.app_context():
+        for user in User.query.filter_by(role="owner").all():
+            job = solicitar_reporte("reporte_usuario", {"user_id": user.id}, usuario=user.username)
+            print(f"Reporte diario de {user.username}: {job.id} ({job.estado})")
+
+def tarea_anomalias(app):
+    # El análisis corre en los workers; aquí solo se encola (una vez por día)
+    with app.app_context():
+        job = encolar_deteccion_anomalias("sistema")
+        print(f"Análisis de consumos encolado: {job.id}")
+
+def run_scheduler(app=None):
+    if app is None:
+        from warehouse_mro.app import create_app
+        app = create_app()
+
+    schedule.every().day.at("07:00").do(tarea_diaria, app)
+    schedule.every().day.at("02:00").do(tarea_anomalias, app)
 
     while True:
         schedule.run_pending()
         time.sleep(1)
+
+
+if __name__ == "__main__":
+    # El planificador no levanta workers propios
+    os.environ["JOBS_EMBEDDED"] = "0"
+
+    from warehouse_mro.app import create_app
+    run_scheduler(create_app())
@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import socket
+import time
+
+# =====================================================
+# POOL DE WORKERS (PROCESOS) PARA LA COLA "jobs"
+# =====================================================
+# Uso independiente:  python -m warehouse_mro.tasks.worker
+# O embebido en la app con JOBS_EMBEDDED=1 (solo desarrollo local: con
+# gunicorn cada worker web levantaría su propio pool).
+
+
+def _bucle(numero, intervalo):
+    # El proceso hijo no debe levantar su propio pool al crear la app
+    os.environ["JOBS_EMBEDDED"] = "0"
+
+    from warehouse_mro.app import create_app
+    from warehouse_mro.models import db
+    from warehouse_mro.tasks import handlers  # noqa: F401  (registra las tareas)
+    from warehouse_mro.tasks.jobs import tomar_siguiente, ejecutar
+
+    app = create_app()
+    nombre = f"{socket.gethostname()}:{os.getpid()}:{numero}"
+    print(f">>> Worker {nombre} escuchando la cola de trabajos")
+
+    with app.app_context():
+        while True:
+            try:
+                job = tomar_siguiente(nombre)
+            except Exception as e:
+                db.session.rollback()
+                print(f"✖ Worker {nombre}: error leyendo la cola: {e}")
+                job = None
+
+            if job is None:
+                time.sleep(intervalo)
+                continue
+
+            print(f">>> Worker {nombre}: {job.tipo} {job.id}")
+            ejecutar(job)
+            db.session.remove()
+
+
+def iniciar_workers(cantidad, intervalo=1.0, daemon=True):
+    """Levanta `cantidad` procesos que consumen la cola."""
+    ctx = multiprocessing.get_context("spawn")
+    procesos = []
+
+    for numero in range(cantidad):
+        p = ctx.Process(
+            target=_bucle,
+            args=(numero, intervalo),
+            name=f"mro-worker-{numero}",
+            daemon=daemon,
+        )
+        p.start()
+        procesos.append(p)
+
+    return procesos
+
+
+if __name__ == "__main__":
+    cantidad = int(os.environ.get("JOB_WORKERS", 2))
+    intervalo = float(os.environ.get("JOB_POLL_SECONDS", 1.0))
+
+    procesos = iniciar_workers(cantidad, intervalo, daemon=False)
+    for p in procesos:
+        p.join()
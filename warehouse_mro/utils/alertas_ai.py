@@ -1,18 +1,106 @@
+import numpy as np
+
+# =====================================================
+# DETECCIÓN DE CONSUMOS ANÓMALOS (VECTORIZADA)
+# =====================================================
+# Las series vienen como matriz materiales × periodos (NaN = sin dato).
+# Se puntúa el último periodo de todas las filas a la vez contra su
+# historia: media / desviación de la ventana móvil anterior (z-score) y
+# desviación contra la EWMA. Ver utils.anomalias_consumo para la carga.
+
+VENTANA = 6            # periodos previos para media y desviación
+MIN_PERIODOS = 3       # periodos con dato necesarios en la ventana
+ALFA_EWMA = 0.3
+UMBRAL_Z = 3.0
+UMBRAL_EWMA = 3.0
+FACTOR_MEDIA = 2.1     # además, el último debe superar 2.1 × la media
+
+# Piso de la desviación: series casi constantes no disparan por ruido
+PISO_RELATIVO = 0.1
+PISO_ABSOLUTO = 1.0
+
+
+def _piso(nivel):
+    return np.maximum(PISO_RELATIVO * np.abs(nivel), PISO_ABSOLUTO)
+
+
+def puntuar_consumos(matriz, ventana=VENTANA, alfa=ALFA_EWMA):
+    """
+    Puntúa el último periodo de cada fila de `matriz`. Retorna un dict de
+    arrays (uno por fila): valor, media, desviacion, periodos, z, ewma, z_ewma.
+    """
+    x = np.asarray(matriz, dtype=float)
+    if x.ndim == 1:
+        x = x[np.newaxis, :]
+
+    ultimo = x[:, -1]
+    historia = x[:, :-1]
+    reciente = historia[:, -ventana:]
+
+    # Media y desviación muestral ignorando NaN (sin avisos por filas vacías)
+    hay = ~np.isnan(reciente)
+    periodos = hay.sum(axis=1)
+    valores = np.where(hay, reciente, 0.0)
+    media = np.divide(valores.sum(axis=1), periodos, out=np.full(len(x), np.nan), where=periodos > 0)
+    cuadrados = np.where(hay, (reciente - media[:, np.newaxis]) ** 2, 0.0).sum(axis=1)
+    desviacion = np.sqrt(np.divide(cuadrados, periodos - 1, out=np.zeros(len(x)), where=periodos > 1))
+
+    # EWMA y varianza exponencial sobre toda la historia, columna a columna
+    ewma = np.full(len(x), np.nan)
+    varianza = np.zeros(len(x))
+    for j in range(historia.shape[1]):
+        columna = historia[:, j]
+        con_dato = ~np.isnan(columna)
+        primero = con_dato & np.isnan(ewma)
+        sigue = con_dato & ~primero
+
+        ewma[primero] = columna[primero]
+        delta = columna[sigue] - ewma[sigue]
+        ewma[sigue] += alfa * delta
+        varianza[sigue] = (1 - alfa) * (varianza[sigue] + alfa * delta * delta)
+
+    z = (ultimo - media) / np.maximum(desviacion, _piso(media))
+    z_ewma = (ultimo - ewma) / np.maximum(np.sqrt(varianza), _piso(ewma))
+
+    return {
+        "valor": ultimo,
+        "media": media,
+        "desviacion": desviacion,
+        "periodos": periodos,
+        "z": z,
+        "ewma": ewma,
+        "z_ewma": z_ewma,
+    }
+
+
+def marcar_anomalias(puntajes, umbral_z=UMBRAL_Z, umbral_ewma=UMBRAL_EWMA,
+                     factor=FACTOR_MEDIA, min_periodos=MIN_PERIODOS):
+    """Máscara booleana de filas con consumo excesivo en el último periodo."""
+    with np.errstate(invalid="ignore"):
+        return (
+            (puntajes["periodos"] >= min_periodos)
+            & (puntajes["z"] >= umbral_z)
+            & (puntajes["z_ewma"] >= umbral_ewma)
+            & (puntajes["valor"] > factor * puntajes["media"])
+        )
+
+
 def detectar_anomalias(consumos):
     """
-    Detecta consumos anómalos con una regla simple:
-    Si el consumo es 2.1 veces mayor que el promedio → alerta.
+    Una sola serie (lista de consumos, el último es el actual).
+    Retorna el detalle si el último periodo es anómalo, si no None.
     """
     if not consumos or len(consumos) < 3:
         return None
 
-    promedio = sum(consumos) / len(consumos)
-    ultimo = consumos[-1]
+    puntajes = puntuar_consumos(consumos)
+    if not marcar_anomalias(puntajes, min_periodos=min(MIN_PERIODOS, len(consumos) - 1))[0]:
+        return None
 
-    if ultimo > promedio * 2.1:
-        return {
-            "tipo": "Consumo excesivo",
-            "valor": ultimo,
-            "promedio": promedio
-        }
-    return None
+    return {
+        "tipo": "Consumo excesivo",
+        "valor": float(puntajes["valor"][0]),
+        "promedio": float(puntajes["media"][0]),
+        "z": float(puntajes["z"][0]),
+        "z_ewma": float(puntajes["z_ewma"][0]),
+    }
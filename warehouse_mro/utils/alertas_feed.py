@@ -0,0 +1,282 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from warehouse_mro.models import db
+from warehouse_mro.models.alerts import Alert
+from warehouse_mro.models.alertas_ai import AlertaIA
+
+# =====================================================
+# FEED DE ALERTAS EN TIEMPO REAL (SSE)
+# =====================================================
+# Un solo hilo por proceso lee las alertas nuevas (alertas y alertas_ai,
+# por id) y las reparte a la cola acotada de cada navegador conectado.
+# Las alertas se crean sobre todo en los workers, así que quien las
+# inserta llama a publicar_alertas(): toca un archivo marca en instance/
+# (como utils.kpis) y despierta al hilo local. El hilo solo consulta la
+# base cuando la marca cambió, no en cada vuelta.
+#
+# El id de cada evento es el cursor "<id alerta>.<id alerta IA>": al
+# reconectar, EventSource lo manda en Last-Event-ID y se reenvía desde
+# la base lo que se perdió.
+
+BUFFER = 200           # eventos pendientes por cliente antes de cortarlo
+LATIDO = 15            # segundos sin eventos antes de un comentario ": latido"
+# Segundos por conexión, por debajo del --timeout de gunicorn (Procfile):
+# al cerrar, EventSource reconecta solo con Last-Event-ID
+DURACION = 25
+INTERVALO = 2.0        # segundos entre revisiones de la marca
+REANUDAR_MAX = 500     # eventos perdidos a reenviar; más que eso → "recargar"
+REINTENTO_MS = 3000
+
+
+def _ruta_marca():
+    return os.path.join(current_app.instance_path, "alertas.version")
+
+
+def _marca():
+    try:
+        return os.stat(_ruta_marca()).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def publicar_alertas():
+    """Avisa que hay alertas nuevas (llamar después del commit que las crea)."""
+    ruta = _ruta_marca()
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "a"):
+            pass
+        os.utime(ruta, None)
+    except OSError as e:
+        print(f"✖ No se pudo marcar alertas nuevas: {e}")
+
+    hub.despertar()
+
+
+# =====================================================
+# CURSOR Y EVENTOS
+# =====================================================
+
+def cursor_texto(cursor):
+    return f"{cursor[0]}.{cursor[1]}"
+
+
+def leer_cursor(texto):
+    """Cursor desde Last-Event-ID; None si no viene o no es válido."""
+    try:
+        alerta, ia = (texto or "").split(".")
+        return (max(int(alerta), 0), max(int(ia), 0))
+    except ValueError:
+        return None
+
+
+def _cursor_actual():
+    return (
+        db.session.execute(select(func.coalesce(func.max(Alert.id), 0))).scalar(),
+        db.session.execute(select(func.coalesce(func.max(AlertaIA.id), 0))).scalar(),
+    )
+
+
+def _alerta(a):
+    return {
+        "id": a.id,
+        "alert_type": a.alert_type,
+        "message": a.message,
+        "severity": a.severity,
+        "estado": a.estado,
+        "fecha": a.fecha.isoformat() if a.fecha else None,
+    }
+
+
+def _alerta_ia(a):
+    return {
+        "id": a.id,
+        "categoria": a.categoria,
+        "descripcion": a.descripcion,
+        "nivel": a.nivel,
+        "fecha": a.fecha.isoformat() if a.fecha else None,
+    }
+
+
+def eventos_entre(desde, hasta, limite=None):
+    """
+    Eventos con desde < id <= hasta, en orden de id dentro de cada tabla.
+    Retorna [(cursor, tipo, datos)]; cada cursor avanza solo su tabla.
+    """
+    alertas = (
+        Alert.query.filter(Alert.id > desde[0], Alert.id <= hasta[0])
+        .order_by(Alert.id).limit(limite).all()
+    )
+    alertas_ia = (
+        AlertaIA.query.filter(AlertaIA.id > desde[1], AlertaIA.id <= hasta[1])
+        .order_by(AlertaIA.id).limit(limite).all()
+    )
+
+    eventos = []
+    alerta, ia = desde
+    for a in alertas:
+        alerta = a.id
+        eventos.append(((alerta, ia), "alerta", _alerta(a)))
+    for a in alertas_ia:
+        ia = a.id
+        eventos.append(((alerta, ia), "alerta_ia", _alerta_ia(a)))
+    return eventos
+
+
+def _ya_enviado(evento, desde):
+    cursor, tipo, _ = evento
+    i = 0 if tipo == "alerta" else 1
+    return desde is not None and cursor[i] <= desde[i]
+
+
+def formato_sse(cursor, tipo, datos):
+    return f"id: {cursor_texto(cursor)}\nevent: {tipo}\ndata: {json.dumps(datos)}\n\n"
+
+
+# =====================================================
+# HUB (UN LECTOR, N SUSCRIPTORES)
+# =====================================================
+
+class Suscriptor:
+    def __init__(self, cursor, buffer):
+        self.cursor = cursor
+        self.cola = queue.Queue(maxsize=buffer)
+        self.desbordado = False
+
+
+class HubAlertas:
+    def __init__(self, buffer=BUFFER, intervalo=INTERVALO):
+        self.buffer = buffer
+        self.intervalo = intervalo
+        self.cursor = None
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._marca = None
+
+    def iniciar(self, app):
+        """Arranca el hilo lector una vez por proceso."""
+        with self._lock:
+            if self._hilo is not None:
+                return
+            with app.app_context():
+                self.cursor = _cursor_actual()
+                self._marca = _marca()
+            self._hilo = threading.Thread(target=self._bucle, args=(app,), name="alertas-feed", daemon=True)
+            self._hilo.start()
+
+    def suscribir(self):
+        """Registra un cliente; su cursor es el último evento ya repartido."""
+        with self._lock:
+            sub = Suscriptor(self.cursor, self.buffer)
+            self._suscriptores.add(sub)
+        return sub
+
+    def retirar(self, sub):
+        with self._lock:
+            self._suscriptores.discard(sub)
+
+    def despertar(self):
+        self._despertar.set()
+
+    def _bucle(self, app):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+            try:
+                with app.app_context():
+                    marca = _marca()
+                    if marca == self._marca:
+                        continue
+                    hasta = _cursor_actual()
+                    # Sin clientes solo se adelanta el cursor, sin leer filas
+                    eventos = eventos_entre(self.cursor, hasta) if self._suscriptores else []
+                    db.session.remove()
+            except Exception as e:
+                print(f"✖ Feed de alertas: {e}")
+                time.sleep(self.intervalo)
+                continue
+
+            self._repartir(eventos, hasta, marca)
+
+    def _repartir(self, eventos, hasta, marca):
+        with self._lock:
+            if not eventos and self._suscriptores and hasta != self.cursor:
+                # Alguien se conectó mientras tanto: se leen las filas en la próxima vuelta
+                return
+
+            self._marca = marca
+            for evento in eventos:
+                for sub in self._suscriptores:
+                    if sub.desbordado:
+                        continue
+                    try:
+                        sub.cola.put_nowait(evento)
+                    except queue.Full:
+                        # Cliente lento: se le corta y reanuda desde su último id
+                        sub.desbordado = True
+            self.cursor = hasta
+
+
+hub = HubAlertas()
+
+
+# =====================================================
+# STREAM POR CLIENTE
+# =====================================================
+
+def stream_alertas(ultimo_id=None, latido=LATIDO, duracion=DURACION):
+    """
+    Generador SSE de un cliente: primero lo perdido desde `ultimo_id`
+    (Last-Event-ID), luego lo que reparte el hub. Termina al desbordarse
+    o tras `duracion` segundos para que el navegador reconecte.
+    """
+    hub.iniciar(current_app._get_current_object())
+    sub = hub.suscribir()
+
+    try:
+        yield f"retry: {REINTENTO_MS}\n\n"
+
+        desde = leer_cursor(ultimo_id)
+        if desde is None:
+            # Conexión nueva: el id inicial fija Last-Event-ID aunque no
+            # llegue ningún evento antes de cerrar, así la reconexión no
+            # pierde lo ocurrido entre medio
+            yield f"id: {cursor_texto(sub.cursor)}\n\n"
+        elif desde != sub.cursor:
+            # Con varios procesos el cliente puede venir de uno más adelantado
+            perdidos = eventos_entre(desde, sub.cursor, limite=REANUDAR_MAX + 1)
+            db.session.remove()
+            if len(perdidos) > REANUDAR_MAX:
+                yield f"id: {cursor_texto(sub.cursor)}\nevent: recargar\ndata: {{}}\n\n"
+                return
+            for evento in perdidos:
+                yield formato_sse(*evento)
+
+        fin = time.monotonic() + duracion
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                return
+            if sub.desbordado and sub.cola.empty():
+                # Lo que quedó fuera se recupera al reconectar con Last-Event-ID
+                return
+            try:
+                evento = sub.cola.get(timeout=min(latido, restante))
+            except queue.Empty:
+                yield ": latido\n\n"
+                continue
+            if _ya_enviado(evento, desde):
+                continue
+            yield formato_sse(*evento)
+    finally:
+        hub.retirar(sub)
@@ -0,0 +1,95 @@
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from warehouse_mro.models.alerts import Alert
+from warehouse_mro.models.warehouse2d import WarehouseLocation
+
+# =====================================================
+# ALERTAS DE STOCK CRÍTICO DEL LAYOUT 2D
+# =====================================================
+# Una alerta activa por huella (tipo, ubicación, material). Después de
+# cada carga se compara el conjunto de filas críticas con el de alertas
+# activas: solo se abren las nuevas y se cierran las que ya no aplican.
+
+TIPO_STOCK_CRITICO = "stock_critico_2d"
+LOTE = 500
+
+
+def huella_alerta(tipo, ubicacion, material_code):
+    texto = f"{tipo}|{(ubicacion or '').strip()}|{(material_code or '').strip()}"
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _mensaje(fila):
+    return (
+        f"Stock crítico en {fila.ubicacion}: {fila.material_code} ({fila.material_text}) "
+        f"Libre={fila.libre_utilizacion}, Seguridad={fila.stock_seguridad}"
+    )
+
+
+def sincronizar_alertas_stock(conn, fecha=None):
+    """
+    Abre alertas para las filas críticas sin alerta activa y cierra las
+    activas cuya condición desapareció. Se llama dentro de la transacción
+    de carga del layout. Retorna {"abiertas": n, "cerradas": n}.
+    """
+    fecha = fecha or datetime.utcnow()
+    tabla = Alert.__table__
+
+    criticas = {}
+    for fila in conn.execute(
+        select(
+            WarehouseLocation.ubicacion,
+            WarehouseLocation.material_code,
+            WarehouseLocation.material_text,
+            WarehouseLocation.libre_utilizacion,
+            WarehouseLocation.stock_seguridad,
+        ).where(WarehouseLocation.status == "crítico")
+    ):
+        criticas[huella_alerta(TIPO_STOCK_CRITICO, fila.ubicacion, fila.material_code)] = fila
+
+    activas = {}
+    sin_huella = []
+    for id_, huella in conn.execute(
+        select(tabla.c.id, tabla.c.huella).where(
+            tabla.c.alert_type == TIPO_STOCK_CRITICO,
+            tabla.c.estado == "activo",
+        )
+    ):
+        if huella is None or huella in activas:
+            # Alertas de antes de la huella o duplicadas: se cierran
+            sin_huella.append(id_)
+        else:
+            activas[huella] = id_
+
+    cerrar = sin_huella + [id_ for huella, id_ in activas.items() if huella not in criticas]
+    for i in range(0, len(cerrar), LOTE):
+        conn.execute(
+            update(tabla)
+            .where(tabla.c.id.in_(cerrar[i:i + LOTE]))
+            .values(estado="cerrado", cerrado_en=fecha)
+        )
+
+    nuevas = []
+    for huella, fila in criticas.items():
+        if huella in activas:
+            continue
+        mensaje = _mensaje(fila)
+        nuevas.append({
+            "alert_type": TIPO_STOCK_CRITICO,
+            "tipo": TIPO_STOCK_CRITICO,
+            "message": mensaje,
+            "mensaje": mensaje[:255],
+            "severity": "Alta",
+            "nivel": "Alta",
+            "estado": "activo",
+            "huella": huella,
+            "fecha": fecha,
+        })
+
+    for i in range(0, len(nuevas), LOTE):
+        conn.execute(tabla.insert(), nuevas[i:i + LOTE])
+
+    return {"abiertas": len(nuevas), "cerradas": len(cerrar)}
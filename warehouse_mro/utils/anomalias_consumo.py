@@ -0,0 +1,292 @@
+import hashlib
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from warehouse_mro.models import db
+from warehouse_mro.models.alertas_ai import AlertaIA
+from warehouse_mro.models.inventory_history import InventoryHistory, InventorySnapshot
+from warehouse_mro.models.job import Job
+from warehouse_mro.models.warehouse2d import WarehouseLocation
+from warehouse_mro.tasks.jobs import encolar
+from warehouse_mro.utils.alertas_ai import UMBRAL_Z, marcar_anomalias, puntuar_consumos
+from warehouse_mro.utils.alertas_feed import publicar_alertas
+
+# =====================================================
+# MOTOR DE ANOMALÍAS DE CONSUMO (LOTE NOCTURNO)
+# =====================================================
+# Consumo por material y mes, sin recorrer materiales en Python:
+#   1. Se leen los snapshots de los últimos MESES_HISTORIA meses desde
+#      su keyframe (cadena keyframe + deltas de utils.snapshots).
+#   2. Cada fila aporta (valor - valor anterior de su clave); sumado por
+#      material y snapshot da el cambio de stock, y la bajada es el
+#      consumo (reposiciones cuentan 0, traslados entre ubicaciones se
+#      compensan). Se suma por mes del snapshot.
+#   3. El mes actual toma consumo_mes del layout 2D cuando viene informado.
+# Las filas marcadas por utils.alertas_ai se guardan en alertas_ai, una
+# vez por material y mes (huella, única en la base).
+
+CATEGORIA = "Anomalía de consumo"
+MESES_HISTORIA = 12
+LOTE = 1000
+
+CLAVE = ["material_code", "location"]
+
+
+def huella_anomalia(material_code, periodo):
+    texto = f"{CATEGORIA}|{material_code}|{periodo}"
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _insertar_ignorando(conn, tabla, filas):
+    """INSERT que descarta las filas cuya huella ya existe (otra corrida)."""
+    dialecto = conn.dialect.name
+    if dialecto == "postgresql":
+        stmt = postgresql.insert(tabla).on_conflict_do_nothing(index_elements=["huella"])
+    elif dialecto == "sqlite":
+        stmt = sqlite.insert(tabla).on_conflict_do_nothing(index_elements=["huella"])
+    else:
+        stmt = tabla.insert().prefix_with("IGNORE")  # MySQL
+    conn.execute(stmt, filas)
+
+
+def _vacio():
+    return pd.DataFrame(index=pd.Index([], name="material_code"))
+
+
+def _cadena(conn, desde_fecha):
+    """Snapshots desde `desde_fecha` (más su keyframe) y sus filas."""
+    desde = conn.execute(
+        select(func.min(InventorySnapshot.secuencia))
+        .where(InventorySnapshot.creado_en >= desde_fecha)
+    ).scalar()
+    if desde is None:
+        return None, None
+
+    keyframe = conn.execute(
+        select(func.max(InventorySnapshot.secuencia))
+        .where(
+            InventorySnapshot.es_keyframe.is_(True),
+            InventorySnapshot.secuencia <= desde,
+        )
+    ).scalar() or 0
+
+    cadena = pd.read_sql(
+        select(InventorySnapshot.secuencia, InventorySnapshot.es_keyframe, InventorySnapshot.creado_en)
+        .where(InventorySnapshot.secuencia >= keyframe)
+        .order_by(InventorySnapshot.secuencia),
+        conn,
+    )
+    filas = pd.read_sql(
+        select(
+            InventorySnapshot.secuencia,
+            InventoryHistory.operacion,
+            InventoryHistory.material_code,
+            InventoryHistory.location,
+            InventoryHistory.libre_utilizacion,
+        )
+        .join(InventoryHistory, InventoryHistory.snapshot_id == InventorySnapshot.snapshot_id)
+        .where(InventorySnapshot.secuencia >= keyframe),
+        conn,
+    )
+    return cadena, filas
+
+
+def consumo_por_snapshot(conn, desde_fecha):
+    """
+    Retorna (consumos, materiales, aparicion) o None si no hay snapshots:
+      consumos:   DataFrame material (código entero), creado_en, consumo
+      materiales: Index de material_code (el código es la posición)
+      aparicion:  fecha en que aparece cada material (NaT = ya estaba en
+                  el keyframe inicial)
+    """
+    cadena, filas = _cadena(conn, desde_fecha)
+    if cadena is None or cadena.empty or filas.empty:
+        return None
+
+    # Claves de texto → enteros una sola vez; el resto opera sobre enteros
+    material, materiales = pd.factorize(filas["material_code"])
+    clave = filas.groupby(CLAVE, sort=False).ngroup().to_numpy()
+    libre = pd.to_numeric(filas["libre_utilizacion"], errors="coerce").fillna(0.0).to_numpy()
+
+    filas = pd.DataFrame({
+        "secuencia": filas["secuencia"].to_numpy(),
+        "clave": clave,
+        "material": material,
+        "valor": np.where(filas["operacion"].to_numpy() == "D", 0.0, libre),
+    }).sort_values("secuencia", kind="stable")
+
+    inicio = cadena["secuencia"].iloc[0]
+
+    # Keyframes posteriores al inicio: lo vivo que no viene se eliminó
+    eliminadas = []
+    for k in cadena.loc[cadena["es_keyframe"].astype(bool) & (cadena["secuencia"] > inicio), "secuencia"]:
+        vivas = filas[filas["secuencia"] < k].drop_duplicates("clave", keep="last")
+        vivas = vivas[(vivas["valor"] > 0) & ~vivas["clave"].isin(filas.loc[filas["secuencia"] == k, "clave"])]
+        eliminadas.append(vivas.assign(secuencia=k, valor=0.0))
+
+    if eliminadas:
+        filas = pd.concat([filas] + eliminadas, ignore_index=True).sort_values("secuencia", kind="stable")
+
+    # Valor anterior de la clave: el keyframe inicial es la base (delta 0),
+    # una clave nueva más adelante parte de 0
+    anterior = filas.groupby("clave", sort=False)["valor"].shift()
+    anterior = anterior.fillna(filas["valor"].where(filas["secuencia"] == inicio, 0.0))
+    filas["delta"] = filas["valor"] - anterior
+
+    fechas = cadena.set_index("secuencia")["creado_en"]
+    primera = filas.groupby("material")["secuencia"].min().reindex(range(len(materiales)))
+    aparicion = pd.to_datetime(primera.map(fechas.where(fechas.index > inicio))).to_numpy()
+
+    cambios = (
+        filas[filas["secuencia"] > inicio]
+        .groupby(["material", "secuencia"], as_index=False, sort=False)["delta"].sum()
+    )
+    consumos = pd.DataFrame({
+        "material": cambios["material"].to_numpy(),
+        "creado_en": cambios["secuencia"].map(fechas).to_numpy(),
+        "consumo": np.clip(-cambios["delta"].to_numpy(), 0, None),
+    })
+    return consumos, materiales, aparicion
+
+
+def consumo_mensual(conn, desde_fecha):
+    """
+    Consumo por material (filas) y mes con snapshots (columnas Period).
+    NaN en los meses antes de que el material aparezca, para que un
+    material nuevo no parezca anómalo.
+    """
+    resultado = consumo_por_snapshot(conn, desde_fecha)
+    if resultado is None or resultado[0].empty:
+        return _vacio()
+    consumos, materiales, aparicion = resultado
+
+    mes = pd.PeriodIndex(pd.to_datetime(consumos["creado_en"]), freq="M")
+    columna, meses = pd.factorize(mes, sort=True)
+
+    valores = np.bincount(
+        consumos["material"].to_numpy() * len(meses) + columna,
+        weights=consumos["consumo"].to_numpy(),
+        minlength=len(materiales) * len(meses),
+    ).reshape(len(materiales), len(meses))
+
+    # Ordinales de mes; NaT (material del keyframe inicial) nunca se enmascara
+    aparece = pd.PeriodIndex(pd.DatetimeIndex(aparicion), freq="M").asi8
+    valores[meses.asi8[np.newaxis, :] < aparece[:, np.newaxis]] = np.nan
+
+    return pd.DataFrame(valores, index=pd.Index(materiales, name="material_code"), columns=meses)
+
+
+def consumo_layout(conn):
+    """consumo_mes informado en el layout 2D, sumado por material (> 0)."""
+    df = pd.read_sql(
+        select(
+            WarehouseLocation.material_code,
+            func.sum(WarehouseLocation.consumo_mes).label("consumo_mes"),
+        )
+        .where(WarehouseLocation.material_code.isnot(None))
+        .group_by(WarehouseLocation.material_code),
+        conn,
+    )
+    df = df[df["consumo_mes"] > 0]
+    return df.set_index("material_code")["consumo_mes"].astype(float)
+
+
+def series_consumo(conn, hoy=None):
+    """Matriz material × mes con el mes actual al final."""
+    hoy = hoy or datetime.utcnow()
+    actual = pd.Period(hoy, freq="M")
+
+    desde_fecha = (actual - MESES_HISTORIA).to_timestamp().to_pydatetime()
+
+    mensual = consumo_mensual(conn, desde_fecha)
+    if actual not in mensual.columns:
+        mensual[actual] = np.nan
+
+    layout = consumo_layout(conn)
+    if not layout.empty:
+        mensual = mensual.reindex(mensual.index.union(layout.index))
+        mensual.loc[layout.index, actual] = layout
+
+    return mensual[sorted(mensual.columns)]
+
+
+# =====================================================
+# EJECUCIÓN
+# =====================================================
+
+def _descripcion(material, periodo, p, i):
+    return (
+        f"Material {material}: consumo de {p['valor'][i]:.1f} en {periodo} "
+        f"(media {p['media'][i]:.1f} en {int(p['periodos'][i])} meses, "
+        f"z={p['z'][i]:.1f}, desvío EWMA={p['z_ewma'][i]:.1f})."
+    )
+
+
+def detectar_anomalias_consumo(progreso=None, hoy=None):
+    """
+    Puntúa el mes actual de todos los materiales y registra en alertas_ai
+    las anomalías nuevas. Retorna {"materiales", "anomalias", "nuevas"}.
+    """
+    hoy = hoy or datetime.utcnow()
+    conn = db.session.connection()
+
+    if progreso:
+        progreso(10, "Leyendo snapshots de inventario")
+    series = series_consumo(conn, hoy)
+    if series.empty:
+        return {"materiales": 0, "anomalias": 0, "nuevas": 0}
+
+    if progreso:
+        progreso(60, f"Analizando {len(series)} materiales")
+    puntajes = puntuar_consumos(series.to_numpy(dtype=float))
+    indices = np.flatnonzero(marcar_anomalias(puntajes))
+
+    periodo = str(series.columns[-1])
+    materiales = series.index.to_numpy()
+    candidatas = {huella_anomalia(materiales[i], periodo): i for i in indices}
+
+    existentes = set()
+    huellas = list(candidatas)
+    for i in range(0, len(huellas), LOTE):
+        existentes.update(conn.execute(
+            select(AlertaIA.huella).where(AlertaIA.huella.in_(huellas[i:i + LOTE]))
+        ).scalars())
+
+    nuevas = [
+        {
+            "categoria": CATEGORIA,
+            "descripcion": _descripcion(materiales[i], periodo, puntajes, i),
+            "nivel": "alto" if puntajes["z"][i] >= 2 * UMBRAL_Z else "medio",
+            "huella": huella,
+            "fecha": hoy,
+        }
+        for huella, i in candidatas.items() if huella not in existentes
+    ]
+
+    tabla = AlertaIA.__table__
+    for i in range(0, len(nuevas), LOTE):
+        _insertar_ignorando(conn, tabla, nuevas[i:i + LOTE])
+    db.session.commit()
+
+    if nuevas:
+        publicar_alertas()
+
+    return {"materiales": len(series), "anomalias": len(candidatas), "nuevas": len(nuevas)}
+
+
+def encolar_deteccion_anomalias(usuario=None):
+    """Encola el análisis a lo sumo una vez por día (id derivado de la fecha)."""
+    hoy = datetime.utcnow().date().isoformat()
+    job_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"anomalias_consumo:{hoy}"))
+
+    try:
+        return encolar("anomalias_consumo", {}, usuario=usuario, job_id=job_id)
+    except IntegrityError:
+        db.session.rollback()
+        return db.session.get(Job, job_id)
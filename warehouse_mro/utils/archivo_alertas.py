@@ -0,0 +1,90 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from warehouse_mro.models import db
+from warehouse_mro.models.alerts import Alert, AlertArchive
+from warehouse_mro.models.job import Job
+from warehouse_mro.tasks.jobs import encolar
+
+# =====================================================
+# ARCHIVO DE ALERTAS CERRADAS
+# =====================================================
+# Las alertas cerradas con más de N días pasan a alertas_archive en
+# lotes (INSERT ... SELECT + DELETE por id, cada lote en su transacción)
+# para que "alertas" solo guarde lo activo y lo reciente.
+
+ARCHIVO_DIAS = 90
+LOTE = 5000
+
+COLUMNAS = [
+    "id", "alert_type", "tipo", "message", "mensaje", "severity", "nivel",
+    "origen", "usuario", "estado", "fecha", "detalles", "huella", "cerrado_en",
+]
+
+
+def archivar_alertas(dias=ARCHIVO_DIAS, lote=LOTE, progreso=None):
+    """
+    Mueve las alertas cerradas antes de hoy - `dias`. Retorna cuántas.
+    `progreso(movidas, total)` se llama después de cada lote.
+    """
+    ahora = datetime.utcnow()
+    corte = ahora - timedelta(days=dias)
+    tabla = Alert.__table__
+
+    # Sin fecha de cierre (cerradas a mano o antes de cerrado_en): su fecha
+    cierre = func.coalesce(tabla.c.cerrado_en, tabla.c.fecha)
+
+    total = None
+    if progreso:
+        total = db.session.execute(
+            select(func.count()).select_from(tabla).where(tabla.c.estado == "cerrado", cierre < corte)
+        ).scalar()
+
+    movidas = 0
+    while True:
+        ids = db.session.execute(
+            select(tabla.c.id)
+            .where(tabla.c.estado == "cerrado", cierre < corte)
+            .order_by(tabla.c.id)
+            .limit(lote)
+        ).scalars().all()
+        if not ids:
+            break
+
+        conn = db.session.connection()
+        conn.execute(
+            insert(AlertArchive.__table__).from_select(
+                COLUMNAS + ["archivado_en"],
+                select(*[tabla.c[c] for c in COLUMNAS], literal(ahora, db.DateTime))
+                .where(tabla.c.id.in_(ids)),
+            )
+        )
+        conn.execute(tabla.delete().where(tabla.c.id.in_(ids)))
+        db.session.commit()
+
+        movidas += len(ids)
+        if progreso:
+            progreso(movidas, total)
+
+        if len(ids) < lote:
+            break
+
+    return movidas
+
+
+def encolar_archivo_alertas(usuario=None):
+    """
+    Encola el archivo de alertas a lo sumo una vez por día: el id del
+    trabajo sale de la fecha, un segundo intento choca en la PK.
+    """
+    hoy = datetime.utcnow().date().isoformat()
+    job_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"archivar_alertas:{hoy}"))
+
+    try:
+        return encolar("archivar_alertas", {}, usuario=usuario, job_id=job_id)
+    except IntegrityError:
+        db.session.rollback()
+        return db.session.get(Job, job_id)
@@ -0,0 +1,438 @@
+import csv
+import io
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import insert, select, func, update, bindparam
+
+from warehouse_mro.models import db
+from warehouse_mro.models.inventory import InventoryItem
+from warehouse_mro.models.inventory_stock import InventoryStock
+from warehouse_mro.models.warehouse2d import WarehouseLocation
+from warehouse_mro.utils.snapshots import registrar_snapshot
+from warehouse_mro.utils.mapa2d import recalcular_resumen_ubicaciones
+from warehouse_mro.utils.kpis import invalidar_kpis
+from warehouse_mro.utils.excel import claves_ubicacion
+from warehouse_mro.utils.busqueda import indexar_inventario, indexar_layout_2d
+from warehouse_mro.utils.alertas_stock import sincronizar_alertas_stock
+from warehouse_mro.utils.alertas_feed import publicar_alertas
+
+# =====================================================
+# CARGA MASIVA DE INVENTARIO
+# =====================================================
+
+# Columna oficial del Excel → columna de la tabla
+INV_COLUMNAS = {
+    "Código del Material": "material_code",
+    "Texto breve de material": "material_text",
+    "Unidad de medida base": "base_unit",
+    "Ubicación": "location",
+    "Libre utilización": "libre_utilizacion",
+}
+
+CHUNK_SIZE = 5000
+
+
+def _columnas_inventario(df):
+    """
+    Convierte un bloque del DataFrame mapeado en columnas Python (listas)
+    con los nombres de la tabla. Textos como str, stock como float.
+    Incluye la clave de orden de la ubicación (loc_main, loc_letters, loc_last).
+    """
+    columnas = {}
+    for oficial, destino in INV_COLUMNAS.items():
+        serie = df[oficial]
+        if destino == "libre_utilizacion":
+            serie = pd.to_numeric(serie, errors="coerce").fillna(0).astype(float)
+        else:
+            serie = serie.fillna("").astype(str).str.strip()
+        columnas[destino] = serie.tolist()
+
+    for nombre, serie in claves_ubicacion(columnas["location"]).items():
+        columnas[nombre] = serie.tolist()
+
+    return columnas
+
+
+def _lotes(columnas, chunk_size, extra=None):
+    """Genera lotes de dicts (executemany) a partir de columnas."""
+    nombres = list(columnas.keys())
+    total = len(columnas[nombres[0]]) if nombres else 0
+    extra = extra or {}
+
+    for inicio in range(0, total, chunk_size):
+        fin = inicio + chunk_size
+        valores = zip(*(columnas[n][inicio:fin] for n in nombres))
+        yield [{**dict(zip(nombres, fila)), **extra} for fila in valores]
+
+
+def _copy_postgres(conn, tabla, lote):
+    """COPY FROM STDIN sobre la misma conexión (misma transacción)."""
+    nombres = list(lote[0].keys())
+    buffer = io.StringIO()
+    # Textos entre comillas: en CSV un "" vacío no se interpreta como NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for fila in lote:
+        writer.writerow(fila[n] for n in nombres)
+    buffer.seek(0)
+
+    raw = conn.connection.driver_connection
+    with raw.cursor() as cur:
+        cur.copy_expert(
+            f"COPY {tabla.name} ({', '.join(nombres)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def _insertar(conn, tabla, lotes):
+    usar_copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+    filas = 0
+    for lote in lotes:
+        if not lote:
+            continue
+        if usar_copy:
+            _copy_postgres(conn, tabla, lote)
+        else:
+            conn.execute(insert(tabla), lote)
+        filas += len(lote)
+    return filas
+
+
+def insertar_registros(conn, tabla, registros, chunk_size=CHUNK_SIZE):
+    """Inserta una lista de dicts por lotes (executemany / COPY)."""
+    return _insertar(
+        conn,
+        tabla,
+        (registros[i:i + chunk_size] for i in range(0, len(registros), chunk_size)),
+    )
+
+
+def refrescar_stock_agregado(conn, actualizado_en=None):
+    """
+    Recalcula inventory_stock desde inventory con un solo
+    INSERT ... SELECT ... GROUP BY (material_code, location).
+    Retorna el número de claves.
+    """
+    actualizado_en = actualizado_en or datetime.now()
+
+    agrupado = (
+        select(
+            InventoryItem.material_code,
+            InventoryItem.location,
+            func.max(InventoryItem.material_text),
+            func.max(InventoryItem.base_unit),
+            func.coalesce(func.sum(InventoryItem.libre_utilizacion), 0),
+            func.count(),
+            db.literal(actualizado_en, db.DateTime),
+        )
+        .group_by(InventoryItem.material_code, InventoryItem.location)
+    )
+
+    conn.execute(InventoryStock.__table__.delete())
+    res = conn.execute(
+        insert(InventoryStock.__table__).from_select(
+            [
+                "material_code",
+                "location",
+                "material_text",
+                "base_unit",
+                "libre_utilizacion",
+                "items",
+                "actualizado_en",
+            ],
+            agrupado,
+        )
+    )
+    return res.rowcount
+
+
+def cargar_inventario(bloques, snapshot_name=None, chunk_size=CHUNK_SIZE, progreso=None):
+    """
+    Reemplaza el inventario activo, recalcula el stock agregado y el
+    índice de búsqueda, y registra el snapshot histórico (delta contra el anterior, ver
+    utils.snapshots) en una sola transacción, con inserciones por lotes.
+    `bloques` puede ser un DataFrame o un iterable de DataFrames
+    (ver utils.excel.iter_inventory_excel); se consume bloque a bloque.
+    `progreso(filas)` se llama después de cada bloque, si se indica.
+    Retorna estadísticas de la carga (filas, segundos, filas/seg).
+    """
+    inicio = time.perf_counter()
+
+    if isinstance(bloques, pd.DataFrame):
+        bloques = [bloques]
+
+    snapshot_id = str(uuid.uuid4())
+    snapshot_name = snapshot_name or f"Inventario {datetime.now():%d/%m/%Y %H:%M}"
+    ahora = datetime.now()
+    ahora_utc = datetime.utcnow()
+
+    filas = 0
+
+    try:
+        conn = db.session.connection()
+
+        conn.execute(InventoryItem.__table__.delete())
+
+        for df in bloques:
+            columnas = _columnas_inventario(df)
+
+            filas += _insertar(
+                conn,
+                InventoryItem.__table__,
+                _lotes(columnas, chunk_size, {"creado_en": ahora}),
+            )
+
+            if progreso:
+                progreso(filas)
+
+        claves = refrescar_stock_agregado(conn, ahora)
+        indexar_inventario(conn)
+
+        snapshot = registrar_snapshot(
+            conn,
+            insertar_registros,
+            snapshot_id,
+            snapshot_name,
+            ahora_utc,
+        )
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    invalidar_kpis()
+
+    segundos = time.perf_counter() - inicio
+    stats = {
+        "snapshot_id": snapshot_id,
+        "keyframe": snapshot["es_keyframe"],
+        "filas_historial": snapshot["insertadas"] + snapshot["modificadas"] + snapshot["eliminadas"],
+        "filas": filas,
+        "claves": claves,
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": int(filas / segundos) if segundos > 0 else filas,
+    }
+    print(
+        f">>> Inventario cargado: {stats['filas']} filas en "
+        f"{stats['segundos']}s ({stats['filas_por_segundo']} filas/s); "
+        f"historial: {stats['filas_historial']} filas "
+        f"({'keyframe' if stats['keyframe'] else 'delta'})"
+    )
+    return stats
+
+
+def rellenar_claves_ubicacion(conn, modelo, columna, chunk_size=CHUNK_SIZE):
+    """
+    Calcula loc_main / loc_letters / loc_last para filas cargadas antes
+    de existir esas columnas. Retorna el número de filas actualizadas.
+    """
+    tabla = modelo.__table__
+    filas = pd.read_sql(
+        select(tabla.c.id, tabla.c[columna]).where(tabla.c.loc_main.is_(None)),
+        conn,
+    )
+    if filas.empty:
+        return 0
+
+    claves = claves_ubicacion(filas[columna])
+    claves["_id"] = filas["id"]
+    registros = claves.astype(object).to_dict("records")
+
+    stmt = (
+        update(tabla)
+        .where(tabla.c.id == bindparam("_id"))
+        .values(
+            loc_main=bindparam("loc_main"),
+            loc_letters=bindparam("loc_letters"),
+            loc_last=bindparam("loc_last"),
+        )
+    )
+    for i in range(0, len(registros), chunk_size):
+        conn.execute(stmt, registros[i:i + chunk_size])
+
+    return len(registros)
+
+
+# =====================================================
+# CARGA DEL LAYOUT 2D (INCREMENTAL)
+# =====================================================
+# Cada fila se identifica por (ubicacion, material_code) y guarda un hash
+# de sus valores. La carga compara contra lo que ya está en la tabla y
+# solo emite los INSERT / UPDATE / DELETE necesarios, todo en una
+# transacción: quien lee el mapa ve el layout anterior o el nuevo.
+# El archivo se compara bloque a bloque contra un mapa clave → (id, hash)
+# de la tabla; solo las claves vistas se acumulan, para borrar al final
+# las que no vinieron.
+
+LAYOUT_COLUMNAS = {
+    "Código del Material": "material_code",
+    "Texto breve de material": "material_text",
+    "Unidad de medida base": "base_unit",
+    "Ubicación": "ubicacion",
+    "Stock de seguridad": "stock_seguridad",
+    "Stock máximo": "stock_maximo",
+    "Libre utilización": "libre_utilizacion",
+}
+LAYOUT_NUMERICAS = ["stock_seguridad", "stock_maximo", "libre_utilizacion"]
+LAYOUT_CLAVE = ["ubicacion", "material_code"]
+LAYOUT_VALORES = ["material_text", "base_unit"] + LAYOUT_NUMERICAS
+
+
+def _normalizar_layout(df):
+    out = pd.DataFrame(index=df.index)
+    for oficial, destino in LAYOUT_COLUMNAS.items():
+        serie = df[oficial] if oficial in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if destino in LAYOUT_NUMERICAS:
+            out[destino] = pd.to_numeric(serie, errors="coerce").fillna(0).astype(float)
+        else:
+            out[destino] = serie.fillna("").astype(str).str.strip()
+    return out
+
+
+def hash_layout(df):
+    """Hash (int64 con signo) de los valores de cada fila del layout."""
+    return pd.util.hash_pandas_object(df[LAYOUT_VALORES], index=False).to_numpy().view("int64")
+
+
+def _layout_actual(conn, tabla, chunk_size):
+    """
+    Mapa (ubicacion, material_code) → id, hash de la tabla. Las claves
+    repetidas de cargas anteriores se borran (se conserva la primera).
+    Retorna (actual indexado por clave, filas borradas).
+    """
+    actual = pd.read_sql(
+        # Sin NULL: una columna entera con nulos llegaría como float (pierde bits)
+        select(
+            tabla.c.id,
+            tabla.c.ubicacion,
+            tabla.c.material_code,
+            func.coalesce(tabla.c.fila_hash, 0).label("hash_actual"),
+        ),
+        conn,
+    )
+    for c in LAYOUT_CLAVE:
+        actual[c] = actual[c].fillna("").astype(str).str.strip()
+    # Nullables: al cruzar con el archivo, las claves nuevas quedan en <NA>
+    actual["id"] = actual["id"].astype("Int64")
+    actual["hash_actual"] = actual["hash_actual"].astype("Int64")
+
+    repetidas = actual.duplicated(LAYOUT_CLAVE, keep="first")
+    eliminar = actual.loc[repetidas, "id"].astype(int).tolist()
+    for i in range(0, len(eliminar), chunk_size):
+        conn.execute(tabla.delete().where(tabla.c.id.in_(eliminar[i:i + chunk_size])))
+
+    return actual[~repetidas].set_index(LAYOUT_CLAVE), len(eliminar)
+
+
+def _registros_update(df, **extra):
+    registros = df[LAYOUT_VALORES].assign(fila_hash=df["fila_hash"], **extra)
+    return registros.astype(object).to_dict("records")
+
+
+def cargar_layout_2d(bloques, progreso=None, chunk_size=CHUNK_SIZE):
+    """
+    Sincroniza el layout 2D con los bloques del Excel escribiendo solo
+    las diferencias, abre / cierra las alertas de stock crítico y recalcula el
+    resumen por ubicación del mapa y el índice de búsqueda.
+    Si una clave (ubicación, material) se repite en el archivo, gana la
+    última fila. Retorna el número de filas leídas.
+    """
+    if isinstance(bloques, pd.DataFrame):
+        bloques = [bloques]
+
+    inicio = time.perf_counter()
+    ahora = datetime.utcnow()
+
+    tabla = WarehouseLocation.__table__
+    conn = db.session.connection()
+
+    valores = {c: bindparam(c) for c in LAYOUT_VALORES + ["fila_hash"]}
+    # UPDATE por id (solo valores; la clave y su orden no cambian)
+    por_id = update(tabla).where(tabla.c.id == bindparam("_id")).values(valores)
+    # Clave insertada en un bloque anterior de esta misma carga (sin id conocido)
+    por_clave = (
+        update(tabla)
+        .where(tabla.c.ubicacion == bindparam("_ubicacion"), tabla.c.material_code == bindparam("_material_code"))
+        .values(valores)
+    )
+
+    filas = nuevos = cambiados = 0
+    vistos = set()
+
+    try:
+        actual, eliminados = _layout_actual(conn, tabla, chunk_size)
+
+        for df in bloques:
+            filas += len(df)
+            entrante = _normalizar_layout(df).drop_duplicates(LAYOUT_CLAVE, keep="last")
+            entrante["fila_hash"] = hash_layout(entrante)
+            entrante = entrante.join(actual, on=LAYOUT_CLAVE)
+
+            claves = list(zip(entrante["ubicacion"], entrante["material_code"]))
+            repetida = pd.Series([k in vistos for k in claves], index=entrante.index, dtype=bool)
+            vistos.update(claves)
+
+            existe = entrante["id"].notna()
+            cambio = existe & (repetida | entrante["hash_actual"].ne(entrante["fila_hash"]).fillna(True).astype(bool))
+
+            # UPDATE de filas existentes que cambiaron (o que el archivo repite)
+            modificar = entrante[cambio]
+            registros = _registros_update(modificar, _id=modificar["id"].astype(int))
+            for i in range(0, len(registros), chunk_size):
+                conn.execute(por_id, registros[i:i + chunk_size])
+
+            # UPDATE por clave: nueva en esta carga y repetida en el archivo
+            repetir = entrante[~existe & repetida]
+            registros = _registros_update(
+                repetir, _ubicacion=repetir["ubicacion"], _material_code=repetir["material_code"]
+            )
+            for i in range(0, len(registros), chunk_size):
+                conn.execute(por_clave, registros[i:i + chunk_size])
+
+            # INSERT
+            insertar = entrante[~existe & ~repetida]
+            if not insertar.empty:
+                insertar = insertar[LAYOUT_CLAVE + LAYOUT_VALORES + ["fila_hash"]].reset_index(drop=True)
+                insertar = pd.concat([insertar, claves_ubicacion(insertar["ubicacion"])], axis=1)
+                insertar["consumo_mes"] = 0.0
+                insertar["created_at"] = ahora
+                insertar_registros(conn, tabla, insertar.astype(object).to_dict("records"), chunk_size)
+
+            nuevos += len(insertar)
+            cambiados += len(modificar) + len(repetir)
+            if progreso:
+                progreso(filas)
+
+        # DELETE de las claves que no vinieron en el archivo
+        sobrantes = ~actual.index.isin(list(vistos)) if vistos else slice(None)
+        eliminar = actual.loc[sobrantes, "id"].astype(int).tolist()
+        for i in range(0, len(eliminar), chunk_size):
+            conn.execute(tabla.delete().where(tabla.c.id.in_(eliminar[i:i + chunk_size])))
+        eliminados += len(eliminar)
+
+        if eliminados or cambiados or nuevos:
+            recalcular_resumen_ubicaciones(conn)
+            indexar_layout_2d(conn)
+
+        # Una sola pasada sobre el layout ya cargado: abre / cierra alertas
+        alertas = sincronizar_alertas_stock(conn, ahora)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    invalidar_kpis()
+    if alertas["abiertas"]:
+        publicar_alertas()
+
+    segundos = time.perf_counter() - inicio
+    print(
+        f">>> Layout 2D cargado: {filas} filas en {round(segundos, 3)}s; "
+        f"{nuevos} nuevas, {cambiados} modificadas, {eliminados} eliminadas; "
+        f"alertas: {alertas['abiertas']} abiertas, {alertas['cerradas']} cerradas"
+    )
+    return filas
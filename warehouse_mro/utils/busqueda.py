@@ -0,0 +1,296 @@
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, delete, func, insert, or_, select, text, update
+
+from warehouse_mro.models import db
+from warehouse_mro.models.busqueda import IndiceBusqueda
+from warehouse_mro.models.inventory_stock import InventoryStock
+from warehouse_mro.models.warehouse2d import WarehouseLocation
+from warehouse_mro.models.equipos import Equipo
+
+# =====================================================
+# BUSCADOR DE MATERIALES / UBICACIONES / EQUIPOS
+# =====================================================
+# busqueda_indice guarda un documento por (origen, clave). Cada carga
+# sincroniza solo los documentos que cambiaron. El motor depende de la
+# base:
+#   sqlite      FTS5 (busqueda_fts, contenido externo + triggers)
+#   postgresql  pg_trgm (índices GIN sobre las tres columnas)
+#   otro / sin extensión: LIKE
+
+TABLA = IndiceBusqueda.__table__
+CAMPOS = ["material_code", "material_text", "ubicacion"]
+DOCUMENTO = ["clave"] + CAMPOS + ["stock"]
+
+MIN_CARACTERES = 2
+MAX_RESULTADOS = 50
+LOTE = 500
+
+_SQLITE_FTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_fts USING fts5(
+        material_code, material_text, ubicacion,
+        content='busqueda_indice', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busqueda_indice_ai AFTER INSERT ON busqueda_indice BEGIN
+        INSERT INTO busqueda_fts(rowid, material_code, material_text, ubicacion)
+        VALUES (new.id, new.material_code, new.material_text, new.ubicacion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busqueda_indice_ad AFTER DELETE ON busqueda_indice BEGIN
+        INSERT INTO busqueda_fts(busqueda_fts, rowid, material_code, material_text, ubicacion)
+        VALUES ('delete', old.id, old.material_code, old.material_text, old.ubicacion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busqueda_indice_au
+    AFTER UPDATE OF material_code, material_text, ubicacion ON busqueda_indice BEGIN
+        INSERT INTO busqueda_fts(busqueda_fts, rowid, material_code, material_text, ubicacion)
+        VALUES ('delete', old.id, old.material_code, old.material_text, old.ubicacion);
+        INSERT INTO busqueda_fts(rowid, material_code, material_text, ubicacion)
+        VALUES (new.id, new.material_code, new.material_text, new.ubicacion);
+    END
+    """,
+]
+
+_POSTGRES_TRGM = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    *[
+        f"CREATE INDEX IF NOT EXISTS ix_busqueda_{c}_trgm "
+        f"ON busqueda_indice USING gin ({c} gin_trgm_ops)"
+        for c in CAMPOS
+    ],
+]
+
+# Motor detectado por base de datos (url → "fts5" / "trgm" / "like")
+_motores = {}
+
+
+# =====================================================
+# PREPARACIÓN (AL INICIAR LA APP)
+# =====================================================
+
+def preparar_busqueda(engine):
+    """Crea el índice del motor disponible y retorna su nombre."""
+    dialecto = engine.dialect.name
+    motor = "like"
+
+    try:
+        with engine.begin() as conn:
+            if dialecto == "sqlite":
+                existia = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'busqueda_fts'"
+                )).first() is not None
+                for sql in _SQLITE_FTS:
+                    conn.execute(text(sql))
+                if not existia:
+                    # Documentos previos al índice FTS
+                    conn.execute(text("INSERT INTO busqueda_fts(busqueda_fts) VALUES ('rebuild')"))
+                motor = "fts5"
+            elif dialecto == "postgresql":
+                for sql in _POSTGRES_TRGM:
+                    conn.execute(text(sql))
+                motor = "trgm"
+    except Exception as e:
+        print(f"✖ Buscador: índice {dialecto} no disponible, se usa LIKE ({e})")
+
+    _motores[str(engine.url)] = motor
+    return motor
+
+
+def motor_busqueda():
+    return _motores.get(str(db.engine.url), "like")
+
+
+# =====================================================
+# SINCRONIZACIÓN INCREMENTAL
+# =====================================================
+
+def _documentos(df):
+    docs = df.reindex(columns=DOCUMENTO)
+    for c in ["clave"] + CAMPOS:
+        docs[c] = docs[c].fillna("").astype(str)
+    docs["stock"] = pd.to_numeric(docs["stock"], errors="coerce")
+    return docs.drop_duplicates("clave", keep="first")
+
+
+def sincronizar_origen(conn, origen, docs):
+    """
+    Deja en el índice exactamente `docs` (DataFrame con clave,
+    material_code, material_text, ubicacion, stock) para `origen`,
+    escribiendo solo las diferencias. Retorna conteos.
+    """
+    docs = _documentos(docs)
+    ahora = datetime.utcnow()
+
+    actual = pd.read_sql(
+        select(TABLA.c.id, *[TABLA.c[c] for c in DOCUMENTO]).where(TABLA.c.origen == origen),
+        conn,
+    )
+    ids = actual["id"]
+    actual = _documentos(actual)
+    actual["id"] = ids
+
+    merged = actual.merge(docs, on="clave", how="outer", suffixes=("_ant", ""), indicator=True)
+
+    eliminados = merged.loc[merged["_merge"] == "left_only", "id"].astype(int).tolist()
+    nuevos = merged[merged["_merge"] == "right_only"]
+
+    ambos = merged[merged["_merge"] == "both"]
+    cambio = np.zeros(len(ambos), dtype=bool)
+    for c in CAMPOS:
+        cambio |= (ambos[c] != ambos[f"{c}_ant"]).to_numpy()
+    stock, stock_ant = ambos["stock"].to_numpy(dtype=float), ambos["stock_ant"].to_numpy(dtype=float)
+    cambio |= ~np.isclose(stock, stock_ant, equal_nan=True)
+    modificados = ambos[cambio]
+
+    for i in range(0, len(eliminados), LOTE):
+        conn.execute(delete(TABLA).where(TABLA.c.id.in_(eliminados[i:i + LOTE])))
+
+    if not modificados.empty:
+        filas = modificados[["id"] + CAMPOS + ["stock"]].rename(columns={"id": "_id"})
+        filas["_id"] = filas["_id"].astype(int)
+        filas = filas.astype(object)
+        filas = filas.where(filas.notna(), None).assign(actualizado_en=ahora).to_dict("records")
+
+        stmt = (
+            update(TABLA)
+            .where(TABLA.c.id == bindparam("_id"))
+            .values({c: bindparam(c) for c in CAMPOS + ["stock", "actualizado_en"]})
+        )
+        for i in range(0, len(filas), LOTE):
+            conn.execute(stmt, filas[i:i + LOTE])
+
+    if not nuevos.empty:
+        filas = nuevos[DOCUMENTO].astype(object)
+        filas = filas.where(filas.notna(), None).assign(origen=origen, actualizado_en=ahora)
+        filas = filas.to_dict("records")
+        for i in range(0, len(filas), LOTE):
+            conn.execute(insert(TABLA), filas[i:i + LOTE])
+
+    return {
+        "insertados": len(nuevos),
+        "actualizados": len(modificados),
+        "eliminados": len(eliminados),
+    }
+
+
+def _clave(material, ubicacion):
+    return material.fillna("").astype(str) + "|" + ubicacion.fillna("").astype(str)
+
+
+def indexar_inventario(conn):
+    """Materiales del inventario activo (desde inventory_stock)."""
+    df = pd.read_sql(
+        select(
+            InventoryStock.material_code,
+            InventoryStock.material_text,
+            InventoryStock.location.label("ubicacion"),
+            InventoryStock.libre_utilizacion.label("stock"),
+        ),
+        conn,
+    )
+    df["clave"] = _clave(df["material_code"], df["ubicacion"])
+    return sincronizar_origen(conn, "inventario", df)
+
+
+def indexar_layout_2d(conn):
+    """Materiales por ubicación del layout 2D."""
+    df = pd.read_sql(
+        select(
+            WarehouseLocation.material_code,
+            func.max(WarehouseLocation.material_text).label("material_text"),
+            WarehouseLocation.ubicacion,
+            func.sum(WarehouseLocation.libre_utilizacion).label("stock"),
+        ).group_by(WarehouseLocation.ubicacion, WarehouseLocation.material_code),
+        conn,
+    )
+    df["clave"] = _clave(df["material_code"], df["ubicacion"])
+    return sincronizar_origen(conn, "ubicacion", df)
+
+
+def indexar_equipos(conn):
+    """Equipos: código, descripción y área (como ubicación)."""
+    df = pd.read_sql(
+        select(
+            Equipo.codigo.label("material_code"),
+            Equipo.descripcion.label("material_text"),
+            Equipo.area.label("ubicacion"),
+        ),
+        conn,
+    )
+    df["clave"] = df["material_code"].fillna("").astype(str)
+    return sincronizar_origen(conn, "equipo", df)
+
+
+def indexar_todo(conn):
+    return {
+        "inventario": indexar_inventario(conn),
+        "ubicacion": indexar_layout_2d(conn),
+        "equipo": indexar_equipos(conn),
+    }
+
+
+# =====================================================
+# CONSULTA (TYPEAHEAD)
+# =====================================================
+
+def _terminos(q):
+    return [t for t in re.split(r"[\W_]+", q or "", flags=re.UNICODE) if t]
+
+
+def _consulta_fts(terminos):
+    # Cada término como prefijo, todos obligatorios: "tor"* "e04"*
+    return " ".join(f'"{t}"*' for t in terminos)
+
+
+def buscar(q, limite=10, origen=None):
+    """
+    Busca `q` en código, descripción y ubicación.
+    Retorna lista de dicts (origen, material_code, material_text, ubicacion, stock).
+    """
+    q = (q or "").strip()
+    terminos = _terminos(q)
+    if len(q) < MIN_CARACTERES or not terminos:
+        return []
+
+    limite = max(1, min(int(limite), MAX_RESULTADOS))
+    columnas = [TABLA.c.origen, *[TABLA.c[c] for c in CAMPOS], TABLA.c.stock]
+    motor = motor_busqueda()
+
+    if motor == "fts5":
+        fts = text("SELECT rowid, rank FROM busqueda_fts WHERE busqueda_fts MATCH :q") \
+            .columns(rowid=db.Integer, rank=db.Float) \
+            .bindparams(q=_consulta_fts(terminos)) \
+            .subquery("fts")
+        stmt = (
+            select(*columnas)
+            .join_from(fts, TABLA, TABLA.c.id == fts.c.rowid)
+            .order_by(fts.c.rank)
+        )
+    else:
+        condiciones = []
+        for t in terminos:
+            patron = f"%{t}%"
+            condiciones.append(or_(*[TABLA.c[c].ilike(patron) for c in CAMPOS]))
+        stmt = select(*columnas).where(*condiciones)
+
+        if motor == "trgm":
+            similitud = func.greatest(*[func.similarity(TABLA.c[c], q) for c in CAMPOS])
+            stmt = stmt.order_by(similitud.desc())
+        else:
+            stmt = stmt.order_by(TABLA.c.material_code)
+
+    if origen:
+        stmt = stmt.where(TABLA.c.origen == origen)
+
+    filas = db.session.execute(stmt.limit(limite)).mappings().all()
+    return [dict(f) for f in filas]
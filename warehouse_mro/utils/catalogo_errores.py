@@ -0,0 +1,151 @@
+import os
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from warehouse_mro.models import db
+from warehouse_mro.models.tipo_error import TipoError
+from warehouse_mro.models.technician_error import TechnicianError
+
+# =====================================================
+# CATÁLOGO DE TIPOS DE ERROR (COSTO / PUNTAJE)
+# =====================================================
+# El catálogo vive en la tabla tipos_error y se lee de una copia en
+# memoria. Cada cambio toca un archivo de versión en instance/ (como
+# utils.kpis): los demás procesos recargan la copia solo cuando su
+# mtime cambia, sin consultar la tabla en cada registro.
+
+# Costos con los que se siembra el catálogo la primera vez
+COSTOS_INICIALES = {
+    "Error en codificación": {"dinero": 150, "puntaje": 10},
+    "Error en registro SAP": {"dinero": 300, "puntaje": 20},
+    "Error en ubicación de material": {"dinero": 500, "puntaje": 40},
+    "Error en conteo físico": {"dinero": 200, "puntaje": 15},
+    "Error en despacho": {"dinero": 450, "puntaje": 35},
+    "Error administrativo": {"dinero": 100, "puntaje": 5},
+}
+
+_cache = {"version": None, "por_nombre": {}, "por_id": {}}
+_cache_lock = threading.Lock()
+
+
+def _ruta_version():
+    return os.path.join(current_app.instance_path, "tipos_error.version")
+
+
+def _version():
+    try:
+        return os.stat(_ruta_version()).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def invalidar_catalogo():
+    with _cache_lock:
+        _cache["version"] = None
+
+    ruta = _ruta_version()
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "a"):
+            pass
+        os.utime(ruta, None)
+    except OSError as e:
+        print(f"✖ No se pudo marcar el catálogo de errores como vencido: {e}")
+
+
+def catalogo():
+    """Tipos de error por nombre: {nombre: {"id", "dinero", "puntaje", "activo"}}."""
+    version = _version()
+
+    with _cache_lock:
+        if _cache["version"] is not None and _cache["version"] == version:
+            return _cache["por_nombre"]
+
+    filas = db.session.execute(
+        select(TipoError.id, TipoError.nombre, TipoError.dinero, TipoError.puntaje, TipoError.activo)
+        .order_by(TipoError.nombre)
+    ).all()
+
+    por_nombre = {
+        f.nombre: {"id": f.id, "dinero": float(f.dinero), "puntaje": int(f.puntaje), "activo": bool(f.activo)}
+        for f in filas
+    }
+
+    with _cache_lock:
+        _cache["por_nombre"] = por_nombre
+        _cache["por_id"] = {v["id"]: dict(v, nombre=k) for k, v in por_nombre.items()}
+        _cache["version"] = version
+
+    return por_nombre
+
+
+def buscar_tipo(nombre):
+    """Entrada activa del catálogo para `nombre`, o None."""
+    tipo = catalogo().get(nombre)
+    return tipo if tipo and tipo["activo"] else None
+
+
+def tipos_activos():
+    return [nombre for nombre, t in catalogo().items() if t["activo"]]
+
+
+# =====================================================
+# ESCRITURAS
+# =====================================================
+
+def sembrar_catalogo(conn=None):
+    """
+    Crea las entradas de COSTOS_INICIALES que falten y enlaza los errores
+    existentes con su tipo por nombre. Retorna errores enlazados.
+    """
+    conn = conn or db.session.connection()
+    tabla = TipoError.__table__
+
+    existentes = set(conn.execute(select(tabla.c.nombre)).scalars())
+    nuevos = [
+        {"nombre": nombre, "dinero": c["dinero"], "puntaje": c["puntaje"], "activo": True,
+         "actualizado_en": datetime.utcnow()}
+        for nombre, c in COSTOS_INICIALES.items() if nombre not in existentes
+    ]
+    if nuevos:
+        conn.execute(tabla.insert(), nuevos)
+
+    id_por_nombre = (
+        select(TipoError.id)
+        .where(TipoError.nombre == TechnicianError.tipo_error)
+        .scalar_subquery()
+    )
+    res = conn.execute(
+        update(TechnicianError.__table__)
+        .where(
+            TechnicianError.tipo_error_id.is_(None),
+            TechnicianError.tipo_error.in_(select(TipoError.nombre)),
+        )
+        .values(tipo_error_id=id_por_nombre)
+    )
+    return res.rowcount
+
+
+def recalcular_costos(conn=None, tipo_id=None):
+    """
+    Reaplica costo y puntaje del catálogo a los errores registrados en un
+    solo UPDATE (de un tipo o de todos). Retorna filas actualizadas.
+    """
+    conn = conn or db.session.connection()
+
+    costo = lambda columna: (
+        select(columna).where(TipoError.id == TechnicianError.tipo_error_id).scalar_subquery()
+    )
+
+    stmt = (
+        update(TechnicianError.__table__)
+        .where(TechnicianError.tipo_error_id.isnot(None))
+        .values(dinero_perdido=costo(TipoError.dinero), puntaje=costo(TipoError.puntaje))
+    )
+    if tipo_id is not None:
+        stmt = stmt.where(TechnicianError.tipo_error_id == tipo_id)
+
+    return conn.execute(stmt).rowcount
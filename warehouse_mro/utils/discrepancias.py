@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from warehouse_mro.models import db
+from warehouse_mro.models.inventory_stock import InventoryStock
+
+# =====================================================
+# DISCREPANCIAS: CONTEO FÍSICO VS SISTEMA
+# =====================================================
+
+def calcular_discrepancias(df):
+    """
+    Compara el conteo físico (DataFrame con columnas oficiales) contra el
+    stock del sistema y retorna el detalle con Diferencia y Estado.
+    """
+    df["Código del Material"] = df["Código del Material"].astype(str)
+    df["Ubicación"] = df["Ubicación"].astype(str)
+
+    # Stock del sistema ya agregado por (material_code, location) en la carga
+    sistema = pd.read_sql(
+        db.session.query(
+            InventoryStock.material_code.label("Código Material"),
+            InventoryStock.material_text.label("Descripción"),
+            InventoryStock.base_unit.label("Unidad"),
+            InventoryStock.location.label("Ubicación"),
+            InventoryStock.libre_utilizacion.label("Stock sistema"),
+        ).statement,
+        db.session.connection()
+    )
+
+    conteo = df.groupby(
+        ["Código del Material", "Ubicación"], as_index=False
+    )["Libre utilización"].sum()
+
+    conteo = conteo.rename(columns={
+        "Código del Material": "Código Material",
+        "Libre utilización": "Stock contado"
+    })
+
+    merged = sistema.merge(conteo, on=["Código Material", "Ubicación"], how="outer")
+
+    merged["Stock sistema"] = merged["Stock sistema"].fillna(0)
+    merged["Stock contado"] = merged["Stock contado"].fillna(0)
+    merged["Diferencia"] = merged["Stock contado"] - merged["Stock sistema"]
+
+    merged["Estado"] = clasificar_diferencias(merged["Diferencia"])
+
+    return merged
+
+
+def clasificar_diferencias(diferencia):
+    """OK / CRÍTICO (≤ -10) / FALTA (< 0) / SOBRA (> 0), vectorizado."""
+    d = np.asarray(diferencia, dtype=float)
+    return np.select(
+        [d == 0, d <= -10, d < 0],
+        ["OK", "CRÍTICO", "FALTA"],
+        default="SOBRA",
+    )
@@ -0,0 +1,220 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import current_process, get_context
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from sqlalchemy import func, select, tuple_
+
+from warehouse_mro.models import db
+from warehouse_mro.models.warehouse2d import WarehouseLocation
+from warehouse_mro.utils.excel import claves_ubicacion
+from warehouse_mro.utils.qr_cache import carpeta_cache_qr, qr_png
+
+# =====================================================
+# HOJAS DE ETIQUETAS QR (UBICACIONES / MATERIALES)
+# =====================================================
+# Corre como trabajo en la cola (tarea "etiquetas_qr"): un lote grande
+# tarda más que el timeout de un request. Los QR se generan en un pool de
+# procesos (Pillow trabaja con el GIL tomado) y se consumen en orden:
+# cada hoja se dibuja apenas llegan sus códigos.
+
+COLUMNAS = 3
+FILAS = 8
+POR_HOJA = COLUMNAS * FILAS
+
+MARGEN = 28
+QR_BOX = 4
+
+# Por debajo de esto no compensa levantar procesos
+MIN_POOL = 200
+CHUNK_POOL = 64
+
+MAX_ETIQUETAS = 20000
+
+
+# =====================================================
+# SELECCIÓN
+# =====================================================
+
+def _clave(ubicacion):
+    fila = claves_ubicacion([ubicacion]).iloc[0]
+    return int(fila["loc_main"]), str(fila["loc_letters"]), int(fila["loc_last"])
+
+
+def etiquetas_ubicaciones(desde, hasta):
+    """
+    Una etiqueta por ubicación del layout 2D entre `desde` y `hasta`
+    (ambas incluidas), en el orden natural de ubicaciones. Lee hasta
+    MAX_ETIQUETAS + 1 para saber si la selección se recorta.
+    """
+    clave = tuple_(WarehouseLocation.loc_main, WarehouseLocation.loc_letters, WarehouseLocation.loc_last)
+
+    stmt = (
+        select(
+            WarehouseLocation.ubicacion,
+            func.count(WarehouseLocation.id).label("materiales"),
+        )
+        .where(clave >= tuple_(*_clave(desde)), clave <= tuple_(*_clave(hasta)))
+        .group_by(
+            WarehouseLocation.loc_main,
+            WarehouseLocation.loc_letters,
+            WarehouseLocation.loc_last,
+            WarehouseLocation.ubicacion,
+        )
+        .order_by(
+            WarehouseLocation.loc_main,
+            WarehouseLocation.loc_letters,
+            WarehouseLocation.loc_last,
+            WarehouseLocation.ubicacion,
+        )
+        .limit(MAX_ETIQUETAS + 1)
+    )
+
+    return [
+        {
+            "qr": f.ubicacion,
+            "titulo": f.ubicacion,
+            "lineas": [f"{f.materiales} material(es)"],
+        }
+        for f in db.session.execute(stmt)
+    ]
+
+
+def etiquetas_materiales(codigos):
+    """Una etiqueta por (material, ubicación) del layout 2D para `codigos`."""
+    codigos = list(dict.fromkeys(c.strip() for c in codigos if c and c.strip()))
+    if not codigos:
+        return []
+
+    stmt = (
+        select(
+            WarehouseLocation.material_code,
+            func.max(WarehouseLocation.material_text).label("material_text"),
+            WarehouseLocation.ubicacion,
+        )
+        .where(WarehouseLocation.material_code.in_(codigos))
+        .group_by(
+            WarehouseLocation.material_code,
+            WarehouseLocation.loc_main,
+            WarehouseLocation.loc_letters,
+            WarehouseLocation.loc_last,
+            WarehouseLocation.ubicacion,
+        )
+        .order_by(
+            WarehouseLocation.material_code,
+            WarehouseLocation.loc_main,
+            WarehouseLocation.loc_letters,
+            WarehouseLocation.loc_last,
+        )
+        .limit(MAX_ETIQUETAS + 1)
+    )
+
+    return [
+        {
+            "qr": f.material_code,
+            "titulo": f.material_code,
+            "lineas": [(f.material_text or "")[:34], f.ubicacion],
+        }
+        for f in db.session.execute(stmt)
+    ]
+
+
+def seleccionar_etiquetas(parametros):
+    """
+    Etiquetas del formulario (modo ubicaciones: desde / hasta; modo
+    materiales: lista de códigos). Retorna (etiquetas, nombre, recortado).
+    """
+    if parametros.get("modo") == "materiales":
+        etiquetas = etiquetas_materiales(parametros.get("materiales", []))
+        nombre = "etiquetas_materiales.pdf"
+    else:
+        desde = parametros.get("desde", "")
+        hasta = parametros.get("hasta") or desde
+        etiquetas = etiquetas_ubicaciones(desde, hasta) if desde else []
+        nombre = "etiquetas_ubicaciones.pdf"
+
+    return etiquetas[:MAX_ETIQUETAS], nombre, len(etiquetas) > MAX_ETIQUETAS
+
+
+# =====================================================
+# GENERACIÓN DE QR (EN PROCESOS)
+# =====================================================
+
+def _qr_png(data, carpeta=None):
+    # Pasa por la caché QR (en los procesos hijos solo la de disco persiste)
+    return qr_png(data or "SIN-DATO", box_size=QR_BOX, border=1, carpeta=carpeta)[0]
+
+
+def _iter_qr(datos, procesos=None):
+    carpeta = carpeta_cache_qr()
+    generar = partial(_qr_png, carpeta=carpeta)
+
+    # Un worker embebido (JOBS_EMBEDDED=1) es un proceso daemon y no puede
+    # tener hijos: ahí se dibuja en serie
+    if len(datos) < MIN_POOL or procesos == 1 or current_process().daemon:
+        for d in datos:
+            yield generar(d)
+        return
+
+    # spawn: un fork heredaría conexiones de la base e hilos del proceso
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=get_context("spawn")) as pool:
+        yield from pool.map(generar, datos, chunksize=CHUNK_POOL)
+
+
+# =====================================================
+# PDF
+# =====================================================
+
+def _dibujar_etiqueta(c, x, y, ancho, alto, etiqueta, png):
+    c.setLineWidth(0.3)
+    c.setStrokeGray(0.75)
+    c.rect(x, y, ancho, alto)
+
+    lado = alto - 8
+    c.drawImage(ImageReader(io.BytesIO(png)), x + 4, y + 4, lado, lado)
+
+    tx = x + lado + 10
+    c.setFillGray(0)
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(tx, y + alto - 20, str(etiqueta["titulo"])[:18])
+
+    c.setFont("Helvetica", 7)
+    ty = y + alto - 34
+    for linea in etiqueta.get("lineas", []):
+        c.drawString(tx, ty, str(linea or "")[:28])
+        ty -= 10
+
+
+def escribir_hojas(salida, etiquetas, procesos=None, titulo="Etiquetas QR", progreso=None):
+    """
+    Dibuja `etiquetas` (dicts qr, titulo, lineas) en hojas A4 de
+    COLUMNAS x FILAS sobre `salida` (ruta o archivo). Retorna hojas.
+    `progreso(hojas)` se llama cada 20 hojas.
+    """
+    c = canvas.Canvas(salida, pagesize=A4)
+    c.setTitle(titulo)
+    width, height = A4
+
+    ancho = (width - 2 * MARGEN) / COLUMNAS
+    alto = (height - 2 * MARGEN) / FILAS
+
+    hojas = 0
+    for i, png in enumerate(_iter_qr([e["qr"] for e in etiquetas], procesos)):
+        pos = i % POR_HOJA
+        if pos == 0 and i:
+            c.showPage()
+        if pos == 0:
+            hojas += 1
+            if progreso and hojas % 20 == 0:
+                progreso(hojas)
+
+        col, fila = pos % COLUMNAS, pos // COLUMNAS
+        x = MARGEN + col * ancho
+        y = height - MARGEN - (fila + 1) * alto
+        _dibujar_etiqueta(c, x, y, ancho, alto, etiquetas[i], png)
+
+    c.save()
+    return hojas
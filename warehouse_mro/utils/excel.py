@@ -1,10 +1,19 @@
 import io
+import csv
+import os
+import shutil
+import tempfile
 import pandas as pd
 import unicodedata
 import re
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 
+try:
+    import xlsxwriter
+except Exception:  # xlsxwriter no instalado
+    xlsxwriter = None
+
 # =====================================================
 # NORMALIZACIÓN
 # =====================================================
@@ -31,6 +40,12 @@ EQUIVALENCIAS = {
     "libre utilizacion": "Libre utilización",
     "libre utilización": "Libre utilización",
     "stock": "Libre utilización",
+
+    "stock de seguridad": "Stock de seguridad",
+    "stock seguridad": "Stock de seguridad",
+
+    "stock maximo": "Stock máximo",
+    "stock max": "Stock máximo",
 }
 
 
@@ -44,10 +59,13 @@ def limpiar(texto: str) -> str:
 
 
 def mapear_columnas(df, requeridas):
-    columnas_originales = list(df.columns)
+    return mapear_encabezados(list(df.columns), requeridas)
+
+
+def mapear_encabezados(encabezados, requeridas):
     columns_map = {}
 
-    for col in columnas_originales:
+    for col in encabezados:
         clean = limpiar(col)
         if clean in EQUIVALENCIAS:
             columns_map[col] = EQUIVALENCIAS[clean]
@@ -56,6 +74,238 @@ def mapear_columnas(df, requeridas):
     return columns_map, faltantes
 
 
+# =====================================================
+# LECTURA POR BLOQUES (MEMORIA CONSTANTE)
+# =====================================================
+
+CHUNK_FILAS = 5000
+
+
+def _es_csv(file_storage):
+    nombre = (getattr(file_storage, "filename", "") or "").lower()
+    mimetype = (getattr(file_storage, "mimetype", "") or "").lower()
+    return nombre.endswith(".csv") or mimetype in ("text/csv", "application/csv")
+
+
+def _es_xls(file_storage):
+    nombre = (getattr(file_storage, "filename", "") or "").lower()
+    return os.path.splitext(nombre)[1] == ".xls"
+
+
+def _indices_oficiales(encabezados, requeridas):
+    """Posición de cada columna oficial dentro de la fila original."""
+    columnas_mapeadas, faltantes = mapear_encabezados(encabezados, requeridas)
+    if faltantes:
+        raise ValueError("Faltan columnas requeridas: " + ", ".join(faltantes))
+
+    # Igual que antes: si dos encabezados mapean a la misma columna, gana el último
+    indices = {}
+    for pos, col in enumerate(encabezados):
+        if col in columnas_mapeadas:
+            indices[columnas_mapeadas[col]] = pos
+    return indices
+
+
+def _bloques_xlsx(stream, requeridas, chunk_size):
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    ws = wb.active
+    filas = ws.iter_rows(values_only=True)
+
+    try:
+        encabezados = next(filas, None) or ()
+        indices = _indices_oficiales(list(encabezados), requeridas)
+    except Exception:
+        wb.close()
+        raise
+
+    def generar():
+        oficiales = list(indices.keys())
+        posiciones = list(indices.values())
+        bloque = []
+        try:
+            for fila in filas:
+                if fila is None or all(v is None for v in fila):
+                    continue
+                bloque.append([fila[p] if p < len(fila) else None for p in posiciones])
+                if len(bloque) >= chunk_size:
+                    yield pd.DataFrame(bloque, columns=oficiales)
+                    bloque = []
+            if bloque:
+                yield pd.DataFrame(bloque, columns=oficiales)
+        finally:
+            wb.close()
+
+    return generar()
+
+
+def _encabezados_csv(stream):
+    """
+    (separador, encabezados) leyendo solo el inicio del archivo, sin
+    pasarle el stream a pandas (que lo cierra al descartar el lector).
+    Deja el stream al principio.
+    """
+    muestra = stream.read(64 * 1024)
+    stream.seek(0)
+    if isinstance(muestra, bytes):
+        muestra = muestra.decode("utf-8-sig", errors="replace")
+
+    try:
+        separador = csv.Sniffer().sniff(muestra, delimiters=",;\t|").delimiter
+    except csv.Error:
+        separador = ","
+
+    encabezados = next(csv.reader(io.StringIO(muestra), delimiter=separador), [])
+    return separador, encabezados
+
+
+def _bloques_csv(stream, requeridas, chunk_size):
+    separador, encabezados = _encabezados_csv(stream)
+    indices = _indices_oficiales(encabezados, requeridas)
+
+    def generar():
+        oficiales = list(indices.keys())
+        posiciones = list(indices.values())
+
+        # Todo como texto: con chunksize cada bloque infiere sus tipos por
+        # separado y un código como "000123" perdería los ceros (o cambiaría
+        # de tipo entre bloques). Los números se convierten en iter_excel_chunks.
+        lector = pd.read_csv(
+            stream,
+            sep=separador,
+            dtype=str,
+            chunksize=chunk_size,
+            encoding="utf-8-sig",
+            encoding_errors="replace",
+        )
+        with lector:
+            for bloque in lector:
+                bloque = bloque.iloc[:, posiciones]
+                bloque.columns = oficiales
+                yield bloque.reset_index(drop=True)
+
+    return generar()
+
+
+def _bloques_xls(stream, requeridas, chunk_size):
+    # .xls (formato antiguo) no tiene lector por streaming en openpyxl
+    df = pd.read_excel(stream)
+    indices = _indices_oficiales(list(df.columns), requeridas)
+    df = df.iloc[:, list(indices.values())]
+    df.columns = list(indices.keys())
+
+    def generar():
+        for inicio in range(0, len(df), chunk_size):
+            yield df.iloc[inicio:inicio + chunk_size].reset_index(drop=True)
+
+    return generar()
+
+
+def _stream_seekable(file_storage):
+    stream = getattr(file_storage, "stream", file_storage)
+    stream.seek(0)
+
+    # SpooledTemporaryFile (Python 3.10) no expone seekable(), que openpyxl
+    # necesita para abrir el zip: se copia a un temporal en disco.
+    if not hasattr(stream, "seekable"):
+        temporal = tempfile.TemporaryFile()
+        shutil.copyfileobj(stream, temporal)
+        temporal.seek(0)
+        stream = temporal
+
+    return stream
+
+
+# Columnas oficiales numéricas: float (vacío o no numérico → 0) en todo
+# bloque, venga de xlsx (celdas mixtas) o de csv (todo texto)
+COLUMNAS_NUMERICAS = ["Libre utilización", "Stock de seguridad", "Stock máximo"]
+
+
+def _con_numeros(bloques):
+    try:
+        for bloque in bloques:
+            for c in COLUMNAS_NUMERICAS:
+                if c in bloque.columns:
+                    bloque[c] = pd.to_numeric(bloque[c], errors="coerce").fillna(0).astype(float)
+            yield bloque
+    finally:
+        bloques.close()
+
+
+def iter_excel_chunks(file_storage, requeridas, chunk_size=CHUNK_FILAS):
+    """
+    Lee el archivo subido (xlsx / csv) por bloques de `chunk_size` filas,
+    ya con las columnas oficiales y las numéricas como float. Valida
+    encabezados al llamarse (ValueError si faltan columnas), antes de
+    consumir cualquier bloque.
+    """
+    stream = _stream_seekable(file_storage)
+
+    if _es_csv(file_storage):
+        return _con_numeros(_bloques_csv(stream, requeridas, chunk_size))
+    if _es_xls(file_storage):
+        return _con_numeros(_bloques_xls(stream, requeridas, chunk_size))
+    return _con_numeros(_bloques_xlsx(stream, requeridas, chunk_size))
+
+
+def contar_filas(file_storage):
+    """
+    Filas de datos aproximadas (sin encabezado) para mostrar el avance, o
+    None si no se conocen sin leer el archivo (.xls, xlsx sin dimensión).
+    Deja el archivo al inicio.
+    """
+    stream = _stream_seekable(file_storage)
+    try:
+        if _es_csv(file_storage):
+            lineas = 0
+            while True:
+                bloque = stream.read(1024 * 1024)
+                if not bloque:
+                    break
+                lineas += bloque.count(b"\n" if isinstance(bloque, bytes) else "\n")
+            return max(lineas - 1, 0)
+        if _es_xls(file_storage):
+            return None
+
+        # read_only: max_row sale de la dimensión guardada, sin recorrer filas
+        wb = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            filas = wb.active.max_row
+        finally:
+            wb.close()
+        return filas - 1 if filas else None
+    finally:
+        getattr(file_storage, "stream", file_storage).seek(0)
+
+
+def validar_excel(file_storage, requeridas):
+    """
+    Lee solo la fila de encabezados y valida las columnas requeridas
+    (ValueError si faltan). Deja el archivo al inicio para guardarlo.
+    """
+    stream = _stream_seekable(file_storage)
+
+    if _es_csv(file_storage):
+        _indices_oficiales(_encabezados_csv(stream)[1], requeridas)
+    elif _es_xls(file_storage):
+        _indices_oficiales(list(pd.read_excel(stream, nrows=0).columns), requeridas)
+    else:
+        wb = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            encabezados = next(wb.active.iter_rows(max_row=1, values_only=True), None) or ()
+            _indices_oficiales(list(encabezados), requeridas)
+        finally:
+            wb.close()
+
+    getattr(file_storage, "stream", file_storage).seek(0)
+
+
+def _concatenar(bloques, requeridas):
+    bloques = list(bloques)
+    if not bloques:
+        return pd.DataFrame(columns=list(requeridas.values()))
+    return pd.concat(bloques, ignore_index=True)
+
+
 # =====================================================
 # INVENTARIO BASE
 # =====================================================
@@ -69,17 +319,16 @@ INV_REQUIRED = {
 }
 
 
-def load_inventory_excel(file_storage):
-    content = file_storage.read()
-    df = pd.read_excel(io.BytesIO(content))
-    file_storage.seek(0)
+def iter_inventory_excel(file_storage, chunk_size=CHUNK_FILAS):
+    return iter_excel_chunks(file_storage, INV_REQUIRED, chunk_size)
 
-    columnas_mapeadas, faltantes = mapear_columnas(df, INV_REQUIRED)
-    if faltantes:
-        raise ValueError("Faltan columnas requeridas: " + ", ".join(faltantes))
 
-    final = {oficial: df[original] for original, oficial in columnas_mapeadas.items()}
-    return pd.DataFrame(final)
+def validar_inventory_excel(file_storage):
+    validar_excel(file_storage, INV_REQUIRED)
+
+
+def load_inventory_excel(file_storage):
+    return _concatenar(iter_inventory_excel(file_storage), INV_REQUIRED)
 
 
 # =====================================================
@@ -97,17 +346,16 @@ WAREHOUSE_2D_REQUIRED = {
 }
 
 
-def load_warehouse2d_excel(file_storage):
-    content = file_storage.read()
-    df = pd.read_excel(io.BytesIO(content))
-    file_storage.seek(0)
+def iter_warehouse2d_excel(file_storage, chunk_size=CHUNK_FILAS):
+    return iter_excel_chunks(file_storage, WAREHOUSE_2D_REQUIRED, chunk_size)
 
-    columnas_mapeadas, faltantes = mapear_columnas(df, WAREHOUSE_2D_REQUIRED)
-    if faltantes:
-        raise ValueError("Faltan columnas requeridas: " + ", ".join(faltantes))
 
-    final = {oficial: df[original] for original, oficial in columnas_mapeadas.items()}
-    return pd.DataFrame(final)
+def validar_warehouse2d_excel(file_storage):
+    validar_excel(file_storage, WAREHOUSE_2D_REQUIRED)
+
+
+def load_warehouse2d_excel(file_storage):
+    return _concatenar(iter_warehouse2d_excel(file_storage), WAREHOUSE_2D_REQUIRED)
 
 
 # =====================================================
@@ -127,14 +375,76 @@ def sort_location_advanced(loc):
     return (main, letters, last)
 
 
+def claves_ubicacion(ubicaciones):
+    """
+    sort_location_advanced vectorizado sobre una Serie de ubicaciones.
+    Retorna DataFrame con loc_main, loc_letters, loc_last (mismo índice),
+    para guardarlo en la carga y ordenar en la base de datos.
+    """
+    loc = pd.Series(ubicaciones).fillna("").astype(str).str.upper()
+    vacia = loc == ""
+
+    main = pd.to_numeric(loc.str.extract(r"(\d+)", expand=False), errors="coerce")
+    last = pd.to_numeric(loc.str.extract(r"(\d+)\D*$", expand=False), errors="coerce")
+    letters = loc.str.replace(r"[\W\d_]+", "", regex=True).str[1:]
+
+    claves = pd.DataFrame({
+        "loc_main": main.fillna(999999).astype("int64"),
+        "loc_letters": letters.where(letters != "", "Z"),
+        "loc_last": last.fillna(999999).astype("int64"),
+    }, index=loc.index)
+
+    claves.loc[vacia, ["loc_main", "loc_letters", "loc_last"]] = [999999, "Z", 999999]
+    return claves
+
+
 # =====================================================
 # GENERAR EXCEL DE DISCREPANCIAS
 # =====================================================
 
-def generate_discrepancies_excel(df):
+def _anchos_columnas(df):
+    """Ancho por columna: largo máximo (encabezado o valor) + 2, vectorizado."""
+    anchos = []
+    for col in df.columns:
+        serie = df[col]
+        largo = serie.astype(str).str.len().max() if len(serie) else 0
+        anchos.append(max(len(str(col)), int(largo or 0)) + 2)
+    return anchos
+
+
+def _excel_xlsxwriter(df, hoja):
+    output = io.BytesIO()
+
+    # constant_memory: cada fila se escribe y se descarga a disco
+    wb = xlsxwriter.Workbook(output, {"constant_memory": True})
+    ws = wb.add_worksheet(hoja)
+
+    encabezado = wb.add_format({
+        "bold": True,
+        "align": "center",
+        "bg_color": "#DDDDDD",
+        "pattern": 1,
+    })
+
+    for col, ancho in enumerate(_anchos_columnas(df)):
+        ws.set_column(col, col, ancho)
+
+    ws.write_row(0, 0, [str(h) for h in df.columns], encabezado)
+
+    # NaN → celda vacía
+    valores = df.astype(object).where(df.notna(), None)
+    for fila, registro in enumerate(valores.itertuples(index=False, name=None), 1):
+        ws.write_row(fila, 0, registro)
+
+    wb.close()
+    output.seek(0)
+    return output
+
+
+def _excel_openpyxl(df, hoja):
     wb = Workbook()
     ws = wb.active
-    ws.title = "Discrepancias"
+    ws.title = hoja
 
     headers = df.columns.tolist()
 
@@ -146,20 +456,12 @@ def generate_discrepancies_excel(df):
         cell.fill = PatternFill(start_color="DDDDDD", fill_type="solid")
 
     # Datos
-    for row_idx, row in df.iterrows():
-        for col_idx, value in enumerate(row.tolist(), 1):
-            ws.cell(row=row_idx + 2, column=col_idx, value=value)
+    for row in df.itertuples(index=False, name=None):
+        ws.append(list(row))
 
     # Ajuste de ancho de columnas
-    for col in ws.columns:
-        max_len = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            try:
-                max_len = max(max_len, len(str(cell.value)))
-            except:
-                pass
-        ws.column_dimensions[col_letter].width = max_len + 2
+    for col, ancho in enumerate(_anchos_columnas(df), 1):
+        ws.column_dimensions[ws.cell(row=1, column=col).column_letter].width = ancho
 
     # Guardar archivo en memoria
     output = io.BytesIO()
@@ -167,3 +469,9 @@ def generate_discrepancies_excel(df):
     output.seek(0)
 
     return output
+
+
+def generate_discrepancies_excel(df):
+    if xlsxwriter is not None:
+        return _excel_xlsxwriter(df, "Discrepancias")
+    return _excel_openpyxl(df, "Discrepancias")
@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import Integer, String, cast, extract, func, literal, select, union_all
+
+from warehouse_mro.models import db
+from warehouse_mro.models.inventory import InventoryItem
+from warehouse_mro.models.bultos import Bulto
+from warehouse_mro.models.alerts import Alert
+from warehouse_mro.models.warehouse2d import WarehouseLocation
+from warehouse_mro.models.technician_error import TechnicianError
+from warehouse_mro.models.equipos import Equipo
+
+# =====================================================
+# KPIs DEL DASHBOARD (CACHÉ EN PROCESO CON TTL)
+# =====================================================
+# Las escrituras (cargas, bultos, errores, alertas, equipos) llaman a
+# invalidar_kpis(). Como las cargas corren en los workers, además de
+# vaciar la caché local se toca un archivo marca en instance/: cada
+# proceso compara su mtime antes de usar la caché.
+
+KPI_CACHE_SECONDS = 30
+
+_cache = {"datos": None, "expira": 0.0, "marca": None}
+_cache_lock = threading.Lock()
+_calculo_lock = threading.Lock()
+
+
+def _ruta_marca():
+    return os.path.join(current_app.instance_path, "kpis.version")
+
+
+def _marca():
+    try:
+        return os.stat(_ruta_marca()).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def invalidar_kpis():
+    with _cache_lock:
+        _cache["datos"] = None
+
+    ruta = _ruta_marca()
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "a"):
+            pass
+        os.utime(ruta, None)
+    except OSError as e:
+        print(f"✖ No se pudo marcar KPIs como vencidos: {e}")
+
+
+def _vigente(marca):
+    datos = _cache["datos"]
+    if datos is not None and time.monotonic() < _cache["expira"] and _cache["marca"] == marca:
+        return datos
+    return None
+
+
+def obtener_kpis():
+    """KPIs del dashboard; recalcula como máximo una vez por TTL o invalidación."""
+    marca = _marca()
+
+    with _cache_lock:
+        datos = _vigente(marca)
+    if datos is not None:
+        return datos
+
+    # Un solo cálculo a la vez: el resto espera y reutiliza el resultado
+    with _calculo_lock:
+        with _cache_lock:
+            datos = _vigente(marca)
+        if datos is not None:
+            return datos
+
+        datos = calcular_kpis()
+        ttl = current_app.config.get("KPI_CACHE_SECONDS", KPI_CACHE_SECONDS)
+
+        with _cache_lock:
+            _cache["datos"] = datos
+            _cache["expira"] = time.monotonic() + ttl
+            _cache["marca"] = marca
+
+    return datos
+
+
+# =====================================================
+# CÁLCULO (3 CONSULTAS, SQL PORTABLE)
+# =====================================================
+
+def _dia_semana(columna, dialecto):
+    """0 = domingo ... 6 = sábado en todas las bases."""
+    if dialecto == "sqlite":
+        return cast(func.strftime("%w", columna), Integer)
+    if dialecto in ("mysql", "mariadb"):
+        return func.dayofweek(columna) - 1  # DAYOFWEEK: 1 = domingo
+    return cast(extract("dow", columna), Integer)  # PostgreSQL
+
+
+def _hora(columna, dialecto):
+    if dialecto == "sqlite":
+        return cast(func.strftime("%H", columna), Integer)
+    return cast(extract("hour", columna), Integer)
+
+
+def _contadores(hoy, manana):
+    def contar(columna, *condiciones):
+        return select(func.count(columna)).where(*condiciones).scalar_subquery()
+
+    return db.session.execute(
+        select(
+            contar(InventoryItem.id).label("total_stock"),
+            contar(Bulto.id, Bulto.fecha_hora >= hoy, Bulto.fecha_hora < manana).label("bultos_hoy"),
+            contar(Alert.id, Alert.estado == "activo").label("alertas_activas"),
+            contar(
+                TechnicianError.id,
+                TechnicianError.creado_en >= hoy,
+                TechnicianError.creado_en < manana,
+            ).label("errores_hoy"),
+        )
+    ).one()
+
+
+def _series():
+    """Estados 2D, alertas por día de semana y bultos por hora en un UNION ALL."""
+    dialecto = db.session.get_bind().dialect.name
+    dia = _dia_semana(Alert.fecha, dialecto)
+    hora = _hora(Bulto.fecha_hora, dialecto)
+
+    consulta = union_all(
+        select(
+            literal("estado").label("serie"),
+            cast(WarehouseLocation.status, String).label("clave"),
+            func.count().label("cantidad"),
+        ).group_by(WarehouseLocation.status),
+        select(literal("dia"), cast(dia, String), func.count())
+        .where(Alert.fecha.isnot(None))
+        .group_by(dia),
+        select(literal("hora"), cast(hora, String), func.count())
+        .where(Bulto.fecha_hora.isnot(None))
+        .group_by(hora),
+    )
+
+    series = {"estado": {}, "dia": {}, "hora": {}}
+    for serie, clave, cantidad in db.session.execute(consulta):
+        series[serie][clave] = cantidad
+    return series
+
+
+def _equipos():
+    productividad = getattr(Equipo, "productividad", None)
+    estado = getattr(Equipo, "estado", None)
+
+    return db.session.execute(
+        select(
+            Equipo.codigo,
+            productividad if productividad is not None else literal(0),
+            estado if estado is not None else literal(None),
+        ).order_by(Equipo.id)
+    ).all()
+
+
+def calcular_kpis():
+    hoy = datetime.combine(date.today(), datetime.min.time())
+    manana = hoy + timedelta(days=1)
+
+    contadores = _contadores(hoy, manana)
+    series = _series()
+    equipos = _equipos()
+
+    estados_2d = series["estado"]
+
+    alertas_dias = [0] * 7
+    for dia, cant in series["dia"].items():
+        alertas_dias[int(dia)] = cant
+
+    horas = {str(h).zfill(2): 0 for h in range(6, 18)}
+    for h, cant in series["hora"].items():
+        h = str(int(h)).zfill(2)
+        if h in horas:
+            horas[h] = cant
+
+    estados = {}
+    for _, _, estado in equipos:
+        estado = estado or "Sin estado"
+        estados[estado] = estados.get(estado, 0) + 1
+
+    return {
+        "total_stock": contadores.total_stock,
+        "bultos_hoy": contadores.bultos_hoy,
+        "alertas_activas": contadores.alertas_activas,
+        "errores_hoy": contadores.errores_hoy,
+        "criticos": estados_2d.get("crítico", 0),
+        "bajos": estados_2d.get("bajo", 0),
+        "normales": estados_2d.get("normal", 0),
+        "vacios": estados_2d.get("vacío", 0),
+        "alertas_dias": alertas_dias,
+        "horas_bultos": horas,
+        "prod_labels": [codigo for codigo, _, _ in equipos],
+        "prod_values": [prod or 0 for _, prod, _ in equipos],
+        "estado_labels": list(estados.keys()),
+        "estado_values": list(estados.values()),
+    }
@@ -0,0 +1,99 @@
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, select
+
+from warehouse_mro.models import db
+from warehouse_mro.models.warehouse2d import WarehouseLocation
+from warehouse_mro.models.location_summary import LocationSummary
+
+# =====================================================
+# RESUMEN POR UBICACIÓN DEL MAPA 2D
+# =====================================================
+
+# Ranking de severidad
+STATUS_RANK = {
+    "vacío": 0,
+    "normal": 1,
+    "bajo": 2,
+    "crítico": 3,
+}
+ESTADOS = {rank: estado for estado, rank in STATUS_RANK.items()}
+
+SIN_UBICACION = "SIN UBICACIÓN"
+
+
+def recalcular_resumen_ubicaciones(conn=None, generado_en=None):
+    """
+    Reescribe location_summary desde warehouse_locations.
+    Se llama dentro de la transacción de carga del layout.
+    Retorna el número de ubicaciones.
+    """
+    conn = conn or db.session.connection()
+    generado_en = generado_en or datetime.utcnow()
+
+    # Agregación en SQL: estado por fila con el CASE del modelo
+    ubicacion = func.coalesce(func.nullif(WarehouseLocation.ubicacion, ""), SIN_UBICACION)
+    rank = case(STATUS_RANK, value=WarehouseLocation.status, else_=0)
+
+    resumen = pd.read_sql(
+        select(
+            ubicacion.label("ubicacion"),
+            func.coalesce(func.sum(WarehouseLocation.libre_utilizacion), 0).label("total_libre"),
+            func.count().label("items"),
+            func.max(rank).label("status_rank"),
+            func.min(WarehouseLocation.loc_main).label("loc_main"),
+            func.min(WarehouseLocation.loc_letters).label("loc_letters"),
+            func.min(WarehouseLocation.loc_last).label("loc_last"),
+        ).group_by(ubicacion),
+        conn,
+    )
+
+    conn.execute(LocationSummary.__table__.delete())
+    if resumen.empty:
+        return 0
+
+    # Orden del mapa con la clave guardada en la carga (sin regex)
+    resumen = resumen.sort_values(["loc_main", "loc_letters", "loc_last"], kind="stable")
+    resumen = resumen.drop(columns=["loc_main", "loc_letters", "loc_last"])
+
+    resumen["status_rank"] = resumen["status_rank"].astype(int)
+    resumen["status"] = resumen["status_rank"].map(ESTADOS)
+    resumen["orden"] = np.arange(len(resumen))
+    resumen["generado_en"] = generado_en
+    resumen["total_libre"] = resumen["total_libre"].astype(float)
+
+    conn.execute(LocationSummary.__table__.insert(), resumen.to_dict("records"))
+    return len(resumen)
+
+
+def version_resumen():
+    """ETag fuerte del resumen: cambia en cada recálculo."""
+    total, generado = db.session.execute(
+        select(func.count(), func.max(LocationSummary.generado_en))
+    ).one()
+    firma = f"{total}:{generado.isoformat() if generado else ''}"
+    return hashlib.sha1(firma.encode("utf-8")).hexdigest()
+
+
+def datos_mapa():
+    """Filas del mapa en el orden de ubicaciones."""
+    filas = db.session.execute(
+        select(
+            LocationSummary.ubicacion,
+            LocationSummary.total_libre,
+            LocationSummary.items,
+            LocationSummary.status,
+        ).order_by(LocationSummary.orden)
+    )
+    return [
+        {
+            "location": f.ubicacion,
+            "total_libre": f.total_libre,
+            "items": f.items,
+            "status": f.status,
+        }
+        for f in filas
+    ]
@@ -0,0 +1,196 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import request, url_for, jsonify, abort
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+# =====================================================
+# PAGINACIÓN KEYSET (SEEK) CON CURSOR
+# =====================================================
+# En lugar de OFFSET, cada página pide "filas después de la última
+# vista" sobre columnas indexadas: la página 1000 cuesta lo mismo que
+# la primera. El orden debe terminar en una columna única (id). Las
+# columnas que admiten NULL se ordenan con los NULL al final en ambos
+# sentidos (cada base los pone en otro lado por defecto) y el cursor
+# los salta con IS NULL, porque "col > NULL" nunca es verdadero.
+
+POR_PAGINA = 50
+MAX_POR_PAGINA = 500
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+# -----------------------------------------------------
+# Cursor: lista de valores de la última fila (JSON en base64)
+# -----------------------------------------------------
+
+def _a_json(valor):
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    return valor
+
+
+def _de_json(valor):
+    if isinstance(valor, dict):
+        if "dt" in valor:
+            return datetime.fromisoformat(valor["dt"])
+        if "d" in valor:
+            return date.fromisoformat(valor["d"])
+    return valor
+
+
+def codificar_cursor(valores):
+    data = json.dumps([_a_json(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(token):
+    try:
+        relleno = "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(token + relleno).decode("utf-8"))
+        return [_de_json(v) for v in data]
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido("Cursor de paginación inválido") from e
+
+
+# -----------------------------------------------------
+# Consulta
+# -----------------------------------------------------
+
+def _columna_y_sentido(expr):
+    """desc(col) → (col, True); asc(col) o col → (col, False)."""
+    if isinstance(expr, UnaryExpression):
+        if expr.modifier is operators.desc_op:
+            return expr.element, True
+        if expr.modifier is operators.asc_op:
+            return expr.element, False
+    if hasattr(expr, "__clause_element__"):
+        expr = expr.__clause_element__()
+    return expr, False
+
+
+def _admite_null(columna):
+    return getattr(columna, "nullable", False)
+
+
+def _ordenar(expr, columna, descendente):
+    """El ORDER BY de `expr`, con NULLS LAST si la columna admite NULL."""
+    if not _admite_null(columna):
+        return expr
+    return (columna.desc() if descendente else columna.asc()).nulls_last()
+
+
+def _igual(columna, valor):
+    return columna.is_(None) if valor is None else columna == valor
+
+
+def _pasa(columna, descendente, valor):
+    """Filas cuya `columna` va después de `valor`; None si ninguna (NULL es el último)."""
+    if valor is None:
+        return None
+    paso = columna < valor if descendente else columna > valor
+    return or_(paso, columna.is_(None)) if _admite_null(columna) else paso
+
+
+def _despues_de(columnas, valores):
+    """(a, b, c) > (va, vb, vc) respetando el sentido de cada columna y los NULL."""
+    condiciones = []
+    for i, (columna, descendente) in enumerate(columnas):
+        paso = _pasa(columna, descendente, valores[i])
+        if paso is None:
+            continue
+        iguales = [_igual(c, v) for (c, _), v in zip(columnas[:i], valores[:i])]
+        condiciones.append(and_(*iguales, paso))
+    return or_(*condiciones)
+
+
+class PaginaKeyset:
+    def __init__(self, items, siguiente, limite):
+        self.items = items
+        self.siguiente = siguiente
+        self.limite = limite
+
+    @property
+    def tiene_siguiente(self):
+        return self.siguiente is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def paginar_keyset(query, orden, cursor=None, limite=POR_PAGINA):
+    """
+    Página de `query` ordenada por `orden` (lista de columnas o desc(col)),
+    empezando después de `cursor`. Lee limite + 1 filas para saber si
+    hay siguiente página.
+    """
+    columnas = [_columna_y_sentido(o) for o in orden]
+
+    if cursor:
+        valores = decodificar_cursor(cursor)
+        if len(valores) != len(columnas):
+            raise CursorInvalido("Cursor de paginación inválido")
+        query = query.filter(_despues_de(columnas, valores))
+
+    orden = [_ordenar(o, c, d) for o, (c, d) in zip(orden, columnas)]
+    filas = query.order_by(*orden).limit(limite + 1).all()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = codificar_cursor([getattr(ultima, c.key) for c, _ in columnas])
+
+    return PaginaKeyset(filas, siguiente, limite)
+
+
+# -----------------------------------------------------
+# Helpers para las rutas
+# -----------------------------------------------------
+
+def quiere_json():
+    """?formato=json o cliente que prefiere JSON."""
+    if request.args.get("formato") == "json":
+        return True
+    mejor = request.accept_mimetypes.best_match(["application/json", "text/html"])
+    return mejor == "application/json" and not request.accept_mimetypes.accept_html
+
+
+def paginar_request(query, orden, por_pagina=POR_PAGINA):
+    """paginar_keyset con ?cursor= y ?limite= de la request (400 si el cursor es inválido)."""
+    limite = request.args.get("limite", por_pagina, type=int) or por_pagina
+    limite = max(1, min(limite, MAX_POR_PAGINA))
+
+    try:
+        return paginar_keyset(query, orden, request.args.get("cursor") or None, limite)
+    except CursorInvalido as e:
+        abort(400, description=str(e))
+
+
+def url_pagina(cursor=None):
+    """URL del endpoint actual con otro cursor (conserva los demás parámetros)."""
+    args = request.args.to_dict()
+    args.pop("cursor", None)
+    if cursor:
+        args["cursor"] = cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def respuesta_pagina(pagina, serializar):
+    """Variante JSON de un listado paginado."""
+    return jsonify({
+        "items": [serializar(i) for i in pagina.items],
+        "limite": pagina.limite,
+        "siguiente": pagina.siguiente,
+        "siguiente_url": url_pagina(pagina.siguiente) if pagina.tiene_siguiente else None,
+    })
@@ -10,19 +10,20 @@ from reportlab.graphics import renderPDF
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 from reportlab.lib.utils import ImageReader
-import qrcode
 from flask import current_app
-from models.user import User
-from models.inventory import InventoryItem
-from models.bultos import Bulto
-from models.alerts import Alert
-from models.actividad import ActividadUsuario
+from warehouse_mro.models.user import User
+from warehouse_mro.models.inventory import InventoryItem
+from warehouse_mro.models.bultos import Bulto
+from warehouse_mro.models.alerts import Alert
+from warehouse_mro.models.actividad import ActividadUsuario
+from warehouse_mro.utils.qr_cache import qr_png
 
 
-def create_pdf_reporte(user_id):
+def create_pdf_reporte(user_id, pdf_path=None):
     """
     Genera el PDF Ultra Pro del usuario.
-    Usado por el scheduler y también por /descargar-datos.
+    Usado por el scheduler y también por /descargar-datos (vía la cola
+    de trabajos, que pasa `pdf_path` propio de cada artefacto).
     """
     user = User.query.get(user_id)
     if not user:
@@ -47,13 +48,14 @@ def create_pdf_reporte(user_id):
     security_code = f"SEC-{user.id}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
 
     # ========= RUTA PDF ============
-    reports_folder = os.path.join(current_app.root_path, "static", "reports")
-    os.makedirs(reports_folder, exist_ok=True)
+    if pdf_path is None:
+        reports_folder = os.path.join(current_app.root_path, "static", "reports")
+        os.makedirs(reports_folder, exist_ok=True)
 
-    pdf_path = os.path.join(
-        reports_folder,
-        f"perfil_usuario_{user.id}_ULTRA_PRO.pdf"
-    )
+        pdf_path = os.path.join(
+            reports_folder,
+            f"perfil_usuario_{user.id}_ULTRA_PRO.pdf"
+        )
 
     # ========= CREAR CANVAS ========
     c = canvas.Canvas(pdf_path, pagesize=letter)
@@ -144,13 +146,8 @@ def create_pdf_reporte(user_id):
         renderPDF.draw(pie_draw, c, width - 240, top - 330)
 
     # ========= QR ==========
-    qr_buf = io.BytesIO()
-    qr = qrcode.QRCode(box_size=3, border=2)
-    qr.add_data(f"Reporte generado para usuario {user.id}")
-    qr.make(fit=True)
-    img = qr.make_image()
-    img.save(qr_buf, format="PNG")
-    qr_buf.seek(0)
+    png, _ = qr_png(f"Reporte generado para usuario {user.id}", box_size=3, border=2)
+    qr_buf = io.BytesIO(png)
     c.drawImage(ImageReader(qr_buf), width - 120, top - 200, width=70, height=70)
 
     # ========= ACTIVIDAD ===========
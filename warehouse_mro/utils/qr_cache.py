@@ -0,0 +1,160 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import qrcode
+from flask import current_app, has_app_context, request
+
+# =====================================================
+# CACHÉ DE IMÁGENES QR (MEMORIA LRU + DISCO)
+# =====================================================
+# La clave es un hash del contenido y de los parámetros de dibujo, así
+# que el mismo QR se genera una sola vez y su ETag no cambia nunca.
+# En disco se poda como utils.reportes: cada PODAR_CADA guardados se
+# borran los PNG sin uso en MAX_EDAD y, si aún sobran, los más viejos.
+
+MAX_MEMORIA = 2048
+MAX_DISCO = 20000      # PNG en disco (~1 KB c/u) antes de podar
+MAX_EDAD = 30 * 24 * 3600
+PODAR_CADA = 500
+
+_memoria = OrderedDict()
+_memoria_lock = threading.Lock()
+_guardados = 0
+
+
+def clave_qr(data, box_size=10, border=4, fill_color="black", back_color="white"):
+    payload = json.dumps(
+        [data, box_size, border, fill_color, back_color],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def carpeta_cache_qr():
+    """QR_CACHE_FOLDER, o instance/qr_cache; None fuera de la app."""
+    if not has_app_context():
+        return None
+    return current_app.config.get("QR_CACHE_FOLDER") or os.path.join(current_app.instance_path, "qr_cache")
+
+
+def _ruta(carpeta, clave):
+    # Dos niveles para no acumular miles de archivos en un directorio
+    return os.path.join(carpeta, clave[:2], f"{clave}.png")
+
+
+def _leer_disco(carpeta, clave):
+    ruta = _ruta(carpeta, clave)
+    try:
+        with open(ruta, "rb") as f:
+            png = f.read()
+        # mtime = último uso: la poda borra primero lo que nadie pide
+        os.utime(ruta, None)
+        return png
+    except OSError:
+        return None
+
+
+def _guardar_disco(carpeta, clave, png):
+    ruta = _ruta(carpeta, clave)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(temporal, "wb") as f:
+            f.write(png)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        print(f"✖ Caché QR: no se pudo guardar {clave} ({e})")
+        return
+
+    global _guardados
+    with _memoria_lock:
+        _guardados += 1
+        podar = _guardados % PODAR_CADA == 0
+    if podar:
+        _podar(carpeta)
+
+
+def _podar(carpeta, maximo=MAX_DISCO, edad=MAX_EDAD):
+    limite = time.time() - edad
+    archivos = []
+    for raiz, _, nombres in os.walk(carpeta):
+        for nombre in nombres:
+            ruta = os.path.join(raiz, nombre)
+            try:
+                mtime = os.path.getmtime(ruta)
+                if mtime < limite:
+                    os.remove(ruta)
+                elif nombre.endswith(".png"):
+                    archivos.append((mtime, ruta))
+            except OSError:
+                pass
+
+    archivos.sort(reverse=True)
+    for _, ruta in archivos[maximo:]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def _recordar(clave, png):
+    with _memoria_lock:
+        _memoria[clave] = png
+        _memoria.move_to_end(clave)
+        while len(_memoria) > MAX_MEMORIA:
+            _memoria.popitem(last=False)
+
+
+def _generar(data, box_size, border, fill_color, back_color):
+    qr = qrcode.QRCode(box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color=fill_color, back_color=back_color)
+
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def qr_png(data, box_size=10, border=4, fill_color="black", back_color="white", carpeta=None):
+    """
+    PNG del QR para `data`. Retorna (png, clave). Busca en memoria,
+    luego en disco (`carpeta` o carpeta_cache_qr()) y solo si falta lo genera.
+    """
+    clave = clave_qr(data, box_size, border, fill_color, back_color)
+
+    with _memoria_lock:
+        png = _memoria.get(clave)
+        if png is not None:
+            _memoria.move_to_end(clave)
+            return png, clave
+
+    carpeta = carpeta or carpeta_cache_qr()
+
+    png = _leer_disco(carpeta, clave) if carpeta else None
+    if png is None:
+        png = _generar(data, box_size, border, fill_color, back_color)
+        if carpeta:
+            _guardar_disco(carpeta, clave, png)
+
+    _recordar(clave, png)
+    return png, clave
+
+
+def respuesta_qr(png, clave, download_name=None):
+    """Respuesta PNG con ETag fijo; responde 304 si el navegador ya lo tiene."""
+    respuesta = current_app.response_class(png, mimetype="image/png")
+    respuesta.set_etag(clave)
+    respuesta.cache_control.public = True
+    respuesta.cache_control.max_age = MAX_EDAD
+    respuesta.cache_control.immutable = True
+
+    if download_name:
+        respuesta.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+
+    return respuesta.make_conditional(request)
@@ -0,0 +1,218 @@
+from datetime import datetime, timedelta
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from sqlalchemy import String, cast, func, literal, select, union_all
+
+from warehouse_mro.models import db
+from warehouse_mro.models.technician_error import TechnicianError
+
+
+# =====================================================
+# REPORTE PDF DE ERRORES TÉCNICOS
+# =====================================================
+# El resumen (pérdida por técnico, por tipo y por día) sale de un solo
+# UNION ALL agregado; el detalle se recorre con un cursor del servidor
+# (yield_per), así la memoria no depende del tamaño del historial.
+
+FILAS_POR_LOTE = 500
+MAX_FILAS_RESUMEN = 15
+
+
+def _fecha(valor):
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        return valor
+    return datetime.strptime(str(valor)[:10], "%Y-%m-%d")
+
+
+def filtros_errores(desde=None, hasta=None, tecnico=None):
+    """Condiciones para el rango de fechas (ambas incluidas) y el técnico."""
+    desde, hasta = _fecha(desde), _fecha(hasta)
+
+    condiciones = []
+    if desde:
+        condiciones.append(TechnicianError.fecha_hora >= desde)
+    if hasta:
+        condiciones.append(TechnicianError.fecha_hora < hasta + timedelta(days=1))
+    if tecnico:
+        condiciones.append(TechnicianError.tecnico == tecnico)
+    return condiciones
+
+
+def resumen_errores(condiciones):
+    """
+    Pérdida, puntaje y cantidad por técnico, por tipo y por día en una
+    consulta. Retorna {"tecnico": [...], "tipo": [...], "dia": [...]}
+    con tuplas (clave, errores, dinero, puntaje).
+    """
+    dia = func.date(TechnicianError.fecha_hora)
+    metricas = [
+        func.count(TechnicianError.id).label("errores"),
+        func.coalesce(func.sum(TechnicianError.dinero_perdido), 0).label("dinero"),
+        func.coalesce(func.sum(TechnicianError.puntaje), 0).label("puntaje"),
+    ]
+
+    consulta = union_all(
+        select(literal("tecnico").label("serie"), TechnicianError.tecnico.label("clave"), *metricas)
+        .where(*condiciones)
+        .group_by(TechnicianError.tecnico),
+        select(literal("tipo"), TechnicianError.tipo_error, *metricas)
+        .where(*condiciones)
+        .group_by(TechnicianError.tipo_error),
+        select(literal("dia"), cast(dia, String), *metricas)
+        .where(TechnicianError.fecha_hora.isnot(None), *condiciones)
+        .group_by(dia),
+    )
+
+    resumen = {"tecnico": [], "tipo": [], "dia": []}
+    for serie, clave, errores, dinero, puntaje in db.session.execute(consulta):
+        resumen[serie].append((str(clave), int(errores), float(dinero), int(puntaje)))
+
+    resumen["tecnico"].sort(key=lambda r: r[2], reverse=True)
+    resumen["tipo"].sort(key=lambda r: r[2], reverse=True)
+    resumen["dia"].sort(key=lambda r: r[0])
+    return resumen
+
+
+def iter_errores(condiciones, lote=FILAS_POR_LOTE):
+    """Filas del detalle (más recientes primero) en lotes desde el servidor."""
+    stmt = (
+        select(
+            TechnicianError.tecnico,
+            TechnicianError.tipo_error,
+            TechnicianError.dinero_perdido,
+            TechnicianError.puntaje,
+            TechnicianError.fecha_hora,
+        )
+        .where(*condiciones)
+        .order_by(TechnicianError.fecha_hora.desc(), TechnicianError.id.desc())
+        .execution_options(yield_per=lote)
+    )
+    yield from db.session.execute(stmt)
+
+
+class _Hoja:
+    """Canvas con cursor vertical y salto de página automático."""
+
+    def __init__(self, pdf_path):
+        self.c = canvas.Canvas(pdf_path, pagesize=letter, pageCompression=1)
+        self.width, self.height = letter
+        self.y = self.height - 50
+        self.paginas = 1
+
+    def espacio(self, alto, encabezado=None):
+        if self.y - alto < 50:
+            self.c.showPage()
+            self.paginas += 1
+            self.y = self.height - 50
+            if encabezado:
+                encabezado()
+
+    def save(self):
+        self.c.save()
+
+
+def _tabla_resumen(hoja, titulo, filas, etiqueta):
+    c = hoja.c
+
+    hoja.espacio(60)
+    c.setFont("Helvetica-Bold", 13)
+    c.drawString(50, hoja.y, titulo)
+    hoja.y -= 20
+
+    def encabezado():
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(50, hoja.y, etiqueta)
+        c.drawString(280, hoja.y, "Errores")
+        c.drawString(360, hoja.y, "S/ Perdido")
+        c.drawString(460, hoja.y, "Puntaje")
+        hoja.y -= 16
+        c.setFont("Helvetica", 10)
+
+    encabezado()
+    for clave, errores, dinero, puntaje in filas:
+        hoja.espacio(16, encabezado)
+        c.drawString(50, hoja.y, clave[:40])
+        c.drawRightString(320, hoja.y, str(errores))
+        c.drawRightString(430, hoja.y, f"S/ {dinero:,.2f}")
+        c.drawRightString(500, hoja.y, str(puntaje))
+        hoja.y -= 14
+
+    hoja.y -= 16
+
+
+def generar_reporte_errores(pdf_path, desde=None, hasta=None, tecnico=None):
+    """
+    Dibuja el reporte de errores técnicos en `pdf_path`. Es un artefacto
+    compartido entre usuarios (utils.reportes): no lleva quién lo pidió.
+    """
+    condiciones = filtros_errores(desde, hasta, tecnico)
+    resumen = resumen_errores(condiciones)
+
+    hoja = _Hoja(pdf_path)
+    c = hoja.c
+
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(50, hoja.y, "Reporte de Errores Técnicos - SIDERPERU")
+    hoja.y -= 30
+
+    c.setFont("Helvetica", 12)
+    c.drawString(50, hoja.y, f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    hoja.y -= 20
+
+    filtro = []
+    if desde or hasta:
+        filtro.append(f"Periodo: {desde or '...'} a {hasta or '...'}")
+    if tecnico:
+        filtro.append(f"Técnico: {tecnico}")
+    if filtro:
+        c.drawString(50, hoja.y, " | ".join(filtro))
+        hoja.y -= 20
+
+    total_errores = sum(r[1] for r in resumen["tecnico"])
+    total_dinero = sum(r[2] for r in resumen["tecnico"])
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, hoja.y, f"Total: {total_errores} errores — S/ {total_dinero:,.2f}")
+    hoja.y -= 30
+
+    # ========= RESUMEN ==========
+    _tabla_resumen(hoja, "Pérdida por técnico", resumen["tecnico"], "Técnico")
+    _tabla_resumen(hoja, "Pérdida por tipo de error", resumen["tipo"][:MAX_FILAS_RESUMEN], "Tipo")
+    _tabla_resumen(hoja, "Pérdida por día", resumen["dia"], "Día")
+
+    # ========= DETALLE ==========
+    c.showPage()
+    hoja.paginas += 1
+    hoja.y = hoja.height - 50
+
+    def encabezado():
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(50, hoja.y, "Fecha")
+        c.drawString(150, hoja.y, "Técnico")
+        c.drawString(290, hoja.y, "Tipo")
+        c.drawString(430, hoja.y, "S/ Perdido")
+        c.drawString(510, hoja.y, "Puntaje")
+        hoja.y -= 20
+        c.setFont("Helvetica", 10)
+
+    c.setFont("Helvetica-Bold", 13)
+    c.drawString(50, hoja.y, "Detalle de errores")
+    hoja.y -= 24
+    encabezado()
+
+    for e in iter_errores(condiciones):
+        hoja.espacio(18, encabezado)
+
+        fecha = e.fecha_hora.strftime("%Y-%m-%d %H:%M") if e.fecha_hora else ""
+        c.drawString(50, hoja.y, fecha)
+        c.drawString(150, hoja.y, str(e.tecnico)[:24])
+        c.drawString(290, hoja.y, str(e.tipo_error)[:24])
+        c.drawString(430, hoja.y, f"S/ {e.dinero_perdido or 0:.2f}")
+        c.drawString(510, hoja.y, str(e.puntaje))
+
+        hoja.y -= 18
+
+    hoja.save()
+    return pdf_path
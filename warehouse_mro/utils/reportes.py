@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import uuid
+
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from warehouse_mro.models import db
+from warehouse_mro.models.job import Job
+from warehouse_mro.models.user import User
+from warehouse_mro.models.technician_error import TechnicianError
+from warehouse_mro.models.inventory import InventoryItem
+from warehouse_mro.models.bultos import Bulto
+from warehouse_mro.models.alerts import Alert
+from warehouse_mro.models.actividad import ActividadUsuario
+from warehouse_mro.utils.reporte_errores import filtros_errores
+from warehouse_mro.tasks.jobs import encolar
+
+# =====================================================
+# SERVICIO DE REPORTES PDF (ARTEFACTOS CACHEADOS)
+# =====================================================
+# Cada reporte se identifica por (tipo, parámetros, versión de los datos
+# que dibuja). Esa clave da:
+#   - el archivo del artefacto (REPORTS_CACHE_FOLDER/<clave>.pdf)
+#   - el id del trabajo (uuid5 de la clave): dos pedidos iguales al
+#     mismo tiempo chocan en la PK de "jobs" y comparten un solo render.
+# Si los datos cambian, cambia la versión y se genera otro artefacto.
+
+MAX_ARTEFACTOS = 200
+
+
+def _version_errores(parametros):
+    # Solo las filas que entran en el reporte (mismos filtros que el PDF)
+    condiciones = filtros_errores(
+        parametros.get("desde"), parametros.get("hasta"), parametros.get("tecnico")
+    )
+    fila = db.session.execute(select(
+        func.count(TechnicianError.id),
+        func.max(TechnicianError.id),
+        func.max(func.coalesce(TechnicianError.actualizado_en, TechnicianError.creado_en)),
+        func.sum(TechnicianError.dinero_perdido),
+        func.sum(TechnicianError.puntaje),
+    ).where(*condiciones)).one()
+    return list(fila)
+
+
+def _version_usuario(parametros):
+    user = db.session.get(User, parametros["user_id"])
+    perfil = [
+        getattr(user, c, None)
+        for c in ("username", "role", "email", "phone", "location", "area", "photo", "perfil_completado")
+    ] if user else []
+
+    fila = db.session.execute(select(
+        select(func.count(InventoryItem.id)).scalar_subquery(),
+        select(func.count(Bulto.id)).scalar_subquery(),
+        select(func.count(Alert.id)).scalar_subquery(),
+        select(func.max(ActividadUsuario.id))
+        .where(ActividadUsuario.user_id == parametros["user_id"])
+        .scalar_subquery(),
+    )).one()
+    return perfil + list(fila)
+
+
+# tipo de trabajo → función(parametros) con la versión de sus datos
+VERSIONES = {
+    "reporte_errores": _version_errores,
+    "reporte_usuario": _version_usuario,
+}
+
+
+def carpeta_artefactos():
+    carpeta = current_app.config["REPORTS_CACHE_FOLDER"]
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+def clave_reporte(tipo, parametros):
+    version = VERSIONES[tipo](parametros)
+    payload = json.dumps([tipo, parametros, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def ruta_artefacto(clave):
+    return os.path.join(carpeta_artefactos(), f"{clave}.pdf")
+
+
+def publicar_artefacto(temporal, clave):
+    """Mueve el PDF recién dibujado a su lugar en la caché (atómico)."""
+    ruta = ruta_artefacto(clave)
+    os.replace(temporal, ruta)
+    _podar()
+    return ruta
+
+
+def _podar():
+    carpeta = carpeta_artefactos()
+    try:
+        archivos = [
+            os.path.join(carpeta, n) for n in os.listdir(carpeta) if n.endswith(".pdf")
+        ]
+        archivos.sort(key=os.path.getmtime, reverse=True)
+        for ruta in archivos[MAX_ARTEFACTOS:]:
+            os.remove(ruta)
+    except OSError:
+        pass
+
+
+def _reencolar(job_id, estado_actual):
+    # Solo un pedido logra pasarlo de nuevo a pendiente
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.estado == estado_actual)
+        .values(
+            estado="pendiente",
+            progreso=0,
+            mensaje="En cola",
+            error=None,
+            resultado=None,
+            worker=None,
+            iniciado_en=None,
+            terminado_en=None,
+        )
+    )
+    db.session.commit()
+
+
+def solicitar_reporte(tipo, parametros, usuario=None, destino=None):
+    """
+    Retorna el Job del reporte: completado si el artefacto ya existe,
+    o el trabajo (nuevo o en curso) que lo va a generar.
+    """
+    clave = clave_reporte(tipo, parametros)
+    job_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"reporte:{clave}"))
+
+    job = db.session.get(Job, job_id)
+
+    if job is None:
+        params = dict(parametros, clave=clave, destino=destino)
+        try:
+            job = encolar(tipo, params, usuario=usuario, job_id=job_id)
+        except IntegrityError:
+            # Otro pedido idéntico lo encoló primero
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+        return job
+
+    artefacto_perdido = job.estado == "completado" and not (
+        job.resultado and os.path.exists(job.resultado)
+    )
+    if job.estado == "error" or artefacto_perdido:
+        _reencolar(job_id, job.estado)
+        db.session.refresh(job)
+
+    return job
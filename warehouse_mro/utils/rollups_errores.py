@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from warehouse_mro.models import db
+from warehouse_mro.models.technician_error import TechnicianError
+from warehouse_mro.models.technician_rollup import TechnicianScore, TechnicianErrorRollup
+
+# =====================================================
+# ACUMULADOS DE ERRORES TÉCNICOS
+# =====================================================
+# technician_scores: total histórico por técnico (ranking)
+# technician_error_rollups: dia / semana / mes, por técnico y total ("")
+# Cada error nuevo suma sus valores en la misma transacción que lo
+# inserta; la lista y los gráficos leen solo estas tablas.
+
+PERIODOS = ["dia", "semana", "mes"]
+TODOS = ""
+
+
+def inicio_periodo(fecha, periodo):
+    dia = fecha.date() if isinstance(fecha, datetime) else fecha
+    if periodo == "semana":
+        return dia - timedelta(days=dia.weekday())
+    if periodo == "mes":
+        return dia.replace(day=1)
+    return dia
+
+
+def _sumar(conn, modelo, clave, valores):
+    """UPDATE x = x + delta; si la fila no existe, INSERT (con reintento si otro la creó)."""
+    tabla = modelo.__table__
+    condicion = [tabla.c[k] == v for k, v in clave.items()]
+    incrementos = {k: tabla.c[k] + v for k, v in valores.items() if k in ("errores", "dinero_perdido", "puntaje")}
+    extra = {k: v for k, v in valores.items() if k not in incrementos}
+
+    stmt = update(tabla).where(*condicion).values(**incrementos, **extra)
+    if conn.execute(stmt).rowcount:
+        return
+
+    try:
+        with conn.begin_nested():
+            conn.execute(tabla.insert().values(**clave, **valores))
+    except IntegrityError:
+        conn.execute(stmt)
+
+
+def acumular_error(conn, tecnico, fecha, dinero_perdido, puntaje):
+    """Suma un error a los acumulados (llamar antes del commit del error)."""
+    fecha = fecha or datetime.utcnow()
+    dinero_perdido = float(dinero_perdido or 0)
+    puntaje = int(puntaje or 0)
+
+    _sumar(conn, TechnicianScore, {"tecnico": tecnico}, {
+        "errores": 1,
+        "dinero_perdido": dinero_perdido,
+        "puntaje": puntaje,
+        "ultimo_error": fecha,
+    })
+
+    ahora = datetime.utcnow()
+    for periodo in PERIODOS:
+        inicio = inicio_periodo(fecha, periodo)
+        for quien in (tecnico, TODOS):
+            _sumar(conn, TechnicianErrorRollup, {"periodo": periodo, "inicio": inicio, "tecnico": quien}, {
+                "errores": 1,
+                "dinero_perdido": dinero_perdido,
+                "puntaje": puntaje,
+                "actualizado_en": ahora,
+            })
+
+
+def recalcular_rollups(conn=None):
+    """Reconstruye ambos acumulados desde technician_errors. Retorna técnicos."""
+    conn = conn or db.session.connection()
+    ahora = datetime.utcnow()
+
+    df = pd.read_sql(
+        select(
+            TechnicianError.tecnico,
+            TechnicianError.fecha_hora,
+            TechnicianError.dinero_perdido,
+            TechnicianError.puntaje,
+        ),
+        conn,
+    )
+
+    conn.execute(TechnicianScore.__table__.delete())
+    conn.execute(TechnicianErrorRollup.__table__.delete())
+    if df.empty:
+        return 0
+
+    df["dinero_perdido"] = df["dinero_perdido"].fillna(0).astype(float)
+    df["puntaje"] = df["puntaje"].fillna(0).astype(int)
+    df["errores"] = 1
+
+    scores = (
+        df.groupby("tecnico", as_index=False)
+        .agg(errores=("errores", "sum"), dinero_perdido=("dinero_perdido", "sum"),
+             puntaje=("puntaje", "sum"), ultimo_error=("fecha_hora", "max"))
+    )
+    scores = scores.astype(object).where(scores.notna(), None)
+    conn.execute(TechnicianScore.__table__.insert(), scores.to_dict("records"))
+
+    df = df[df["fecha_hora"].notna()]
+    fechas = pd.to_datetime(df["fecha_hora"]).dt.normalize()
+    inicios = {
+        "dia": fechas,
+        "semana": fechas - pd.to_timedelta(fechas.dt.weekday, unit="D"),
+        "mes": fechas.dt.to_period("M").dt.to_timestamp(),
+    }
+
+    for periodo, inicio in inicios.items():
+        base = df.assign(inicio=inicio.dt.date)
+        for quien in ("tecnico", TODOS):
+            claves = ["inicio", "tecnico"] if quien else ["inicio"]
+            filas = (
+                base.groupby(claves, as_index=False)[["errores", "dinero_perdido", "puntaje"]].sum()
+            )
+            if not quien:
+                filas["tecnico"] = TODOS
+            filas["periodo"] = periodo
+            filas["actualizado_en"] = ahora
+            if not filas.empty:
+                conn.execute(TechnicianErrorRollup.__table__.insert(), filas.to_dict("records"))
+
+    return len(scores)
+
+
+# =====================================================
+# LECTURAS (RANKING Y SERIES)
+# =====================================================
+
+def ranking_tecnicos():
+    """{tecnico: dinero perdido} de mayor a menor."""
+    filas = db.session.execute(
+        select(TechnicianScore.tecnico, TechnicianScore.dinero_perdido)
+        .order_by(TechnicianScore.dinero_perdido.desc())
+    )
+    return {t: float(d) for t, d in filas}
+
+
+def serie_errores(periodo="dia", tecnico=TODOS, campo="dinero_perdido"):
+    """{inicio (AAAA-MM-DD): valor} del periodo, en orden de fecha."""
+    columna = getattr(TechnicianErrorRollup, campo)
+    filas = db.session.execute(
+        select(TechnicianErrorRollup.inicio, columna)
+        .where(
+            TechnicianErrorRollup.periodo == periodo,
+            TechnicianErrorRollup.tecnico == tecnico,
+        )
+        .order_by(TechnicianErrorRollup.inicio)
+    )
+    return {str(inicio): float(valor) for inicio, valor in filas}
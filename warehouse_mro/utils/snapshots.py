@@ -0,0 +1,352 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import func, select
+
+from warehouse_mro.models import db
+from warehouse_mro.models.inventory_stock import InventoryStock
+from warehouse_mro.models.inventory_history import InventoryHistory, InventorySnapshot
+
+# =====================================================
+# SNAPSHOTS DE INVENTARIO (KEYFRAME + DELTAS)
+# =====================================================
+# Cada carga guarda solo lo que cambió respecto al snapshot anterior,
+# por clave (material_code, location). Cada SNAPSHOT_KEYFRAME_CADA
+# cargas se escribe un keyframe completo para acotar la reconstrucción.
+
+CLAVE = ["material_code", "location"]
+COLUMNAS = ["material_code", "material_text", "base_unit", "location", "libre_utilizacion"]
+VALORES = ["material_text", "base_unit", "libre_utilizacion"]
+
+KEYFRAME_CADA = 10
+
+
+def _vacio():
+    return pd.DataFrame({c: pd.Series(dtype=float if c == "libre_utilizacion" else object)
+                         for c in COLUMNAS})
+
+
+def _normalizar(df):
+    """Una fila por clave: textos str, stock float."""
+    if df.empty:
+        return _vacio()
+
+    df = df[COLUMNAS].copy()
+    for c in ["material_code", "material_text", "base_unit", "location"]:
+        df[c] = df[c].fillna("").astype(str)
+    df["libre_utilizacion"] = pd.to_numeric(df["libre_utilizacion"], errors="coerce").fillna(0.0)
+
+    return (
+        df.groupby(CLAVE, as_index=False, sort=False)
+        .agg(
+            material_text=("material_text", "first"),
+            base_unit=("base_unit", "first"),
+            libre_utilizacion=("libre_utilizacion", "sum"),
+        )[COLUMNAS]
+    )
+
+
+def estado_inventario_actual(conn):
+    """
+    Inventario activo agregado por clave, leído de inventory_stock
+    (ya recalculado dentro de la transacción de carga).
+    """
+    stmt = select(*[getattr(InventoryStock, c) for c in COLUMNAS])
+    return _normalizar(pd.read_sql(stmt, conn))
+
+
+# =====================================================
+# RECONSTRUCCIÓN
+# =====================================================
+
+def _aplicar_delta(estado, delta):
+    """Aplica un delta (filas I/U/D) sobre el estado indexado por clave."""
+    if delta.empty:
+        return estado
+
+    delta = delta.set_index(CLAVE)
+    estado = estado.drop(index=delta.index, errors="ignore")
+
+    nuevos = delta[delta["operacion"] != "D"][VALORES]
+    if nuevos.empty:
+        return estado
+    return pd.concat([estado, nuevos])
+
+
+def reconstruir_snapshot(snapshot_id, conn=None):
+    """
+    Reconstruye el snapshot completo como DataFrame con las columnas
+    material_code, material_text, base_unit, location, libre_utilizacion.
+    Lee el keyframe anterior más cercano y aplica los deltas en orden.
+    """
+    conn = conn or db.session.connection()
+
+    meta = conn.execute(
+        select(InventorySnapshot.secuencia).where(InventorySnapshot.snapshot_id == snapshot_id)
+    ).first()
+
+    # Snapshot antiguo (antes de los deltas): copia completa
+    if meta is None:
+        filas = pd.read_sql(
+            select(*[getattr(InventoryHistory, c) for c in COLUMNAS])
+            .where(InventoryHistory.snapshot_id == snapshot_id),
+            conn,
+        )
+        return _normalizar(filas)
+
+    keyframe = conn.execute(
+        select(func.max(InventorySnapshot.secuencia))
+        .where(
+            InventorySnapshot.es_keyframe.is_(True),
+            InventorySnapshot.secuencia <= meta.secuencia,
+        )
+    ).scalar()
+
+    cadena = (
+        select(
+            InventorySnapshot.secuencia,
+            InventoryHistory.operacion,
+            *[getattr(InventoryHistory, c) for c in COLUMNAS],
+        )
+        .join(InventoryHistory, InventoryHistory.snapshot_id == InventorySnapshot.snapshot_id)
+        .where(
+            InventorySnapshot.secuencia >= (keyframe or 0),
+            InventorySnapshot.secuencia <= meta.secuencia,
+        )
+    )
+    filas = pd.read_sql(cadena, conn)
+
+    if filas.empty:
+        return _vacio()
+
+    filas["libre_utilizacion"] = filas["libre_utilizacion"].astype(float)
+    estado = _vacio().set_index(CLAVE)
+
+    for _, delta in filas.groupby("secuencia", sort=True):
+        if (delta["operacion"] == "K").all():
+            estado = delta.set_index(CLAVE)[VALORES]
+        else:
+            estado = _aplicar_delta(estado, delta)
+
+    return estado.reset_index()[COLUMNAS]
+
+
+# =====================================================
+# REGISTRO DEL SNAPSHOT EN LA CARGA
+# =====================================================
+
+def calcular_delta(anterior, nuevo):
+    """
+    Compara dos estados normalizados por clave y retorna
+    (insertadas, modificadas, eliminadas) como DataFrames.
+    """
+    merged = anterior.merge(nuevo, on=CLAVE, how="outer",
+                            suffixes=("_ant", ""), indicator=True)
+
+    insertadas = merged[merged["_merge"] == "right_only"]
+    eliminadas = merged[merged["_merge"] == "left_only"]
+
+    ambos = merged[merged["_merge"] == "both"]
+    # Stock exacto: un delta perdido por tolerancia no se recupera hasta
+    # el próximo keyframe. NaN (nulo en la base) contra NaN no es cambio.
+    stock = ambos["libre_utilizacion"].to_numpy(dtype=float)
+    stock_ant = ambos["libre_utilizacion_ant"].to_numpy(dtype=float)
+    cambio = (
+        (ambos["material_text"] != ambos["material_text_ant"])
+        | (ambos["base_unit"] != ambos["base_unit_ant"])
+        | ((stock != stock_ant) & ~(np.isnan(stock) & np.isnan(stock_ant)))
+    )
+    modificadas = ambos[cambio]
+
+    eliminadas = eliminadas[CLAVE + [f"{c}_ant" for c in VALORES]]
+    eliminadas.columns = CLAVE + VALORES
+
+    return insertadas[COLUMNAS], modificadas[COLUMNAS], eliminadas[COLUMNAS]
+
+
+def registrar_snapshot(conn, insertar, snapshot_id, snapshot_name, creado_en=None):
+    """
+    Escribe el snapshot del inventario activo (ya cargado en `conn`) como
+    keyframe o delta. `insertar(conn, tabla, filas)` es el escritor masivo.
+    Retorna la fila de InventorySnapshot creada (como dict).
+    """
+    creado_en = creado_en or datetime.utcnow()
+    keyframe_cada = current_app.config.get("SNAPSHOT_KEYFRAME_CADA", KEYFRAME_CADA)
+
+    nuevo = estado_inventario_actual(conn)
+
+    ultimo = conn.execute(
+        select(InventorySnapshot.snapshot_id, InventorySnapshot.secuencia)
+        .order_by(InventorySnapshot.secuencia.desc())
+        .limit(1)
+    ).first()
+    secuencia = (ultimo.secuencia + 1) if ultimo else 1
+
+    es_keyframe = ultimo is None or (secuencia - 1) % keyframe_cada == 0
+    ins = mod = eli = None
+
+    if not es_keyframe:
+        anterior = reconstruir_snapshot(ultimo.snapshot_id, conn)
+        ins, mod, eli = calcular_delta(anterior, nuevo)
+        # Si cambió casi todo, un keyframe cuesta lo mismo y corta la cadena
+        es_keyframe = len(ins) + len(mod) + len(eli) >= len(nuevo)
+
+    if es_keyframe:
+        partes = [(nuevo, "K")]
+    else:
+        partes = [(ins, "I"), (mod, "U"), (eli, "D")]
+
+    fijos = {
+        "snapshot_id": snapshot_id,
+        "snapshot_name": snapshot_name,
+        "creado_en": creado_en,
+    }
+    for df, operacion in partes:
+        if df.empty:
+            continue
+        filas = df.assign(operacion=operacion, **fijos).to_dict("records")
+        insertar(conn, InventoryHistory.__table__, filas)
+
+    meta = {
+        "snapshot_id": snapshot_id,
+        "snapshot_name": snapshot_name,
+        "secuencia": secuencia,
+        "es_keyframe": es_keyframe,
+        "base_snapshot_id": ultimo.snapshot_id if ultimo else None,
+        "filas_total": len(nuevo),
+        "insertadas": len(nuevo) if es_keyframe else len(ins),
+        "modificadas": 0 if es_keyframe else len(mod),
+        "eliminadas": 0 if es_keyframe else len(eli),
+        "creado_en": creado_en,
+    }
+    conn.execute(InventorySnapshot.__table__.insert(), [meta])
+    return meta
+
+
+# =====================================================
+# COMPARACIÓN ENTRE SNAPSHOTS
+# =====================================================
+# Los snapshots no cambian una vez escritos: el resultado por par
+# (a, b) se guarda en un LRU en memoria y nunca se invalida.
+
+COMPARACIONES_EN_CACHE = 32
+
+_cache_comparaciones = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(clave):
+    with _cache_lock:
+        valor = _cache_comparaciones.get(clave)
+        if valor is not None:
+            _cache_comparaciones.move_to_end(clave)
+        return valor
+
+
+def _cache_set(clave, valor):
+    with _cache_lock:
+        _cache_comparaciones[clave] = valor
+        _cache_comparaciones.move_to_end(clave)
+        while len(_cache_comparaciones) > COMPARACIONES_EN_CACHE:
+            _cache_comparaciones.popitem(last=False)
+
+
+def _comparar(anterior, nuevo, top):
+    merged = anterior.merge(nuevo, on=CLAVE, how="outer",
+                            suffixes=("_a", "_b"), indicator=True)
+
+    stock_a = merged["libre_utilizacion_a"].fillna(0.0).to_numpy(dtype=float)
+    stock_b = merged["libre_utilizacion_b"].fillna(0.0).to_numpy(dtype=float)
+    diferencia = stock_b - stock_a
+
+    solo_a = (merged["_merge"] == "left_only").to_numpy()
+    solo_b = (merged["_merge"] == "right_only").to_numpy()
+    # Igualdad exacta, como en calcular_delta: con tolerancia relativa un
+    # movimiento chico sobre un stock grande se vería "sin cambio".
+    # También cuenta un cambio de texto o unidad (delta "U" sin movimiento).
+    cambio = (
+        (stock_a != stock_b)
+        | (merged["material_text_a"] != merged["material_text_b"]).to_numpy()
+        | (merged["base_unit_a"] != merged["base_unit_b"]).to_numpy()
+    )
+
+    estado = np.select(
+        [solo_b, solo_a, cambio],
+        ["nuevo", "eliminado", "modificado"],
+        default="sin cambio",
+    )
+
+    diff = pd.DataFrame({
+        "material_code": merged["material_code"],
+        "material_text": merged["material_text_b"].fillna(merged["material_text_a"]),
+        "base_unit": merged["base_unit_b"].fillna(merged["base_unit_a"]),
+        "location": merged["location"],
+        "stock_a": stock_a,
+        "stock_b": stock_b,
+        "diferencia": diferencia,
+        "estado": estado,
+    })
+
+    por_ubicacion = (
+        diff.assign(cambiados=(estado != "sin cambio").astype(int))
+        .groupby("location", as_index=False, sort=True)
+        .agg(
+            stock_a=("stock_a", "sum"),
+            stock_b=("stock_b", "sum"),
+            diferencia=("diferencia", "sum"),
+            materiales=("material_code", "size"),
+            cambiados=("cambiados", "sum"),
+        )
+    )
+
+    diff = diff[estado != "sin cambio"]
+
+    orden = np.argsort(-np.abs(diff["diferencia"].to_numpy()), kind="stable")
+    top_movers = diff.iloc[orden[:top]]
+
+    resumen = {
+        "materiales_a": int(len(anterior)),
+        "materiales_b": int(len(nuevo)),
+        "nuevos": int(solo_b.sum()),
+        "eliminados": int(solo_a.sum()),
+        "modificados": int((cambio & ~solo_a & ~solo_b).sum()),
+        "stock_a": float(stock_a.sum()),
+        "stock_b": float(stock_b.sum()),
+        "diferencia": float(diferencia.sum()),
+    }
+
+    return {
+        "resumen": resumen,
+        "diff": diff.reset_index(drop=True),
+        "por_ubicacion": por_ubicacion,
+        "top_movers": top_movers.reset_index(drop=True),
+    }
+
+
+def comparar_snapshots(snapshot_a, snapshot_b, top=20):
+    """
+    Compara dos snapshots por (material_code, location).
+    Retorna dict con:
+      resumen        conteos y totales
+      diff           filas nuevas / eliminadas / modificadas (stock, texto o unidad)
+      por_ubicacion  agregados por ubicación
+      top_movers     las `top` mayores variaciones absolutas
+    """
+    clave = (snapshot_a, snapshot_b, top)
+    resultado = _cache_get(clave)
+    if resultado is not None:
+        return resultado
+
+    conn = db.session.connection()
+    resultado = _comparar(
+        reconstruir_snapshot(snapshot_a, conn),
+        reconstruir_snapshot(snapshot_b, conn),
+        top,
+    )
+
+    _cache_set(clave, resultado)
+    return resultado